@@ -0,0 +1,183 @@
+"""
+Benchmarks for the element/selector stack against FakeWebDriver (tests/fake_webdriver.py).
+
+    python -m benchmarks.bench_elements --latency-ms 2 --output out/bench_elements.json
+    python -m benchmarks.bench_util out/baseline.json out/bench_elements.json
+"""
+import argparse
+import time
+
+from appium.webdriver.common.mobileby import MobileBy
+
+from benchmarks.bench_util import measure, percentiles, write_results
+from tests.fake_webdriver import FakeMobileDriverContext, FakeWebDriver, build_hierarchy
+from instatest.core.helpers.decorators import element_decorators
+from instatest.core.helpers.decorators.batch_resolver import BatchResolvable
+from instatest.core.helpers.decorators.element_decorators import CachePolicy, element, elements
+from instatest.core.helpers.driver_instrumentation import recorder
+from instatest.core.helpers.mobile import MobileOperator
+from instatest.core.helpers.mobile.android_selector import AndroidSelector
+from instatest.core.helpers.mobile.page_snapshot import PageSnapshot
+from instatest.core.helpers.mobile.selector_planner import planner
+from instatest.core.helpers.wait_engine import Backoff, WaitEngine
+from instatest.core.models.element import Element
+from instatest.core.target_property import TargetProperty
+
+PACKAGE = "com.instawork.app"
+
+
+def resource_id(name: str) -> str:
+    return "{0}:id/{1}".format(PACKAGE, name)
+
+
+class JobsScreen(BatchResolvable):
+    title = element(android=AndroidSelector.ByResourceId(resource_id("toolbar_title")))
+    job_list = element(android=AndroidSelector.ByResourceId(resource_id("job_list")))
+    footer = element(android=AndroidSelector.ByResourceId(resource_id("footer_button")))
+    rows = elements(android=AndroidSelector.ByResourceId(resource_id("job_row")))
+
+    def __init__(self, driver_context, cache_policy: CachePolicy):
+        self.driver_context = driver_context
+        self.element_cache_policy = cache_policy
+
+
+def bench_selector_build(iterations: int) -> dict:
+    def fresh():
+        selector = AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.ResourceId, MobileOperator.Equals,
+                                   resource_id("job_title"))
+        return selector.get_tuple()
+
+    def interned():
+        return AndroidSelector.ByResourceId(resource_id("job_title")).get_tuple()
+
+    return {"selector_build_fresh": measure(fresh, iterations), "selector_build_interned": measure(interned, iterations)}
+
+
+def bench_lookup(driver: FakeWebDriver, context, iterations: int) -> dict:
+    target = Element(AndroidSelector.ByXPath("//*[@resource-id='{0}']".format(resource_id("footer_button"))), context)
+    driver.command_count = 0
+    result = measure(target.get_web_element, iterations)
+    result["commands_per_lookup"] = round(driver.command_count / result["calls"], 3)
+
+    recorder.enable()
+    try:
+        result["recorded_best_us"] = measure(target.get_web_element, iterations)["best_us"]
+    finally:
+        recorder.disable()
+        recorder.reset()
+    return {"element_lookup": result}
+
+
+def bench_cache_policies(driver: FakeWebDriver, context, accesses: int) -> dict:
+    results = {}
+    stats = element_decorators.get_cache_stats()
+    for policy in (CachePolicy.FRESH, CachePolicy.VALIDATE, CachePolicy.TRUST):
+        screen = JobsScreen(context, policy)
+        stats.reset()
+        driver.command_count = 0
+        started = time.perf_counter()
+        for _ in range(accesses):
+            screen.title
+            screen.footer
+        elapsed = time.perf_counter() - started
+        lookups = accesses * 2
+        results["descriptor_{0}".format(policy.value)] = {
+            "accesses": lookups,
+            "per_access_us": round(elapsed / lookups * 1e6, 3),
+            "commands_per_access": round(driver.command_count / lookups, 3),
+            "hit_rate": round(stats.hits / lookups, 3),
+            "round_trips_saved": stats.round_trips_saved
+        }
+    return results
+
+
+def bench_batch(driver: FakeWebDriver, context, rounds: int) -> dict:
+    results = {}
+    for name, prefetch in (("individual", False), ("prefetch", True)):
+        driver.command_count = 0
+        started = time.perf_counter()
+        for _ in range(rounds):
+            screen = JobsScreen(context, CachePolicy.TRUST)
+            if prefetch:
+                screen.prefetch()
+            screen.title, screen.job_list, screen.footer, screen.rows
+        elapsed = time.perf_counter() - started
+        results["resolve_{0}".format(name)] = {
+            "per_screen_ms": round(elapsed / rounds * 1000, 3),
+            "commands_per_screen": round(driver.command_count / rounds, 3)
+        }
+    return results
+
+
+def bench_snapshot_reads(driver: FakeWebDriver, context, rows: int) -> dict:
+    titles = AndroidSelector.ByResourceId(resource_id("job_title"))
+    driver.command_count = 0
+    started = time.perf_counter()
+    live = [e.text for e in context.find_elements_by(titles)]
+    live_elapsed = time.perf_counter() - started
+    live_commands = driver.command_count
+
+    driver.command_count = 0
+    started = time.perf_counter()
+    snapshot = [r.text for r in PageSnapshot.capture(context).find_all(titles)]
+    snapshot_elapsed = time.perf_counter() - started
+    assert live == snapshot, "Snapshot and live reads disagree"
+    return {
+        "text_reads_live": {"rows": rows, "ms": round(live_elapsed * 1000, 3), "commands": live_commands},
+        "text_reads_snapshot": {"rows": rows, "ms": round(snapshot_elapsed * 1000, 3),
+                                "commands": driver.command_count}
+    }
+
+
+def bench_wait(driver: FakeWebDriver, context, delays_ms) -> dict:
+    results = {}
+    selector = AndroidSelector.ByXPath("//*[@resource-id='{0}']".format(resource_id("footer_button")))
+    for name, backoff in (("fixed_500ms", Backoff(initial_s=0.5, factor=1, max_s=0.5)),
+                          ("backoff", Backoff(initial_s=0.05, factor=2, max_s=0.5))):
+        overshoot = []
+        commands = 0
+        for delay_ms in delays_ms:
+            driver.reveal_after(resource_id("footer_button"), delay_ms / 1000.0)
+            driver.command_count = 0
+            started = time.perf_counter()
+            found = Element(selector, context, wait=WaitEngine(timeout_s=5, backoff=backoff))._wait_for_element()
+            elapsed = time.perf_counter() - started
+            assert found is not None, "Element never appeared"
+            overshoot.append(max(0.0, elapsed - delay_ms / 1000.0))
+            commands += driver.command_count
+        result = {"overshoot_" + k: v for k, v in percentiles(overshoot).items()}
+        result["commands_per_wait"] = round(commands / len(delays_ms), 2)
+        results["wait_{0}".format(name)] = result
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Element and selector benchmarks against a fake driver")
+    parser.add_argument("--latency-ms", type=float, default=2.0, help="Simulated round trip per driver command")
+    parser.add_argument("--rows", type=int, default=50, help="Rows in the fake job list")
+    parser.add_argument("--iterations", type=int, default=2000, help="Iterations for CPU bound benchmarks")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    page_source = build_hierarchy(rows=args.rows, package=PACKAGE)
+    # CPU cost is measured without latency, round trip counts and waits with it
+    fast_driver = FakeWebDriver(page_source, package=PACKAGE)
+    fast_context = FakeMobileDriverContext(fast_driver)
+    driver = FakeWebDriver(page_source, latency_s=args.latency_ms / 1000.0, package=PACKAGE)
+    context = FakeMobileDriverContext(driver)
+
+    results = {}
+    results.update(bench_selector_build(args.iterations))
+    results.update(bench_lookup(fast_driver, fast_context, args.iterations))
+    results.update(bench_cache_policies(driver, context, accesses=50))
+    results.update(bench_batch(driver, context, rounds=20))
+    results.update(bench_snapshot_reads(driver, context, args.rows))
+    results.update(bench_wait(driver, context, delays_ms=[30, 120, 260, 410, 700]))
+    results["selector_strategies"] = planner.report()["strategies"]
+
+    write_results("elements", results, {"latency_ms": args.latency_ms, "rows": args.rows,
+                                        "iterations": args.iterations}, args.output)
+
+
+if __name__ == "__main__":
+    main()
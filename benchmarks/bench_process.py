@@ -0,0 +1,171 @@
+"""
+Benchmarks for ManagedProcess and AppiumManager against the stand in scripts in benchmarks/standins.
+
+    python -m benchmarks.bench_process --output out/bench_process.json
+    python -m benchmarks.bench_util out/baseline_process.json out/bench_process.json
+
+Process output logs are written under --workdir (a temporary directory by default).
+"""
+import argparse
+import os
+import socket
+import sys
+import tempfile
+import time
+
+import psutil
+
+from benchmarks.bench_util import percentiles, write_results
+from instatest.core.helpers.mobile.appium_manager import AppiumManager
+from instatest.core.helpers.process.managed_process import ManagedProcess
+from instatest.core.helpers.process.readiness import OutputPattern, PortOpen
+
+STANDINS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "standins")
+FAKE_APPIUM = os.path.join(STANDINS, "fake_appium.py")
+CHATTY_LOGGER = os.path.join(STANDINS, "chatty_logger.py")
+FORKER = os.path.join(STANDINS, "forker.py")
+
+
+def free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def still_running(pid: int) -> bool:
+    try:
+        return psutil.Process(pid).status() != psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return False
+
+
+def bench_appium_ready(runs: int, delay_s: float) -> dict:
+    ready, stop = [], []
+    for i in range(runs):
+        manager = AppiumManager("{0} {1} --delay {2}".format(sys.executable, FAKE_APPIUM, delay_s), port=free_port(),
+                                name="bench_appium_{0}".format(i))
+        started = time.perf_counter()
+        manager.start_appium()
+        manager.wait_for_process(timeout_s=delay_s + 10)
+        ready.append(time.perf_counter() - started - delay_s)
+        started = time.perf_counter()
+        manager.stop_appium(force=True)
+        stop.append(time.perf_counter() - started)
+    result = {"overhead_" + k: v for k, v in percentiles(ready).items()}
+    result.update({"stop_" + k: v for k, v in percentiles(stop).items()})
+    result["runs"] = runs
+    return {"appium_time_to_ready": result}
+
+
+def bench_readiness_probes(runs: int, delay_s: float) -> dict:
+    results = {}
+    for name in ("output_pattern", "port_poll"):
+        overhead = []
+        for i in range(runs):
+            port = free_port()
+            probe = OutputPattern(AppiumManager.READY_PATTERN) if name == "output_pattern" else PortOpen(port)
+            process = ManagedProcess(cmd_list=[sys.executable, FAKE_APPIUM, "--port", str(port), "--delay",
+                                               str(delay_s)], name="bench_probe_{0}_{1}".format(name, i),
+                                     readiness_probes=[probe])
+            started = time.perf_counter()
+            process.start_instance_process()
+            ready = process.wait_until_ready(timeout_s=delay_s + 10)
+            overhead.append(time.perf_counter() - started - delay_s)
+            process.stop_instance_process()
+            assert ready, "Stand in appium never became ready"
+        results["ready_{0}".format(name)] = {"overhead_" + k: v for k, v in percentiles(overhead).items()}
+    return results
+
+
+def bench_output_capture(megabytes: float, line_bytes: int) -> dict:
+    this_process = psutil.Process()
+    rss_before = this_process.memory_info().rss
+    process = ManagedProcess(cmd_list=[sys.executable, CHATTY_LOGGER, "--megabytes", str(megabytes),
+                                       "--line-bytes", str(line_bytes)], name="bench_chatty")
+    started = time.perf_counter()
+    process.start_instance_process()
+    closed = process.get_output_pump().wait_closed(timeout_s=120)
+    elapsed = time.perf_counter() - started
+    process.wait_for_exit()
+    rss_after = this_process.memory_info().rss
+
+    expected_lines = int(megabytes * 1024 * 1024 / line_bytes)
+    captured = process.get_output_pump().line_count
+    sink = process.get_output_sink()
+    return {"output_capture": {
+        "megabytes": megabytes,
+        "elapsed_s": round(elapsed, 4),
+        "mb_per_s": round(megabytes / elapsed, 2),
+        "lines_per_s": round(captured / elapsed, 1),
+        "lines_expected": expected_lines,
+        "lines_captured": captured,
+        "lines_logged": sink.lines_written if sink else None,
+        "drained": closed,
+        "rss_growth_mb": round((rss_after - rss_before) / (1024 * 1024), 2)
+    }}
+
+
+def bench_teardown(sizes, depth: int, grace_s: float) -> dict:
+    results = {}
+    for ignore_term in (False, True):
+        for new_session in (False, True):
+            for children in sizes:
+                command = [sys.executable, FORKER, "--children", str(children), "--depth", str(depth)]
+                if ignore_term:
+                    command.append("--ignore-term")
+                process = ManagedProcess(cmd_list=command, name="bench_forker", new_session=new_session,
+                                         readiness_probes=[OutputPattern(r"^ready")])
+                process.start_instance_process()
+                if not process.wait_until_ready(timeout_s=30):
+                    raise RuntimeError("Forker with {0} children never became ready".format(children))
+                root = process.get_threads()[0]
+                tree_size = len(root.children(recursive=True)) + 1
+
+                started = time.perf_counter()
+                process.kill_with_children(process=root, grace_s=grace_s)
+                elapsed = time.perf_counter() - started
+                report = process.get_last_teardown()
+                survivors = [p for p in report.outcomes if still_running(p)] if report else []
+                key = "teardown_{0}{1}_{2}".format("stubborn_" if ignore_term else "",
+                                                   "group" if new_session else "tree", children)
+                results[key] = {
+                    "processes": tree_size,
+                    "teardown_s": round(elapsed, 4),
+                    "success": report.success if report else None,
+                    "used_process_group": report.used_process_group if report else None,
+                    "survivors": len(survivors)
+                }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ManagedProcess and AppiumManager benchmarks")
+    parser.add_argument("--runs", type=int, default=5, help="Repeats for start up benchmarks")
+    parser.add_argument("--appium-delay-s", type=float, default=0.5, help="Start up time of the stand in appium")
+    parser.add_argument("--megabytes", type=float, default=50, help="Output written by the chatty logger")
+    parser.add_argument("--line-bytes", type=int, default=120)
+    parser.add_argument("--tree-sizes", default="1,8,32,64", help="Comma separated child process counts")
+    parser.add_argument("--tree-depth", type=int, default=2)
+    parser.add_argument("--grace-s", type=float, default=1.0, help="Teardown grace period before SIGKILL")
+    parser.add_argument("--workdir", help="Working directory for process logs")
+    parser.add_argument("--output", help="Write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    output = os.path.abspath(args.output) if args.output else None
+    os.chdir(args.workdir if args.workdir else tempfile.mkdtemp(prefix="instatest_bench_"))
+
+    results = {}
+    results.update(bench_appium_ready(args.runs, args.appium_delay_s))
+    results.update(bench_readiness_probes(args.runs, args.appium_delay_s))
+    results.update(bench_output_capture(args.megabytes, args.line_bytes))
+    results.update(bench_teardown([int(s) for s in args.tree_sizes.split(",")], args.tree_depth, args.grace_s))
+
+    write_results("process", results, {
+        "runs": args.runs, "appium_delay_s": args.appium_delay_s, "megabytes": args.megabytes,
+        "line_bytes": args.line_bytes, "tree_sizes": args.tree_sizes, "tree_depth": args.tree_depth,
+        "grace_s": args.grace_s
+    }, output)
+
+
+if __name__ == "__main__":
+    main()
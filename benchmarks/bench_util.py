@@ -0,0 +1,119 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, List
+
+
+def measure(func: Callable[[], object], iterations: int, repeat: int = 5, warmup: int = 1) -> Dict:
+    """
+    Runs func iterations times per round and reports per call timings from the fastest and median rounds
+    """
+    for _ in range(warmup):
+        func()
+    rounds = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(iterations):
+            func()
+        rounds.append((time.perf_counter() - started) / iterations)
+    best = min(rounds)
+    return {
+        "iterations": iterations,
+        "repeat": repeat,
+        "calls": iterations * repeat + warmup,
+        "best_us": round(best * 1e6, 3),
+        "median_us": round(statistics.median(rounds) * 1e6, 3),
+        "ops_per_s": round(1 / best, 1) if best > 0 else None
+    }
+
+
+def percentiles(samples: List[float], scale: float = 1000.0) -> Dict:
+    """
+    p50/p90/max of samples (seconds), in milliseconds by default
+    """
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+    return {
+        "p50_ms": round(ordered[len(ordered) // 2] * scale, 3),
+        "p90_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.9))] * scale, 3),
+        "max_ms": round(ordered[-1] * scale, 3)
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def write_results(suite: str, results: Dict, config: Dict, output: str = None) -> Dict:
+    """
+    Writes results with enough context (revision, python, machine) to compare runs over time
+    """
+    document = {
+        "suite": suite,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": "{0} {1}".format(platform.system(), platform.machine()),
+        "config": config,
+        "results": results
+    }
+    text = json.dumps(document, indent=2)
+    if output:
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return document
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.1) -> List[str]:
+    """
+    Lists metrics that got worse by more than threshold.  Time metrics (*_us, *_ms, *_s) should go down, rates
+    (*_per_s, *_rate) up
+    """
+    regressions = []
+    for name, metrics in current.get("results", {}).items():
+        old_metrics = baseline.get("results", {}).get(name, {})
+        for metric, value in metrics.items():
+            old = old_metrics.get(metric, None)
+            if not isinstance(value, (int, float)) or not isinstance(old, (int, float)) or old == 0:
+                continue
+            change = (value - old) / abs(old)
+            if metric.endswith("_per_s") or metric.endswith("_rate"):
+                change = -change
+            elif not metric.endswith(("_us", "_ms", "_s")):
+                continue
+            if change > threshold:
+                regressions.append("{0}.{1}: {2} -> {3} ({4:+.0%})".format(name, metric, old, value, change))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files")
+    parser.add_argument("baseline")
+    parser.add_argument("current")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Allowed slowdown, 0.1 is 10%%")
+    args = parser.parse_args()
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for regression in regressions:
+        print(regression)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
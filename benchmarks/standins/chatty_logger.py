@@ -0,0 +1,29 @@
+"""
+Writes --megabytes of log lines as fast as it can, split between stdout and stderr, then exits.
+"""
+import argparse
+import sys
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--megabytes", type=float, default=20)
+    parser.add_argument("--line-bytes", type=int, default=120)
+    parser.add_argument("--stderr-every", type=int, default=10, help="Every nth line goes to stderr")
+    args = parser.parse_args()
+
+    padding = "x" * max(0, args.line_bytes - 40)
+    lines = int(args.megabytes * 1024 * 1024 / args.line_bytes)
+    out, err = sys.stdout, sys.stderr
+    for i in range(lines):
+        line = "[chatty] line {0:>10} {1}\n".format(i, padding)
+        if args.stderr_every and i % args.stderr_every == 0:
+            err.write(line)
+        else:
+            out.write(line)
+    out.flush()
+    err.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,39 @@
+"""
+Stand in for the appium server: prints its startup lines after --delay seconds, then serves /status on --port.
+Accepts (and ignores) --log and --base-path like the real server.
+"""
+import argparse
+import http.server
+import sys
+import time
+
+
+class StatusHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(b'{"value":{"ready":true}}')
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=4723)
+    parser.add_argument("--delay", type=float, default=1.0)
+    parser.add_argument("--log")
+    parser.add_argument("--base-path")
+    args = parser.parse_args()
+
+    print("[Appium] Welcome to Appium v1.22.3", flush=True)
+    time.sleep(args.delay)
+    server = http.server.HTTPServer(("127.0.0.1", args.port), StatusHandler)
+    print("[Appium] Appium REST http interface listener started on 0.0.0.0:{0}".format(args.port), flush=True)
+    sys.stdout.flush()
+    server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
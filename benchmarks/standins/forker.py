@@ -0,0 +1,56 @@
+"""
+Starts --children processes (--depth levels deep, split evenly), prints 'ready' once they are all running and
+sleeps.  With --ignore-term every process ignores SIGTERM so teardown has to escalate to SIGKILL.  With --setsid
+the first level of children leave the process group, like daemons do.
+"""
+import argparse
+import os
+import signal
+import sys
+import time
+
+
+def spawn(count: int, depth: int, ignore_term: bool, ready_fd: int, setsid: bool = False):
+    if depth <= 1:
+        per_child = [0] * count
+    else:
+        # First level fans out, each child starts its share of the rest below it
+        width = max(1, int(round(count ** (1.0 / depth))))
+        rest = count - width
+        per_child = [rest // width + (1 if i < rest % width else 0) for i in range(width)]
+    for below in per_child:
+        pid = os.fork()
+        if pid == 0:
+            if setsid:
+                os.setsid()
+            if ignore_term:
+                signal.signal(signal.SIGTERM, signal.SIG_IGN)
+            if below:
+                spawn(below, depth - 1, ignore_term, ready_fd)
+            os.write(ready_fd, b"x")
+            while True:
+                time.sleep(60)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--children", type=int, default=8)
+    parser.add_argument("--depth", type=int, default=1)
+    parser.add_argument("--ignore-term", action="store_true")
+    parser.add_argument("--setsid", action="store_true")
+    args = parser.parse_args()
+
+    read_fd, write_fd = os.pipe()
+    spawn(args.children, args.depth, args.ignore_term, write_fd, args.setsid)
+    started = 0
+    while started < args.children:
+        started += len(os.read(read_fd, args.children))
+    print("ready {0}".format(started), flush=True)
+    if args.ignore_term:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    while True:
+        time.sleep(60)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
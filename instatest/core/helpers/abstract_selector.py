@@ -2,6 +2,7 @@ from instatest.core import InstatestObject
 
 
 class AbstractSelector(InstatestObject):
+    __slots__ = ('_by', '_val')
     element_search_function = None
 
     def __init__(self, by, val):
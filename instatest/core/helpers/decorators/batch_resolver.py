@@ -0,0 +1,128 @@
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, List, Tuple
+
+from appium.webdriver.common.mobileby import MobileBy
+from selenium.common.exceptions import WebDriverException
+
+import instatest.core.driver.mobile_driver_context as mobile_driver_context
+from instatest.core.helpers.decorators.element_decorators import element, elements
+from instatest.core.helpers.mobile.page_snapshot import PageSnapshot
+from instatest.core.helpers.test_logger import get_logger
+
+log = get_logger('BatchResolver')
+
+
+def get_element_descriptors(obj_cls) -> Dict[str, element]:
+    """
+    All @element/@elements properties declared on a page object class (including base classes)
+    """
+    descriptors = {}
+    for cls in reversed(obj_cls.__mro__):
+        for name, value in vars(cls).items():
+            if isinstance(value, element):
+                descriptors[name] = value
+    return descriptors
+
+
+def resolve_all(obj, names: List[str] = None) -> Dict:
+    """
+        Resolves every element property on a page object with a single page source read and a single XPath lookup
+        instead of one find_element call per property.  Results are stored in the object's element cache.  With the
+        default FRESH policy each result is served to the next access of its property only, VALIDATE and TRUST keep
+        it like any other cached element.
+        Ex:
+        screen = LoginScreen()
+        resolve_all(screen)
+        screen.email_input.send_keys("me@example.com")  # served from cache
+
+    :param obj: Page object with a driver_context
+    :param names: Only resolve these properties.  Resolves all of them if None
+    :return: dict of property name to the WebElement (or list for @elements) that was found
+    """
+    context = getattr(obj, 'driver_context', None)  # type: mobile_driver_context.MobileDriverContext
+    if context is None:
+        raise AttributeError("Object {0} does not have driver context".format(type(obj)))
+
+    descriptors = get_element_descriptors(type(obj))
+    if names is not None:
+        descriptors = {n: d for n, d in descriptors.items() if n in names}
+
+    batched = []  # type: List[Tuple[str, element, object]]
+    individual = []
+    for name, descriptor in descriptors.items():
+        selector = descriptor._get_selector(context)
+        if descriptor.context is None and selector is not None and getattr(selector, 'to_xpath', None) and selector.to_xpath():
+            batched.append((name, descriptor, selector))
+        else:
+            individual.append(name)
+
+    resolved = {}
+    if batched:
+        batch_results = _resolve_batch(context, batched)
+        if batch_results is None:
+            individual.extend(name for name, _, _ in batched)
+        else:
+            for name, descriptor, _ in batched:
+                found = batch_results[name]
+                descriptor._store_cached(obj, found)
+                resolved[name] = found
+
+    if individual:
+        log.debug("Resolving {0} properties individually: {1}".format(len(individual), individual))
+    for name in individual:
+        resolved[name] = getattr(obj, name)
+    return resolved
+
+
+def _resolve_batch(context, batched):
+    # The union is returned in document order, so evaluating the same selectors against the page source
+    # tells us which result belongs to which property
+    try:
+        snapshot = PageSnapshot.capture(context)
+    except (WebDriverException, ElementTree.ParseError) as e:
+        log.warning("Could not read page source for batch lookup. {0}".format(e))
+        return None
+
+    positions = {name: [] for name, _, _ in batched}
+    match_count = 0
+    for node in snapshot.nodes:
+        matched = False
+        for name, _, selector in batched:
+            if selector.matches(node.attributes):
+                positions[name].append(match_count)
+                matched = True
+        if matched:
+            match_count += 1
+
+    found = []
+    if match_count > 0:
+        union = " | ".join(selector.to_xpath() for _, _, selector in batched)
+        try:
+            found = context.find_elements(MobileBy.XPATH, union)
+        except WebDriverException as wde:
+            log.warning("WebDriverException in batch lookup. {0}".format(wde))
+            return None
+
+    if len(found) != match_count:
+        log.warning("Screen changed during batch lookup. Page source matched {0}, driver found {1}".format(
+            match_count, len(found)))
+        return None
+
+    results = {}
+    for name, descriptor, _ in batched:
+        matched_elements = [found[i] for i in positions[name]]
+        if isinstance(descriptor, elements):
+            results[name] = matched_elements
+        else:
+            results[name] = matched_elements[0] if matched_elements else None
+    log.debug("Batch resolved {0} properties with {1} elements".format(len(batched), match_count))
+    return results
+
+
+class BatchResolvable:
+    """
+    Mixin for page objects that adds prefetch() for resolving all element properties at once
+    """
+
+    def prefetch(self, *names) -> Dict:
+        return resolve_all(self, list(names) if names else None)
@@ -1,10 +1,16 @@
+import functools
+import time
+import xml.etree.ElementTree as ElementTree
+from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
 
 from appium.webdriver import WebElement
 from selenium.common.exceptions import StaleElementReferenceException, WebDriverException
 
 import instatest.core.driver.mobile_driver_context as mobile_driver_context
+from instatest.core.helpers.driver_instrumentation import instrumented, recorder
 from instatest.core.helpers.mobile.mobile_selector import MobileSelector
+from instatest.core.helpers.mobile.page_snapshot import PageSnapshot, SnapshotElement
 from instatest.core.helpers.selectors.selectors import AndroidAutomatorSelector, Selector
 from instatest.core.helpers.test_logger import get_logger
 from instatest.core.mobile.devices import DevicePlatform
@@ -12,12 +18,120 @@ from instatest.core.mobile.devices import DevicePlatform
 log = get_logger('ElementDecorator')
 
 
+class CachePolicy(Enum):
+    FRESH = "fresh"  # Always look the element up again
+    VALIDATE = "validate"  # Reuse the cached element if a staleness check passes.  @elements lists aren't cached
+    TRUST = "trust"  # Reuse the cached element without checking for cache_ttl_s seconds, then validate
+
+
+# Caching is opt-in per page object (element_cache_policy) or per property (cache_policy)
+DEFAULT_CACHE_POLICY = CachePolicy.FRESH
+DEFAULT_CACHE_TTL_S = 2.0
+
+
+class CacheStats:
+    """
+    Counters for the element cache.  Reset between tests to get per test numbers.
+
+    trusted_hits are lookups served without any driver call, validated_hits replaced a find with a staleness check
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.trusted_hits = 0
+        self.validated_hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.invalidations = 0
+
+    @property
+    def hits(self) -> int:
+        return self.trusted_hits + self.validated_hits
+
+    @property
+    def round_trips_saved(self) -> int:
+        return self.trusted_hits
+
+    def to_dict(self) -> Dict:
+        return {
+            "hits": self.hits,
+            "trusted_hits": self.trusted_hits,
+            "validated_hits": self.validated_hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "invalidations": self.invalidations,
+            "round_trips_saved": self.round_trips_saved
+        }
+
+    def __str__(self):
+        return str(self.to_dict())
+
+
+cache_stats = CacheStats()
+_navigation_epoch = 0
+
+
+class CachedElement:
+    __slots__ = ('element', 'cached_at', 'epoch')
+
+    def __init__(self, element):
+        self.element = element
+        self.cached_at = time.time()
+        self.epoch = _navigation_epoch
+
+
 def get_cache(obj) -> Dict:
     if not hasattr(obj, 'selector_cache'):
         obj.__dict__['selector_cache'] = {}
     return getattr(obj, "selector_cache")
 
 
+def get_cache_stats() -> CacheStats:
+    return cache_stats
+
+
+def invalidate_cache(obj=None, name: str = None):
+    """
+    Drop cached elements.
+
+    :param obj: Page object to clear.  If None every cache is invalidated (ex: after navigating to a new screen)
+    :param name: Only drop the cached element for this property
+    """
+    global _navigation_epoch
+    if obj is None:
+        _navigation_epoch += 1
+        cache_stats.invalidations += 1
+        return
+    cache = get_cache(obj)
+    if name is None:
+        cache_stats.invalidations += len(cache)
+        cache.clear()
+    elif cache.pop(name, None) is not None:
+        cache_stats.invalidations += 1
+
+
+def navigates(func: Callable) -> Callable:
+    """
+        Marks a page object method as one that changes the screen.  Cached elements are invalidated after it runs
+        Ex:
+        class LoginScreen:
+            @navigates
+            def submit(self):
+                self.submit_button.click()
+    """
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        finally:
+            invalidate_cache()
+
+    return wrapper
+
+
 def lookup_elements(context: mobile_driver_context.MobileDriverContext,
                     selector: MobileSelector):
     return context.find_elements_by(selector)
@@ -25,16 +139,17 @@ def lookup_elements(context: mobile_driver_context.MobileDriverContext,
 
 def element_stale(obj, element: WebElement):
     is_stale = False
+    obj_log = getattr(obj, 'log', log)
     try:
         element.is_displayed()
     except StaleElementReferenceException as stale_ex:
         is_stale = True
-        obj.log.warning("cached element is stale")
+        obj_log.warning("cached element is stale")
     except WebDriverException as wde:
-        obj.log.warning("Error checking for staleness of element.  {0}".format(
+        obj_log.warning("Error checking for staleness of element.  {0}".format(
             wde.msg))
     except Exception as e:
-        obj.log.warning("Unknown exception checking staleness of element")
+        obj_log.warning("Unknown exception checking staleness of element")
         raise e
     return is_stale
 
@@ -42,6 +157,8 @@ def element_stale(obj, element: WebElement):
 def element_in_cache(obj, cache, func_name):
     if func_name in cache:
         cached_element = cache[func_name]
+        if isinstance(cached_element, CachedElement):
+            cached_element = cached_element.element
         if cached_element:
             if isinstance(cached_element, WebElement):
                 return not element_stale(obj, cached_element)
@@ -70,10 +187,16 @@ class element:
 
                        Keys mapped to types of selectors: id, partial_id, text, partial_text, xpath {ex: partial_text='Input'}
                        or pass the name of the platform you're specifying {ex: android=IdSelector('foo')}
+                       cache_policy and cache_ttl_s override the owner's element_cache_policy/element_cache_ttl_s
         """
         self.context = None
         self.selector_map = {}
+        self._name = None
+        self.cache_policy = None  # type: Optional[CachePolicy]
+        self.cache_ttl_s = None  # type: Optional[float]
         if kwargs and len(kwargs) > 0:
+            self.cache_policy = kwargs.pop('cache_policy', None)
+            self.cache_ttl_s = kwargs.pop('cache_ttl_s', None)
             if selector is None:
                 selector = self._parse_selector_argument(kwargs)
             self.context = kwargs.pop('dc', None)
@@ -83,6 +206,13 @@ class element:
                     self.selector_map[platform] = s
         self.selector = selector
 
+    def __set_name__(self, owner, name):
+        self._name = name
+
+    @property
+    def cache_key(self):
+        return self._name if self._name else id(self)
+
     def _parse_selector_argument(self, selector_args):
         # Return first match
         for choice in self.selector_choices:
@@ -108,9 +238,26 @@ class element:
         return None
 
     def __call__(self, selector=None, *args, **kwargs):
+        if callable(selector):
+            # Decorating the property function - keep platform selectors and cache settings
+            self._name = selector.__name__
+            return self
         return element(self.selector, args, kwargs)
 
     def __get__(self, obj, obj_cls, *args, **kwargs) -> WebElement:
+        if obj is None:
+            return self
+        if recorder.enabled:
+            recorder.screen = obj_cls.__name__
+        context = self._get_owner_context(obj, obj_cls)
+        selector = self._get_selector(context)
+        if selector is None:
+            raise AttributeError(
+                "Could not find appropriate selector for this property")
+
+        return self._get_cached(obj, context, selector, self._get_element)
+
+    def _get_owner_context(self, obj, obj_cls) -> mobile_driver_context.MobileDriverContext:
         context = None
         if self.context:
             context = self.context
@@ -121,12 +268,7 @@ class element:
         if context is None:
             raise AttributeError(
                 "Object {0} does not have driver context".format(obj_cls))
-        selector = self._get_selector(context)
-        if selector is None:
-            raise AttributeError(
-                "Could not find appropriate selector for this property")
-
-        return self._get_element(context, selector)
+        return context
 
     def _get_selector(self,
                       context: mobile_driver_context.MobileDriverContext):
@@ -138,6 +280,69 @@ class element:
             element_selector = self.selector
         return element_selector
 
+    def _get_cache_policy(self, obj):
+        policy = self.cache_policy
+        if policy is None:
+            policy = getattr(obj, 'element_cache_policy', DEFAULT_CACHE_POLICY)
+        ttl_s = self.cache_ttl_s
+        if ttl_s is None:
+            ttl_s = getattr(obj, 'element_cache_ttl_s', DEFAULT_CACHE_TTL_S)
+        return policy, ttl_s
+
+    def _get_cached(self, obj, context, selector, lookup: Callable[[Any, Any], Any]):
+        policy, ttl_s = self._get_cache_policy(obj)
+        key = self.cache_key
+        cache = get_cache(obj)
+        if policy == CachePolicy.FRESH:
+            # Only batch resolved elements are cached under FRESH.  They're served once, then looked up again
+            entry = cache.pop(key, None)  # type: CachedElement
+            if entry is not None and entry.epoch == _navigation_epoch:
+                cache_stats.trusted_hits += 1
+                return entry.element
+        else:
+            entry = cache.get(key, None)  # type: CachedElement
+            if entry is not None:
+                if self._entry_valid(obj, entry, policy, ttl_s):
+                    return entry.element
+                del cache[key]
+
+        cache_stats.misses += 1
+        try:
+            found = lookup(context, selector)
+        except StaleElementReferenceException as stale_ex:
+            # Parent element went stale, nothing cached on this object can be trusted
+            log.warning("Stale element looking up {0}, invalidating cache. {1}".format(key, stale_ex))
+            invalidate_cache(obj)
+            found = None
+        if found and policy != CachePolicy.FRESH:
+            cache[key] = CachedElement(found)
+        return found
+
+    def _store_cached(self, obj, found):
+        """
+        Puts an element resolved elsewhere (ex: batch resolution) into the owner's cache.  Stored whatever the policy,
+        under FRESH it is served on the next access only
+        """
+        if found:
+            get_cache(obj)[self.cache_key] = CachedElement(found)
+
+    def _entry_valid(self, obj, entry: CachedElement, policy: CachePolicy, ttl_s: float) -> bool:
+        if entry.epoch != _navigation_epoch:
+            return False
+        if policy == CachePolicy.TRUST and time.time() - entry.cached_at <= ttl_s:
+            cache_stats.trusted_hits += 1
+            return True
+        if self._is_stale(obj, entry.element):
+            cache_stats.stale += 1
+            return False
+        entry.cached_at = time.time()
+        cache_stats.validated_hits += 1
+        return True
+
+    def _is_stale(self, obj, cached) -> bool:
+        return element_stale(obj, cached)
+
+    @instrumented("element._get_element", lambda self, context, selector: selector)
     def _get_element(self, context: mobile_driver_context.MobileDriverContext,
                      selector) -> Optional[WebElement]:
         el: WebElement = None
@@ -148,6 +353,8 @@ class element:
                 el = context.find_element(by, val)
             else:
                 el = context.find_element_by(selector)
+        except StaleElementReferenceException:
+            raise
         except WebDriverException as wde:
             log.warning("WebDriverException looking up element. {0}".format(wde))
 
@@ -201,9 +408,16 @@ class elements(element):
 
                        Keys mapped to types of selectors: id, partial_id, text, partial_text, xpath {ex: partial_text='Input'}
                        or pass the name of the platform you're specifying {ex: android=IdSelector('foo')}
+                       cache_policy and cache_ttl_s override the owner's element_cache_policy/element_cache_ttl_s
         """
+        self.context = None
         self.selector_map = {}
+        self._name = None
+        self.cache_policy = None  # type: Optional[CachePolicy]
+        self.cache_ttl_s = None  # type: Optional[float]
         if kwargs and len(kwargs) > 0:
+            self.cache_policy = kwargs.pop('cache_policy', None)
+            self.cache_ttl_s = kwargs.pop('cache_ttl_s', None)
             if selector is None:
                 selector = self._parse_selector_argument(kwargs)
             for platform_name, s in kwargs.items():
@@ -213,9 +427,16 @@ class elements(element):
         self.selector = selector
 
     def __call__(self, selector=None, *args, **kwargs):
+        if callable(selector):
+            self._name = selector.__name__
+            return self
         return elements(self.selector, args, kwargs)
 
     def __get__(self, obj, obj_cls, *args, **kwargs) -> List[WebElement]:
+        if obj is None:
+            return self
+        if recorder.enabled:
+            recorder.screen = obj_cls.__name__
         context = getattr(
             obj, 'driver_context',
             None)  # type: mobile_driver_context.MobileDriverContext
@@ -227,15 +448,116 @@ class elements(element):
             raise AttributeError(
                 "Could not find appropriate selector for this property")
 
-        return self._get_elements(context, selector)
+        return self._get_cached(obj, context, selector, self._get_elements)
+
+    def records(self, obj, snapshot: PageSnapshot = None) -> List[SnapshotElement]:
+        """
+            Text, displayed, enabled and bounds for every matching element from a single page source read,
+            instead of several driver calls per element.
+            Ex:
+            rows = FooScreen.jobs.records(f)
+            visible_titles = [r.text for r in rows if r.displayed]
 
+        :param obj: Page object that owns this property
+        :param snapshot: Reuse an existing snapshot instead of reading the page source.  Selectors the snapshot can't
+        evaluate faithfully (see PageSnapshot.can_evaluate) are looked up with the driver instead and each value
+        read from a record costs one driver call per element (made on first use), like reading the element itself
+        """
+        context = getattr(obj, 'driver_context', None)  # type: mobile_driver_context.MobileDriverContext
+        if context is None:
+            raise AttributeError("Object {0} does not have driver context".format(type(obj)))
+        selector = self._get_selector(context)
+        if selector is None:
+            raise AttributeError("Could not find appropriate selector for this property")
+
+        if PageSnapshot.can_evaluate(selector):
+            try:
+                if snapshot is None:
+                    snapshot = PageSnapshot.capture(context)
+                return snapshot.find_all(selector)
+            except NotImplementedError as nie:
+                log.debug("Selector can't be evaluated from the page source. {0}".format(nie))
+            except (WebDriverException, ElementTree.ParseError) as e:
+                log.warning("Could not read page source for {0}. {1}".format(self.cache_key, e))
+
+        log.debug("Reading attributes from each element for {0}, selector {1}".format(self.cache_key, selector))
+        found = self._get_elements(context, selector) or []
+        return [_ElementRecord(i, e) for i, e in enumerate(found)]
+
+    def _get_cache_policy(self, obj):
+        # Probing cached elements can't tell if rows were added or removed, so VALIDATE looks the list up again
+        policy, ttl_s = super(elements, self)._get_cache_policy(obj)
+        if policy == CachePolicy.VALIDATE:
+            policy = CachePolicy.FRESH
+        return policy, ttl_s
+
+    def _entry_valid(self, obj, entry: CachedElement, policy: CachePolicy, ttl_s: float) -> bool:
+        # A list is only reused while TRUST's ttl lasts, after that it is looked up again
+        if entry.epoch != _navigation_epoch or policy != CachePolicy.TRUST:
+            return False
+        if time.time() - entry.cached_at <= ttl_s:
+            cache_stats.trusted_hits += 1
+            return True
+        return False
+
+    @instrumented("elements._get_elements", lambda self, context, selector: selector)
     def _get_elements(self, context: mobile_driver_context.MobileDriverContext,
                       selector) -> Optional[List[WebElement]]:
         elements = None
         try:
             by, val = selector.get_tuple()
             elements = context.find_elements(by, val)
+        except StaleElementReferenceException:
+            raise
         except WebDriverException as wde:
             log.warning("WebDriverException looking up elements. {0}".format(wde))
 
         return elements
+
+
+class _ElementRecord(SnapshotElement):
+    """
+    Record backed by a live element, for selectors the page source can't answer.  Every value is one driver call, made
+    the first time it is used and kept after that
+    """
+    __slots__ = ('_web_element',)
+
+    def __init__(self, index: int, web_element: WebElement):
+        # tag is left unset and read on first use through __getattr__
+        self.index = index
+        self.attributes = {}
+        self.parent = None
+        self._web_element = web_element
+
+    def __getattr__(self, name):
+        if name == 'tag':
+            self.tag = self._web_element.tag_name
+            return self.tag
+        raise AttributeError(name)
+
+    def _read(self, name: str, read: Callable[[], Any]):
+        if name not in self.attributes:
+            self.attributes[name] = read()
+        return self.attributes[name]
+
+    def get_attribute(self, name):
+        return self._read(name, lambda: self._web_element.get_attribute(name))
+
+    @property
+    def text(self) -> Optional[str]:
+        return self._read('text', lambda: self._web_element.text)
+
+    @property
+    def displayed(self) -> bool:
+        return self._read('displayed', lambda: str(self._web_element.is_displayed()).lower()) == 'true'
+
+    @property
+    def enabled(self) -> bool:
+        return self._read('enabled', lambda: str(self._web_element.is_enabled()).lower()) == 'true'
+
+    @property
+    def bounds(self):
+        if 'x' not in self.attributes:
+            rect = self._web_element.rect
+            self.attributes.update({k: rect[k] for k in ('x', 'y', 'width', 'height')})
+        return super(_ElementRecord, self).bounds
@@ -0,0 +1,235 @@
+import bisect
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+FOUND = "found"
+NOT_FOUND = "not_found"
+STALE = "stale"
+ERROR = "error"
+
+# Upper bounds of the latency histogram buckets in milliseconds, the last bucket is everything slower
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+
+class SelectorStats:
+    __slots__ = ('calls', 'total_s', 'max_s', 'buckets', 'outcomes')
+
+    def __init__(self):
+        self.calls = 0
+        self.total_s = 0.0
+        self.max_s = 0.0
+        self.buckets = [0] * (len(BUCKETS_MS) + 1)
+        self.outcomes = {}  # type: Dict[str, int]
+
+    def add(self, duration_s: float, outcome: str):
+        self.calls += 1
+        self.total_s += duration_s
+        if duration_s > self.max_s:
+            self.max_s = duration_s
+        self.buckets[bisect.bisect_left(BUCKETS_MS, duration_s * 1000)] += 1
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def merge(self, other: 'SelectorStats'):
+        self.calls += other.calls
+        self.total_s += other.total_s
+        self.max_s = max(self.max_s, other.max_s)
+        self.buckets = [a + b for a, b in zip(self.buckets, other.buckets)]
+        for outcome, count in other.outcomes.items():
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + count
+
+    def percentile_ms(self, percentile: float) -> Optional[float]:
+        """
+        Upper bound of the bucket holding the percentile.  None if it falls in the last, unbounded bucket
+        """
+        if self.calls == 0:
+            return 0.0
+        wanted = percentile / 100.0 * self.calls
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if seen >= wanted:
+                return float(BUCKETS_MS[i]) if i < len(BUCKETS_MS) else None
+        return None
+
+    def to_dict(self) -> Dict:
+        return {
+            "calls": self.calls,
+            "total_ms": round(self.total_s * 1000, 3),
+            "mean_ms": round(self.total_s * 1000 / self.calls, 3) if self.calls else 0.0,
+            "max_ms": round(self.max_s * 1000, 3),
+            "p95_ms": self.percentile_ms(95),
+            "histogram_ms": {("<={0}".format(b) if i < len(BUCKETS_MS) else ">{0}".format(BUCKETS_MS[-1])): c
+                             for i, (b, c) in enumerate(zip(BUCKETS_MS + (None,), self.buckets)) if c},
+            "outcomes": dict(self.outcomes)
+        }
+
+
+StatsKey = Tuple[str, str, str, str]  # test, screen, lookup path, selector
+
+
+class RoundTripRecorder:
+    """
+        Records time spent in driver element lookups, per test, screen, lookup path and selector.
+        Disabled by default, enable with INSTATEST_TRACE_DRIVER=1 or recorder.enable().  While disabled an
+        instrumented lookup costs one attribute check.
+        Ex:
+        recorder.enable()
+        with recorder.test("test_login"):
+            ...
+        recorder.export("out/driver_round_trips.json")
+        print(recorder.format_top(10))
+    """
+    NO_TEST = "<no test>"
+    NO_SCREEN = "<no screen>"
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._stats = {}  # type: Dict[StatsKey, SelectorStats]
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._stats = {}
+
+    @property
+    def current_test(self) -> str:
+        return getattr(self._local, 'test', self.NO_TEST)
+
+    @property
+    def screen(self) -> str:
+        return getattr(self._local, 'screen', self.NO_SCREEN)
+
+    @screen.setter
+    def screen(self, screen: str):
+        self._local.screen = screen
+
+    @contextmanager
+    def test(self, test_name: str):
+        previous_test, previous_screen = self.current_test, self.screen
+        self._local.test = test_name
+        self._local.screen = self.NO_SCREEN
+        try:
+            yield self
+        finally:
+            self._local.test = previous_test
+            self._local.screen = previous_screen
+
+    def record(self, path: str, selector: Any, duration_s: float, outcome: str):
+        key = (self.current_test, self.screen, path, str(selector))
+        with self._lock:
+            stats = self._stats.get(key, None)
+            if stats is None:
+                stats = self._stats[key] = SelectorStats()
+            stats.add(duration_s, outcome)
+
+    def timed(self, path: str, selector: Any, call: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        outcome = ERROR
+        try:
+            result = call()
+            outcome = NOT_FOUND if result is None or (isinstance(result, list) and not result) else FOUND
+            return result
+        except StaleElementReferenceException:
+            outcome = STALE
+            raise
+        except (NoSuchElementException, TimeoutException):
+            outcome = NOT_FOUND
+            raise
+        finally:
+            self.record(path, selector, time.perf_counter() - started, outcome)
+
+    def _snapshot(self) -> Dict[StatsKey, SelectorStats]:
+        with self._lock:
+            snapshot = {}
+            for key, stats in self._stats.items():
+                copy = snapshot[key] = SelectorStats()
+                copy.merge(stats)
+            return snapshot
+
+    def report(self) -> Dict:
+        """
+        {"tests": {test: {"screens": {screen: {"calls", "total_ms", "selectors": [...]}}}}}
+        """
+        tests = {}
+        for (test, screen, path, selector), stats in sorted(self._snapshot().items()):
+            test_entry = tests.setdefault(test, {"calls": 0, "total_ms": 0.0, "screens": {}})
+            screen_entry = test_entry["screens"].setdefault(screen, {"calls": 0, "total_ms": 0.0, "selectors": []})
+            entry = stats.to_dict()
+            entry.update({"path": path, "selector": selector})
+            screen_entry["selectors"].append(entry)
+            for totals in (test_entry, screen_entry):
+                totals["calls"] += stats.calls
+                totals["total_ms"] = round(totals["total_ms"] + entry["total_ms"], 3)
+        for test_entry in tests.values():
+            for screen_entry in test_entry["screens"].values():
+                screen_entry["selectors"].sort(key=lambda e: -e["total_ms"])
+        return {"tests": tests}
+
+    def export(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+    def top(self, count: int = 10) -> List[Tuple[str, str, SelectorStats]]:
+        """
+        Selectors with the most total lookup time across every test and screen
+        :return: [(lookup path, selector, stats)]
+        """
+        merged = {}  # type: Dict[Tuple[str, str], SelectorStats]
+        for (_, _, path, selector), stats in self._snapshot().items():
+            merged.setdefault((path, selector), SelectorStats()).merge(stats)
+        ranked = sorted(merged.items(), key=lambda item: -item[1].total_s)[:count]
+        return [(path, selector, stats) for (path, selector), stats in ranked]
+
+    def format_top(self, count: int = 10) -> str:
+        rows = [("total ms", "calls", "mean ms", "p95 ms", "not found", "stale", "path", "selector")]
+        for path, selector, stats in self.top(count):
+            summary = stats.to_dict()
+            p95 = summary["p95_ms"]
+            rows.append(("{0:.1f}".format(summary["total_ms"]), str(stats.calls), "{0:.1f}".format(summary["mean_ms"]),
+                         ">{0}".format(BUCKETS_MS[-1]) if p95 is None else "{0:g}".format(p95),
+                         str(stats.outcomes.get(NOT_FOUND, 0)), str(stats.outcomes.get(STALE, 0)), path, selector))
+        widths = [max(len(row[i]) for row in rows) for i in range(len(rows[0]) - 1)]
+        lines = ["  ".join(cell.rjust(width) for cell, width in zip(row, widths)) + "  " + row[-1] for row in rows]
+        return "\n".join(lines)
+
+
+recorder = RoundTripRecorder(enabled=os.environ.get("INSTATEST_TRACE_DRIVER", "") not in ("", "0", "false"))
+
+
+def instrumented(path: str, selector_of: Callable[..., Any]) -> Callable:
+    """
+        Times a lookup method with the recorder when it is enabled
+        Ex:
+        @instrumented("element._get_element", lambda self, context, selector: selector)
+        def _get_element(self, context, selector):
+            ...
+
+    :param path: Name the lookup is reported under
+    :param selector_of: Gets the selector from the method's arguments
+    """
+
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not recorder.enabled:
+                return func(*args, **kwargs)
+            return recorder.timed(path, selector_of(*args, **kwargs), lambda: func(*args, **kwargs))
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,123 @@
+import hashlib
+import mmap
+import os
+import threading
+from typing import Dict, Optional, Tuple
+
+DEFAULT_ALGORITHM = "md5"
+READ_SIZE = 1024 * 1024
+MMAP_THRESHOLD = 16 * 1024 * 1024
+
+FileKey = Tuple[str, int, int, int]
+
+
+class FileFingerprint:
+    """
+        Digest of a file along with the stat fields it was calculated from.  A fingerprint is still valid as long as
+        path, size, mtime_ns and inode all match the file on disk, so unchanged builds are never hashed again.
+        Ex:
+        fingerprint = fingerprint_file("builds/app-release.apk", algorithm="blake2b", previous=app.fingerprint)
+    """
+    __slots__ = ('path', 'size', 'mtime_ns', 'inode', 'algorithm', 'digest')
+
+    def __init__(self, path: str, size: int, mtime_ns: int, inode: int, algorithm: str, digest: str):
+        self.path = path
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.inode = inode
+        self.algorithm = algorithm
+        self.digest = digest
+
+    @property
+    def key(self) -> FileKey:
+        return self.path, self.size, self.mtime_ns, self.inode
+
+    def matches(self, stat: os.stat_result, path: str = None, algorithm: str = None) -> bool:
+        if path is not None and os.path.abspath(path) != self.path:
+            return False
+        if algorithm is not None and algorithm != self.algorithm:
+            return False
+        return (self.size, self.mtime_ns, self.inode) == (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+
+    def export(self) -> dict:
+        return {
+            "path": self.path,
+            "size": self.size,
+            "mtime_ns": self.mtime_ns,
+            "inode": self.inode,
+            "algorithm": self.algorithm,
+            "digest": self.digest
+        }
+
+    @classmethod
+    def load(cls, obj_data: dict) -> Optional['FileFingerprint']:
+        try:
+            return cls(obj_data['path'], int(obj_data['size']), int(obj_data['mtime_ns']), int(obj_data['inode']),
+                       obj_data['algorithm'], obj_data['digest'])
+        except (KeyError, TypeError, ValueError):
+            return None
+
+    def __repr__(self):
+        return "FileFingerprint({0}, {1}:{2})".format(self.path, self.algorithm, self.digest)
+
+
+_cache = {}  # type: Dict[Tuple[FileKey, str], FileFingerprint]
+_cache_lock = threading.Lock()
+hash_count = 0  # Number of files actually read and hashed in this process
+
+
+def hash_file(path: str, algorithm: str = DEFAULT_ALGORITHM, read_size: int = READ_SIZE) -> str:
+    """
+    Hashes a file with any hashlib algorithm.  Large files are mapped into memory and hashed in one call, smaller ones
+    are read in read_size chunks
+    """
+    global hash_count
+    digest = hashlib.new(algorithm)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size >= MMAP_THRESHOLD:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                digest.update(mapped)
+        else:
+            buffer = bytearray(read_size)
+            view = memoryview(buffer)
+            while True:
+                read = f.readinto(buffer)
+                if not read:
+                    break
+                digest.update(view[:read])
+    hash_count += 1
+    return digest.hexdigest()
+
+
+def fingerprint_file(path: str, algorithm: str = DEFAULT_ALGORITHM,
+                     previous: FileFingerprint = None) -> FileFingerprint:
+    """
+    Returns the fingerprint of path, only hashing the file when it isn't matched by previous or by a fingerprint
+    already calculated in this process
+    :param previous: Fingerprint persisted from an earlier run, ex: loaded from the application JSON
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    if previous is not None and previous.matches(stat, path, algorithm):
+        return previous
+
+    key = (path, stat.st_size, stat.st_mtime_ns, stat.st_ino)
+    with _cache_lock:
+        cached = _cache.get((key, algorithm))
+    if cached is not None:
+        return cached
+
+    fingerprint = FileFingerprint(path, stat.st_size, stat.st_mtime_ns, stat.st_ino, algorithm,
+                                  hash_file(path, algorithm))
+    if not fingerprint.matches(os.stat(path)):
+        # File changed while it was being hashed, don't keep a digest that may not match either version
+        return fingerprint
+    with _cache_lock:
+        _cache[(key, algorithm)] = fingerprint
+    return fingerprint
+
+
+def clear_fingerprint_cache():
+    with _cache_lock:
+        _cache.clear()
@@ -9,6 +9,7 @@ from instatest.core.target_property import TargetProperty
 
 
 class AndroidSelector(MobileSelector):
+    __slots__ = ()
     SUPPORTED_PROPERTIES = (
         TargetProperty.Text, TargetProperty.ResourceId, TargetProperty.Description, TargetProperty.AccessibilityId,
         TargetProperty.ContentDescription, TargetProperty.XPath, TargetProperty.Class)
@@ -28,20 +29,37 @@ class AndroidSelector(MobileSelector):
         MobileOperator.Equals,
         MobileOperator.Matches
     )
+    SOURCE_ATTRIBUTES = {
+        TargetProperty.Text: 'text',
+        TargetProperty.ResourceId: 'resource-id',
+        TargetProperty.ContentDescription: 'content-desc',
+        TargetProperty.Description: 'content-desc',
+        TargetProperty.AccessibilityId: 'content-desc',
+        TargetProperty.AccessibilityLabel: 'content-desc',
+        TargetProperty.Class: 'class'
+    }
+    NATIVE_LOOKUPS = {
+        TargetProperty.ResourceId: MobileBy.ID,
+        TargetProperty.ContentDescription: MobileBy.ACCESSIBILITY_ID,
+        TargetProperty.Description: MobileBy.ACCESSIBILITY_ID,
+        TargetProperty.AccessibilityId: MobileBy.ACCESSIBILITY_ID,
+        TargetProperty.Class: MobileBy.CLASS_NAME
+    }
 
     @classmethod
     def ByXPath(cls, xpath):
         a = AndroidSelector(MobileBy.XPATH, TargetProperty.XPath, MobileOperator.Equals, xpath)
-        return a
+        return cls.intern(a)
 
     @classmethod
     def ById(cls, val):
-        return AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.ContentDescription, MobileOperator.Equals,
-                               val)
+        return cls.intern(AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.ContentDescription,
+                                          MobileOperator.Equals, val))
 
     @classmethod
     def ByResourceId(cls, val):
-        return AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.ResourceId, MobileOperator.Equals, val)
+        return cls.intern(
+            AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.ResourceId, MobileOperator.Equals, val))
 
     def __init__(self, by, compare_to, operator, value):
         super(AndroidSelector, self).__init__(DevicePlatform.ANDROID, by, compare_to, operator, value)
@@ -64,12 +82,12 @@ class AndroidSelector(MobileSelector):
         
     '''
 
-    def build_predicate(self):
+    def _compile_predicate(self):
         if self.by == MobileBy.XPATH or self.by == MobileBy.ID or self.compare_to is None or self.operator is None:
             return self.value
         target_property = self.compare_to
 
-        valid_selector = self._validate_selector(target_property, self.operator)
+        valid_selector = self._validate_selector(target_property, self._get_effective_operator())
 
         if not valid_selector:
             self.log.warning(
@@ -86,15 +104,16 @@ class AndroidSelector(MobileSelector):
 
         return selector
 
-    def get_tuple(self):
-        if self.by == MobileBy.ACCESSIBILITY_ID or self.by == MobileBy.ID:
-            return MobileBy.ID, self.value
-        return self.by, self.build_predicate()
-
     @property
     def selector(self):
         return self.build_predicate()
 
+    def source_attribute(self):
+        # Only UiSelector lookups map to a single attribute.  Appium's ID strategy may prepend the app package
+        if self.by != MobileBy.ANDROID_UIAUTOMATOR or self.operator is None:
+            return None
+        return super(AndroidSelector, self).source_attribute()
+
     def _validate_selector(self, target_property, operator, hide_exception=False):
         if target_property not in self.SUPPORTED_PROPERTIES:
             self.log.warning("Currently {0} is not supported".format(target_property))
@@ -123,6 +142,12 @@ class AndroidSelector(MobileSelector):
 
         return True
 
+    def _get_effective_operator(self):
+        # UiSelector has no EndsWith - it is sent as a Matches regex
+        if self.operator == MobileOperator.EndsWith:
+            return MobileOperator.Matches
+        return self.operator
+
     def _get_selector_method(self):
         sel_method = ""
         if self.operator == MobileOperator.Contains:
@@ -132,8 +157,7 @@ class AndroidSelector(MobileSelector):
         elif self.operator in [MobileOperator.EndsWith, MobileOperator.Matches]:
             regex_match = "Matches(\"{0}\")"
             if self.operator == MobileOperator.EndsWith:
-                self.operator = MobileOperator.Matches  # Switch to regex search
-                regex_match = "Matches(\".*{0}$\")"
+                regex_match = "Matches(\".*{0}$\")"  # Switch to regex search
             sel_method = regex_match  # ex: "textMatches('.*text$')
         elif self.operator == MobileOperator.Equals:
             sel_method = "(\"{0}\")"  # Ex: "text('text')
@@ -1,40 +1,152 @@
+import hashlib
+import json
+import os
+import time
+
 from instatest.core.configuration.instatest_configuration import InstatestConfiguration
 from instatest.core.helpers.exceptions import ExternalProcessError
+from instatest.core.helpers.mobile.appium_registry import AppiumRegistry
 from instatest.core.helpers.process.managed_process import ManagedProcess
+from instatest.core.helpers.process.readiness import HttpStatus, OutputPattern, PortOpen
 
 ''':type : Logger '''
 
 
 class AppiumManager(ManagedProcess):
     DEFAULT_LOG_FILE = "out/appium_manager.log"
+    DEFAULT_PORT = 4723
+    WARM_OUTPUT_FILE = "~/.instatest/appium_{0}.out"
+    READY_PATTERN = r"listener started on"  # "Appium REST http interface listener started on 0.0.0.0:4723"
 
-    def __init__(self, appium_path, test_config=None):
+    def __init__(self, appium_path, test_config=None, status_url=None, port=None, name=None, reuse=False,
+                 registry: AppiumRegistry = None, base_path: str = None):
         """
         :param str appium_path:
+        :param str status_url: If set, appium is only ready once this url returns 200 (ex: http://127.0.0.1:4723/status)
+        :param int port: Port appium listens on.  Appium's default (4723) if None
+        :param str base_path: Path the server is mounted on (ex: /wd/hub).  Appium's default if None, which is /wd/hub
+                              on Appium 1 and / on Appium 2
+        :param bool reuse: Attach to a healthy server with the same configuration left running by an earlier run.
+                           Servers started in this mode keep running after stop_appium() for the next run
+        :param AppiumRegistry registry: Where reusable servers are recorded.  ~/.instatest/appium_servers.json if None
         """
-        super(AppiumManager, self).__init__(application_path=appium_path, application_search="appium")
+        if reuse:
+            port = port if port else self.DEFAULT_PORT
+            # Output can't go to a pipe that dies with this process.  Readiness comes from the port instead
+            probes = [PortOpen(port)]
+            output_file = self.WARM_OUTPUT_FILE.format(port)
+        else:
+            probes = [OutputPattern(self.READY_PATTERN)]
+            output_file = None
+        if status_url:
+            probes.append(HttpStatus(status_url))
+        super(AppiumManager, self).__init__(application_path=appium_path, application_search="appium",
+                                            readiness_probes=probes, name=name, output_file=output_file)
         self._config = test_config  # type: InstatestConfiguration
+        self._port = port
+        self._base_path = base_path
+        self._reuse = reuse
+        self._registry = registry if registry else (AppiumRegistry() if reuse else None)
+        self._reused = False
+
+    @property
+    def reused(self) -> bool:
+        """
+        True if attached to a server started by an earlier run
+        """
+        return self._reused
+
+    def config_hash(self) -> str:
+        config = {"path": self._path, "arguments": self.get_arguments()}
+        return hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @property
+    def port(self):
+        return self._port
+
+    @property
+    def base_path(self):
+        return self._base_path
 
     def start_appium(self):
+        if self._reuse:
+            entry = self._registry.find(self.config_hash(), port=self._port)
+            if entry:
+                self.attach_to(entry["pid"])
+                self._reused = True
+                self.log.debug("Reusing appium server pid {0} on port {1}".format(entry["pid"], entry["port"]))
+                return
         self.log.debug("Starting appium process..")
         super(AppiumManager, self).start_instance_process()
         self.log.debug("Appium process started")
 
+    def stop_appium(self, force=False) -> bool:
+        """
+        Stops the server unless it is kept warm for the next run (reuse mode)
+        :param bool force: Stop a reusable server too and remove it from the registry
+        """
+        if self._reuse and not force and self.get_return_code() is None:
+            self.log.debug("Leaving appium pid {0} running for reuse".format(self.pid))
+            return True
+        pid = self.pid
+        stopped = self.stop_instance_process()
+        if self._registry and pid:
+            self._registry.remove(pid)
+        return stopped
+
     def get_arguments(self):
         args = []
         if self._config:
-            args = ['--log', self._config.appium_log]
+            log_file = self._config.appium_log
+            if self._port:
+                # Keep logs of servers running side by side apart
+                root, ext = os.path.splitext(log_file)
+                log_file = "{0}_{1}{2}".format(root, self._port, ext)
+            args = ['--log', log_file]
+        if self._port:
+            args.extend(['--port', str(self._port)])
+        if self._base_path:
+            args.extend(['--base-path', self._base_path])
         return args
 
-    def wait_for_process(self, queue_size=2, min_wait_s=None, timeout_s=10):
-        # Appium will print 2 lines when it is ready
+    def has_arguments(self):
+        return len(self.get_arguments()) > 0
+
+    def wait_for_process(self, queue_size=None, min_wait_s=None, timeout_s=10):
+        # Appium prints its listener address when it is ready.  Passing queue_size waits for a line count instead
         self.log.debug("Waiting for appium to initialize")
-        started = super(AppiumManager, self).wait_for_process(queue_size=queue_size, min_wait_s=min_wait_s, timeout_s=timeout_s)
+        if self._reused:
+            started = True
+        elif queue_size:
+            started = super(AppiumManager, self).wait_for_process(queue_size=queue_size, min_wait_s=min_wait_s,
+                                                                  timeout_s=timeout_s)
+            if started:
+                self._register_warm()
+        else:
+            start_time = time.time()
+            started = self.wait_until_ready(timeout_s=timeout_s)
+            remaining_s = (min_wait_s or 0) - (time.time() - start_time)
+            if remaining_s > 0:
+                time.sleep(remaining_s)
         self.log.debug("Manager reports appium is initialized: {0}".format(str(started)))
 
         if not started:
             raise ExternalProcessError(msg="Waited for Appium process but still not detected", process_name=self._name)
 
+    def wait_until_ready(self, probes=None, timeout_s=20, poll_interval_s=0.25) -> bool:
+        ready = super(AppiumManager, self).wait_until_ready(probes=probes, timeout_s=timeout_s,
+                                                            poll_interval_s=poll_interval_s)
+        if ready:
+            self._register_warm()
+        return ready
+
+    def _register_warm(self):
+        """
+        Records a server started in reuse mode once it is ready so the next run can attach to it
+        """
+        if self._reuse and not self._reused:
+            self._registry.record(self.pid, self._port, self.config_hash())
+
     @classmethod
     def get_log_file(cls):
         return cls.DEFAULT_LOG_FILE
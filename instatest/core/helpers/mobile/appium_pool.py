@@ -0,0 +1,288 @@
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from instatest.core.configuration.instatest_configuration import InstatestConfiguration
+from instatest.core.helpers.exceptions import ExternalProcessError
+from instatest.core.helpers.instatest_object import InstatestObject
+from instatest.core.helpers.mobile.appium_manager import AppiumManager
+from instatest.core.helpers.process.readiness import PortOpen
+
+_reserved_ports = set()
+_port_lock = threading.Lock()
+
+
+def allocate_port(host: str = "127.0.0.1") -> int:
+    """
+    Asks the OS for a free port.  Ports handed out in this process are never returned twice
+    """
+    with _port_lock:
+        while True:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.bind((host, 0))
+                port = s.getsockname()[1]
+            if port not in _reserved_ports:
+                _reserved_ports.add(port)
+                return port
+
+
+def release_port(port: int):
+    with _port_lock:
+        _reserved_ports.discard(port)
+
+
+class AppiumServer:
+    """
+    One appium process in the pool and the ports reserved for sessions running on it
+    """
+
+    def __init__(self, manager: AppiumManager, port: int, system_port: int, wda_local_port: int, host: str,
+                 base_path: str):
+        self.manager = manager
+        self.port = port
+        self.system_port = system_port  # UiAutomator2 systemPort capability
+        self.wda_local_port = wda_local_port  # XCUITest wdaLocalPort capability
+        self.host = host
+        self.base_path = base_path
+        self.started_at = None
+
+    @property
+    def url(self) -> str:
+        return "http://{0}:{1}{2}".format(self.host, self.port, self.base_path)
+
+    def is_healthy(self) -> bool:
+        return self.manager.get_return_code() is None and PortOpen(self.port, self.host).check()
+
+    def get_capabilities(self) -> Dict:
+        """
+        Capabilities that keep parallel sessions from colliding on device side ports
+        """
+        return {"systemPort": self.system_port, "wdaLocalPort": self.wda_local_port}
+
+    def ports(self) -> List[int]:
+        return [self.port, self.system_port, self.wda_local_port]
+
+    def __str__(self):
+        return self.url
+
+
+class AppiumLease:
+    def __init__(self, pool: 'AppiumPool', server: AppiumServer, worker_id=None):
+        self.pool = pool
+        self.server = server
+        self.worker_id = worker_id
+
+    @property
+    def url(self) -> str:
+        return self.server.url
+
+    def get_capabilities(self) -> Dict:
+        return self.server.get_capabilities()
+
+    def release(self):
+        self.pool.release(self)
+
+
+class AppiumPool(InstatestObject):
+    """
+        Runs several appium servers on their own ports so device sessions can run in parallel.
+        Ex:
+        with AppiumPool("appium", size=4) as pool:
+            with pool.lease(worker_id="gw0") as lease:
+                caps.update(lease.get_capabilities())
+                driver = webdriver.Remote(lease.url, caps)
+    """
+
+    def __init__(self, appium_path, size: int, test_config: InstatestConfiguration = None, host="127.0.0.1",
+                 base_path="/wd/hub", start_timeout_s=30):
+        """
+        :param base_path: Passed to each server as --base-path so session urls are the same on Appium 1 and 2
+        """
+        super().__init__(name="AppiumPool")
+        self._appium_path = appium_path
+        self._size = size
+        self._config = test_config
+        self._host = host
+        self._base_path = base_path
+        self._start_timeout_s = start_timeout_s
+        self._servers = []  # type: List[AppiumServer]
+        self._available = []  # type: List[AppiumServer]
+        self._leases = {}  # type: Dict[object, AppiumLease]
+        self._condition = threading.Condition()
+        self._start_lock = threading.Lock()  # Held while starting so workers acquiring at once start the pool once
+        self._started = False
+        self._recycling = 0  # Replacement servers being started outside the lock
+
+    @property
+    def servers(self) -> List[AppiumServer]:
+        return list(self._servers)
+
+    def start(self):
+        with self._start_lock:
+            if not self._started:
+                self._start_servers()
+
+    def _start_servers(self):
+        # Start every process first and then wait, so the servers boot concurrently
+        servers = []  # type: List[AppiumServer]
+        try:
+            for _ in range(self._size):
+                servers.append(self._create_server())
+            for server in servers:
+                self._launch(server)
+            failed = [s for s in servers if not self._wait_ready(s)]
+        except Exception:
+            for server in servers:
+                self._stop_server(server)
+            raise
+        with self._condition:
+            self._servers = [s for s in servers if s not in failed]
+            self._available = list(self._servers)
+            self._started = True
+        for server in failed:
+            self._stop_server(server)
+        if failed:
+            self.log.warning("{0} of {1} appium servers failed to start".format(len(failed), self._size))
+        if not self._servers:
+            raise ExternalProcessError(msg="No appium servers in the pool started", process_name="AppiumPool")
+        self.log.debug("Appium pool started: {0}".format(", ".join(str(s) for s in self._servers)))
+
+    def acquire(self, worker_id=None, timeout_s: float = None) -> AppiumLease:
+        """
+        Hands out a healthy server.  A worker that already holds a lease gets the same one back
+        :raises ExternalProcessError: no server became available in time
+        """
+        if not self._started:
+            self.start()  # Started once even if several workers get here together
+        deadline = None if timeout_s is None else time.monotonic() + timeout_s
+        with self._condition:
+            if worker_id is not None and worker_id in self._leases:
+                return self._leases[worker_id]
+            while True:
+                while self._available:
+                    server = self._available.pop(0)
+                    if not server.is_healthy():
+                        server = self._recycle(server)
+                        if server is None:
+                            continue
+                    lease = AppiumLease(self, server, worker_id)
+                    self._leases[worker_id if worker_id is not None else id(lease)] = lease
+                    return lease
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if (not self._servers and not self._recycling) or (remaining is not None and remaining <= 0):
+                    raise ExternalProcessError(msg="No appium server available in the pool", process_name="AppiumPool")
+                self._condition.wait(remaining)
+
+    def release(self, lease: AppiumLease):
+        with self._condition:
+            key = next((k for k, v in self._leases.items() if v is lease), None)
+            if key is None:
+                return
+            del self._leases[key]
+            if lease.server in self._servers:
+                self._available.append(lease.server)
+            self._condition.notify()
+
+    @contextmanager
+    def lease(self, worker_id=None, timeout_s: float = None):
+        acquired = self.acquire(worker_id, timeout_s)
+        try:
+            yield acquired
+        finally:
+            acquired.release()
+
+    def health_check(self) -> int:
+        """
+        Restarts idle servers that crashed or stopped accepting connections
+        :return: number of servers recycled
+        """
+        recycled = 0
+        with self._condition:
+            for server in list(self._available):
+                # The lock is released while recycling, so the server may have been leased meanwhile
+                if server not in self._available or server.is_healthy():
+                    continue
+                self._available.remove(server)
+                replacement = self._recycle(server)
+                if replacement:
+                    self._available.append(replacement)
+                recycled += 1
+            self._condition.notify_all()
+        return recycled
+
+    def shutdown(self):
+        with self._condition:
+            servers = list(self._servers)
+            self._servers = []
+            self._available = []
+            self._leases = {}
+            self._started = False
+            self._condition.notify_all()
+        for server in servers:
+            self._stop_server(server)
+        self.log.debug("Appium pool stopped {0} servers".format(len(servers)))
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+
+    def _create_server(self) -> AppiumServer:
+        port = allocate_port(self._host)
+        manager = AppiumManager(self._appium_path, test_config=self._config, port=port,
+                                name="appium_{0}".format(port), base_path=self._base_path)
+        return AppiumServer(manager, port, allocate_port(self._host), allocate_port(self._host), self._host,
+                            manager.base_path or "")
+
+    def _launch(self, server: AppiumServer):
+        server.manager.start_appium()
+        server.started_at = time.time()
+
+    def _wait_ready(self, server: AppiumServer) -> bool:
+        remaining = self._start_timeout_s - (time.time() - server.started_at)
+        return server.manager.wait_until_ready(timeout_s=max(remaining, 0))
+
+    def _recycle(self, server: AppiumServer) -> Optional[AppiumServer]:
+        # Called with the condition held.  It is released while the replacement starts so other workers can still
+        # acquire and release, and held again to publish the replacement
+        self.log.warning("Appium server {0} is unhealthy, replacing it".format(server))
+        self._servers.remove(server)
+        self._recycling += 1
+        try:
+            with self._unlocked():
+                self._stop_server(server)
+                replacement = self._create_server()
+                self._launch(replacement)
+                ready = self._wait_ready(replacement)
+                if not ready:
+                    self.log.error("Replacement appium server {0} failed to start".format(replacement))
+                    self._stop_server(replacement)
+        finally:
+            self._recycling -= 1
+            self._condition.notify_all()
+        if not ready:
+            return None
+        if not self._started:
+            # Pool was shut down while the replacement was starting
+            with self._unlocked():
+                self._stop_server(replacement)
+            return None
+        self._servers.append(replacement)
+        return replacement
+
+    @contextmanager
+    def _unlocked(self):
+        self._condition.release()
+        try:
+            yield
+        finally:
+            self._condition.acquire()
+
+    def _stop_server(self, server: AppiumServer):
+        server.manager.stop_instance_process()
+        for port in server.ports():
+            release_port(port)
@@ -0,0 +1,107 @@
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+import psutil
+
+from instatest.core.helpers.instatest_object import InstatestObject
+from instatest.core.helpers.process.readiness import PortOpen
+
+ON_POSIX = 'posix' in sys.builtin_module_names
+if ON_POSIX:
+    import fcntl
+
+
+class AppiumRegistry(InstatestObject):
+    """
+        Records appium servers left running between test runs so a later run can attach instead of starting one.
+        Entries: pid, port, create_time (from psutil, guards against pid reuse), started_at and config_hash
+    """
+    DEFAULT_PATH = "~/.instatest/appium_servers.json"
+
+    def __init__(self, path: str = None):
+        super().__init__(name="AppiumRegistry")
+        self._path = os.path.abspath(os.path.expanduser(path if path else self.DEFAULT_PATH))
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def record(self, pid: int, port: int, config_hash: str):
+        entry = {
+            "pid": pid,
+            "port": port,
+            "create_time": psutil.Process(pid=pid).create_time(),
+            "started_at": time.time(),
+            "config_hash": config_hash
+        }
+        with self._locked() as entries:
+            entries[:] = [e for e in entries if e["pid"] != pid and e["port"] != port]
+            entries.append(entry)
+        self.log.debug("Recorded appium server pid {0} on port {1}".format(pid, port))
+
+    def remove(self, pid: int):
+        with self._locked() as entries:
+            entries[:] = [e for e in entries if e["pid"] != pid]
+
+    def find(self, config_hash: str, port: int = None) -> Optional[Dict]:
+        """
+        Healthy server started with the same configuration.  Entries for dead servers are dropped
+        """
+        with self._locked() as entries:
+            entries[:] = [e for e in entries if self.is_alive(e)]
+            for entry in entries:
+                if entry["config_hash"] == config_hash and (port is None or entry["port"] == port):
+                    if PortOpen(entry["port"]).check():
+                        return dict(entry)
+                    self.log.warning("Registered appium pid {0} is running but port {1} is closed".format(
+                        entry["pid"], entry["port"]))
+        return None
+
+    def entries(self) -> List[Dict]:
+        with self._locked() as entries:
+            return [dict(e) for e in entries]
+
+    @staticmethod
+    def is_alive(entry: Dict) -> bool:
+        try:
+            process = psutil.Process(pid=entry["pid"])
+            return process.is_running() and abs(process.create_time() - entry["create_time"]) < 0.01
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            return False
+
+    @contextmanager
+    def _locked(self):
+        # Several CI shards can share a home directory - hold an exclusive lock while reading and writing
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        with open(self._path + ".lock", "a") as lock_file:
+            if ON_POSIX:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                entries = self._read()
+                original = list(entries)
+                yield entries
+                if entries != original:
+                    self._write(entries)
+            finally:
+                if ON_POSIX:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> List[Dict]:
+        if not os.path.exists(self._path):
+            return []
+        try:
+            with open(self._path) as f:
+                return json.load(f)
+        except (ValueError, OSError) as e:
+            self.log.warning("Could not read appium registry {0}. {1}".format(self._path, e))
+            return []
+
+    def _write(self, entries: List[Dict]):
+        temp_path = self._path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(temp_path, self._path)
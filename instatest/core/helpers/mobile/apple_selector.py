@@ -7,6 +7,7 @@ from selenium.webdriver.common.by import By
 
 
 class AppleSelector(MobileSelector):
+    __slots__ = ()
     SUPPORTED_PROPERTIES = (
         TargetProperty.Name,
         TargetProperty.TestID,
@@ -16,6 +17,16 @@ class AppleSelector(MobileSelector):
         MobileOperator.Contains,
         MobileOperator.Equals
     )
+    SOURCE_ATTRIBUTES = {
+        TargetProperty.Name: 'name',
+        TargetProperty.TestID: 'name',
+        TargetProperty.AccessibilityId: 'name'
+    }
+    NATIVE_LOOKUPS = {
+        TargetProperty.Name: MobileBy.ACCESSIBILITY_ID,
+        TargetProperty.TestID: MobileBy.ACCESSIBILITY_ID,
+        TargetProperty.AccessibilityId: MobileBy.ACCESSIBILITY_ID
+    }
 
     def __init__(self, by, compare_to, operator, value):
         if by is None:
@@ -29,7 +40,7 @@ class AppleSelector(MobileSelector):
         else:
             return self._by
 
-    def build_predicate(self):
+    def _compile_predicate(self):
         self.log.debug("MobileBy: {0}".format(self.by))
         if self.by != MobileBy.IOS_PREDICATE:
             self.log.warning("Currently only supports IOS Predicate selectors")
@@ -39,8 +50,7 @@ class AppleSelector(MobileSelector):
             self.log.warning("Currently does not support property: {0}".format(self.compare_to))
             raise NotImplementedError()
 
-        if self.compare_to == TargetProperty.Name:
-            selector += "name "
+        selector += "{0} ".format(self.SOURCE_ATTRIBUTES[self.compare_to])
 
         if self.operator not in self.SUPPORTED_OPERATORS:
             self.log.warning("Currently does not support operator: {0}".format(self.operator))
@@ -51,6 +61,11 @@ class AppleSelector(MobileSelector):
 
         return selector
 
+    def source_attribute(self):
+        if self.by != MobileBy.IOS_PREDICATE or self.operator not in self.SUPPORTED_OPERATORS:
+            return None
+        return super(AppleSelector, self).source_attribute()
+
     def get_operator_string(self):
         if self.operator == MobileOperator.Contains:
             return "CONTAINS"
@@ -1,6 +1,71 @@
+import re
+from typing import Optional
+
+
 class MobileOperator:
     Equals = "="
     StartsWith = "StartsWith"
     EndsWith = ""
     Contains = "Contains"
-    Matches = "Matches"   #  UiSelector().*Matches methods in uiautomator searches with a regex string  (textMatches, classNameMatches, etc)
\ No newline at end of file
+    Matches = "Matches"   #  UiSelector().*Matches methods in uiautomator searches with a regex string  (textMatches, classNameMatches, etc)
+
+    @classmethod
+    def name_of(cls, operator) -> str:
+        """
+        Name the operator is declared with, ex: name_of(MobileOperator.EndsWith) returns 'EndsWith'
+        """
+        for name in ('Equals', 'StartsWith', 'EndsWith', 'Contains', 'Matches'):
+            if getattr(cls, name) == operator:
+                return name
+        return str(operator)
+
+    @classmethod
+    def compare(cls, operator, actual, expected) -> bool:
+        """
+        Evaluates the operator locally, the same way the device would
+        :param operator: MobileOperator value
+        :param actual: Value read from the element (ex: text attribute from page source)
+        :param expected: Value the selector is looking for
+        """
+        if actual is None:
+            return False
+        expected = str(expected)
+        if operator == cls.Equals:
+            return actual == expected
+        if operator == cls.Contains:
+            return expected in actual
+        if operator == cls.StartsWith:
+            return actual.startswith(expected)
+        if operator == cls.EndsWith:
+            return actual.endswith(expected)
+        if operator == cls.Matches:
+            return re.fullmatch(expected, actual) is not None
+        return False
+
+    @classmethod
+    def to_xpath(cls, operator, attribute, value) -> Optional[str]:
+        """
+        Builds an XPath 1.0 condition for the operator.  Returns None for Matches - XPath 1.0 has no regex support
+        ex: to_xpath(MobileOperator.Contains, '@text', 'foo') returns contains(@text,'foo')
+        """
+        literal = xpath_literal(value)
+        if operator == cls.Equals:
+            return "{0}={1}".format(attribute, literal)
+        if operator == cls.Contains:
+            return "contains({0},{1})".format(attribute, literal)
+        if operator == cls.StartsWith:
+            return "starts-with({0},{1})".format(attribute, literal)
+        if operator == cls.EndsWith:
+            return "substring({0},string-length({0})-string-length({1})+1)={1}".format(attribute, literal)
+        return None
+
+
+def xpath_literal(value) -> str:
+    # XPath 1.0 has no escape character, use the other quote or concat() when both are present
+    value = str(value)
+    if "'" not in value:
+        return "'{0}'".format(value)
+    if '"' not in value:
+        return '"{0}"'.format(value)
+    parts = value.split("'")
+    return "concat({0})".format(", \"'\", ".join("'{0}'".format(p) for p in parts))
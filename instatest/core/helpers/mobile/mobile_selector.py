@@ -1,14 +1,33 @@
 # Device/Platform agnostic selector class
+import weakref
+from typing import Dict, Optional
+
 from selenium.webdriver.common.by import By
 
 from instatest.core import target_property
 from instatest.core.configuration.runtime.global_test_data import TestData
 from instatest.core.helpers.abstract_selector import AbstractSelector
 from instatest.core.helpers.mobile import mobile_operator
+from instatest.core.helpers.mobile.selector_planner import planner
 from instatest.core.mobile import devices
 
+_NOT_COMPILED = object()
+# Selectors are only shared while something (ex: an @element property) still holds them
+_interned_selectors = weakref.WeakValueDictionary()  # type: weakref.WeakValueDictionary
+
 
 class MobileSelector(AbstractSelector):
+    """
+    Selectors are immutable once created.  The predicate and lookup tuple are built on first use and reused after that
+    """
+    __slots__ = ('_compare_to', '_platform', '_operator', '_predicate', '_tuple', '_tuple_generation', '_key') + \
+                (() if hasattr(AbstractSelector, '__weakref__') else ('__weakref__',))
+    _FROZEN_FIELDS = ('_by', '_val', '_compare_to', '_platform', '_operator')
+    # Maps the property being compared to the attribute name used in the page source xml
+    SOURCE_ATTRIBUTES = {}
+    # Properties that can be looked up with a native locator (accessibility id, id) when compared with Equals
+    NATIVE_LOOKUPS = {}
+
     def __init__(self,
                  platform: devices.DevicePlatform = None,
                  by: By = None,
@@ -19,6 +38,34 @@ class MobileSelector(AbstractSelector):
         self._compare_to = compare_to
         self._platform = platform
         self._operator = operator
+        self._predicate = _NOT_COMPILED
+        self._tuple = None
+        self._tuple_generation = None
+        self._key = None
+
+    def __setattr__(self, name, value):
+        if name in self._FROZEN_FIELDS and hasattr(self, name):
+            raise AttributeError("Selectors are immutable. Can't set {0}".format(name))
+        super(MobileSelector, self).__setattr__(name, value)
+
+    @property
+    def key(self) -> tuple:
+        if self._key is None:
+            self._key = (type(self), self._platform, self.by, self._compare_to, self._operator, self._val)
+        return self._key
+
+    def __eq__(self, other):
+        return isinstance(other, MobileSelector) and self.key == other.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    @classmethod
+    def intern(cls, selector: 'MobileSelector') -> 'MobileSelector':
+        """
+        Returns the shared instance for an identical selector so the predicate is only compiled once while it is in use
+        """
+        return _interned_selectors.setdefault(selector.key, selector)
 
     @property
     def compare_to(self) -> target_property.TargetProperty:
@@ -37,10 +84,15 @@ class MobileSelector(AbstractSelector):
         if not self._platform:
             context = TestData.get_context()
             if context:
-                    self._platform = context.platform
+                return context.platform
         return self._platform
 
     def build_predicate(self):
+        if self._predicate is _NOT_COMPILED:
+            self._predicate = self._compile_predicate()
+        return self._predicate
+
+    def _compile_predicate(self):
         raise NotImplementedError()
 
     def for_platform(self, platform):
@@ -50,14 +102,47 @@ class MobileSelector(AbstractSelector):
         return self.to_string()
 
     def to_string(self):
-        platform = "Unknown"
-        if '_platform' in self.__dict__:
-            platform = self._platform
+        platform = getattr(self, '_platform', "Unknown")
         return "Platform: {0}, Selector: {1} {2} {3}".format(platform,
                                                              str(self.by), str(self.operator), str(self.value))
 
     def get_tuple(self):
-        return self.by, self.build_predicate()
+        # Rebuilt when native locators are turned on or off after the tuple was memoized
+        if self._tuple is None or self._tuple_generation != planner.generation:
+            self._tuple = self._build_tuple()
+            self._tuple_generation = planner.generation
+        return self._tuple
+
+    def _build_tuple(self):
+        plan = planner.plan(self)
+        return plan.by, plan.value
+
+    def source_attribute(self) -> Optional[str]:
+        """
+        Page source attribute this selector compares against or None if it can't be evaluated from the page source
+        """
+        return self.SOURCE_ATTRIBUTES.get(self.compare_to, None)
+
+    def to_xpath(self) -> Optional[str]:
+        """
+        Equivalent XPath lookup.  None when the selector can't be expressed in XPath 1.0
+        """
+        attribute = self.source_attribute()
+        if attribute is None:
+            return None
+        condition = mobile_operator.MobileOperator.to_xpath(self.operator, "@" + attribute, self.value)
+        if condition is None:
+            return None
+        return "//*[{0}]".format(condition)
+
+    def matches(self, attributes: Dict) -> bool:
+        """
+        Evaluates the selector against the attributes of a page source node
+        """
+        attribute = self.source_attribute()
+        if attribute is None:
+            return False
+        return mobile_operator.MobileOperator.compare(self.operator, attributes.get(attribute, None), self.value)
 
     def try_get_platform(self):
         try:
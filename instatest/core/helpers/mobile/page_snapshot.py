@@ -0,0 +1,197 @@
+import functools
+import re
+import time
+import xml.etree.ElementTree as ElementTree
+from typing import Dict, List, Optional, Tuple
+
+from appium.webdriver.common.mobileby import MobileBy
+
+from instatest.core.helpers.abstract_selector import AbstractSelector
+from instatest.core.helpers.mobile import MobileOperator
+from instatest.core.helpers.test_logger import get_logger
+
+log = get_logger('PageSnapshot')
+
+ANDROID_BOUNDS = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
+
+# Attributes indexed for equality lookups.  Android uses resource-id/content-desc/text/class, iOS name/label/type
+INDEXED_ATTRIBUTES = ('resource-id', 'content-desc', 'text', 'class', 'name', 'label', 'type')
+
+# ElementTree only evaluates a subset of XPath.  Unions, axes, and/or and functions other than last() are rejected or
+# evaluated differently than on the device, so those selectors have to go to the driver
+QUOTED = re.compile(r"'[^']*'|\"[^\"]*\"")
+BOOLEAN_OPERATOR = re.compile(r"\b(?:and|or)\b")
+FUNCTION_CALL = re.compile(r"([\w-]+)\s*\(")
+
+
+class SnapshotElement:
+    """
+    Read only record of a node in the UI hierarchy.  Use the live driver for interactions
+    """
+    __slots__ = ('index', 'tag', 'attributes', 'parent')
+
+    def __init__(self, index: int, tag: str, attributes: Dict, parent: 'SnapshotElement' = None):
+        self.index = index  # Position in document order
+        self.tag = tag
+        self.attributes = attributes
+        self.parent = parent
+
+    def get_attribute(self, name):
+        return self.attributes.get(name, None)
+
+    @property
+    def text(self) -> Optional[str]:
+        text = self.attributes.get('text', None)
+        if text is None:
+            text = self.attributes.get('value', self.attributes.get('label', None))
+        return text
+
+    @property
+    def displayed(self) -> bool:
+        return self.attributes.get('displayed', self.attributes.get('visible', 'true')) == 'true'
+
+    @property
+    def enabled(self) -> bool:
+        return self.attributes.get('enabled', 'true') == 'true'
+
+    @property
+    def bounds(self) -> Optional[Tuple[int, int, int, int]]:
+        """
+        (x, y, width, height) of the element
+        """
+        android_bounds = self.attributes.get('bounds', None)
+        if android_bounds:
+            m = ANDROID_BOUNDS.match(android_bounds)
+            if m:
+                left, top, right, bottom = (int(v) for v in m.groups())
+                return left, top, right - left, bottom - top
+            return None
+        try:
+            return tuple(int(self.attributes[k]) for k in ('x', 'y', 'width', 'height'))
+        except (KeyError, ValueError):
+            return None
+
+    def __str__(self):
+        return "{0} {1}".format(self.tag, self.attributes)
+
+
+class PageSnapshot:
+    """
+        In memory copy of the UI hierarchy.  Selectors are evaluated locally, so presence and text checks
+        don't make a driver call.
+        Ex:
+        snapshot = PageSnapshot.capture(driver_context)
+        if snapshot.exists(AndroidSelector.ByResourceId('com.app:id/error')):
+            ...
+
+    """
+
+    def __init__(self, page_source: str):
+        self.captured_at = time.time()
+        self.nodes = []  # type: List[SnapshotElement]
+        self._index = {a: {} for a in INDEXED_ATTRIBUTES}  # type: Dict[str, Dict[str, List[SnapshotElement]]]
+        self._root = ElementTree.fromstring(page_source.encode('utf-8') if isinstance(page_source, str) else page_source)
+        self._build(self._root)
+
+    @classmethod
+    def capture(cls, driver_context) -> 'PageSnapshot':
+        """
+        Reads the page source from the driver (one round trip) and indexes it
+        """
+        return cls(driver_context.get_webdriver().page_source)
+
+    def _build(self, root):
+        parents = {}
+        self._records = {}
+        for node in root.iter():
+            record = SnapshotElement(len(self.nodes), node.tag, dict(node.attrib), parents.get(node, None))
+            self.nodes.append(record)
+            self._records[node] = record
+            for child in node:
+                parents[child] = record
+            for attribute in INDEXED_ATTRIBUTES:
+                value = record.attributes.get(attribute, None)
+                if value:
+                    self._index[attribute].setdefault(value, []).append(record)
+
+    def lookup(self, attribute: str, value: str) -> List[SnapshotElement]:
+        """
+        Exact match on an indexed attribute (resource-id, content-desc, text, class, name, label, type)
+        """
+        return list(self._index.get(attribute, {}).get(value, []))
+
+    @staticmethod
+    def can_evaluate(selector: AbstractSelector) -> bool:
+        if getattr(selector, 'source_attribute', None) and selector.source_attribute():
+            return True
+        return selector.by == MobileBy.XPATH and can_evaluate_xpath(selector.value)
+
+    def find_all(self, selector: AbstractSelector) -> List[SnapshotElement]:
+        """
+        All nodes matching the selector in document order
+        :raises NotImplementedError: The selector can't be evaluated without the device (see can_evaluate)
+        """
+        attribute = selector.source_attribute() if getattr(selector, 'source_attribute', None) else None
+        if attribute:
+            if selector.operator == MobileOperator.Equals and attribute in self._index:
+                return self.lookup(attribute, str(selector.value))
+            return [n for n in self.nodes if selector.matches(n.attributes)]
+        if selector.by == MobileBy.XPATH and can_evaluate_xpath(selector.value):
+            return self._find_by_xpath(selector.value)
+        raise NotImplementedError("Selector can't be evaluated from page source: {0}".format(selector))
+
+    def find(self, selector: AbstractSelector) -> Optional[SnapshotElement]:
+        found = self.find_all(selector)
+        return found[0] if found else None
+
+    def exists(self, selector: AbstractSelector) -> bool:
+        return self.find(selector) is not None
+
+    def text_of(self, selector: AbstractSelector) -> Optional[str]:
+        found = self.find(selector)
+        return found.text if found else None
+
+    def _find_by_xpath(self, xpath: str) -> List[SnapshotElement]:
+        if xpath.startswith('/') and not xpath.startswith('//'):
+            first_step, _, rest = xpath[1:].partition('/')
+            if first_step not in (self._root.tag, '*'):
+                return []
+            if not rest:
+                return [self.nodes[0]]
+        path = _element_path(xpath)
+        try:
+            matched = self._root.findall(path)
+        except SyntaxError as se:
+            raise NotImplementedError("XPath not supported for snapshots: {0}. {1}".format(xpath, se))
+        return [self._records[m] for m in matched]
+
+
+def _element_path(xpath: str) -> str:
+    # Absolute paths are made relative to the root node, which is the first step
+    if xpath.startswith('//'):
+        return '.' + xpath
+    if xpath.startswith('/'):
+        rest = xpath[1:].partition('/')[2]
+        return './' + rest if rest else '.'
+    return xpath
+
+
+@functools.lru_cache(maxsize=1024)
+def can_evaluate_xpath(xpath: str) -> bool:
+    """
+    True if a snapshot evaluates the XPath the same way the device does
+    """
+    unquoted = QUOTED.sub("''", xpath)
+    if '|' in unquoted or '::' in unquoted or BOOLEAN_OPERATOR.search(unquoted):
+        return False
+    if any(name != 'last' for name in FUNCTION_CALL.findall(unquoted)):
+        return False
+    if unquoted.startswith('/') and not unquoted.startswith('//'):
+        first_step = unquoted[1:].partition('/')[0]
+        if not re.match(r"^[\w.-]+$|^\*$", first_step):
+            return False
+    try:
+        ElementTree.Element('hierarchy').findall(_element_path(xpath))
+    except (SyntaxError, KeyError, TypeError, ValueError):
+        return False
+    return True
@@ -0,0 +1,126 @@
+import json
+import os
+import threading
+from enum import Enum
+from typing import Dict, List, Optional
+
+from appium.webdriver.common.mobileby import MobileBy
+
+from instatest.core.helpers.mobile.mobile_operator import MobileOperator
+
+# Locator strategies the automation framework answers from its own element index instead of parsing a query
+NATIVE_STRATEGIES = (MobileBy.ACCESSIBILITY_ID, MobileBy.ID, MobileBy.CLASS_NAME)
+
+
+class LookupStrategy(Enum):
+    NATIVE = "native"  # accessibility id, id or class name
+    QUERY = "query"  # UiSelector or iOS predicate string
+    XPATH = "xpath"
+
+
+class SelectorPlan:
+    __slots__ = ('selector', 'by', 'value', 'strategy', 'reason')
+
+    def __init__(self, selector: str, by, value, strategy: LookupStrategy, reason: str):
+        self.selector = selector
+        self.by = by
+        self.value = value
+        self.strategy = strategy
+        self.reason = reason
+
+    def to_dict(self) -> Dict:
+        return {"selector": self.selector, "by": self.by, "value": self.value, "strategy": self.strategy.value,
+                "reason": self.reason}
+
+
+class SelectorPlanner:
+    """
+        Picks the locator each mobile selector is sent with.  Equality on a property the platform can look up
+        natively (content description and resource id on Android, name/accessibility id on iOS) is sent as
+        accessibility id/id instead of a UiSelector or predicate query.  Contains/StartsWith/Matches stay queries.
+        Enabled by default, disable with INSTATEST_NATIVE_LOCATORS=0 or planner.disable().  Lookup tuples are memoized
+        per selector and rebuilt after enable()/disable() change the setting.
+        Ex:
+        AndroidSelector.ById("login_button").get_tuple()  # ('accessibility id', 'login_button')
+        planner.report()["strategies"]  # {'native': 12, 'query': 3, 'xpath': 1}
+    """
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        # Bumped whenever plans made so far are no longer valid, selectors compare it to rebuild their lookup tuple
+        self.generation = 0
+        self._lock = threading.Lock()
+        self._plans = {}  # type: Dict[tuple, SelectorPlan]
+
+    def enable(self):
+        self._set_enabled(True)
+
+    def disable(self):
+        self._set_enabled(False)
+
+    def _set_enabled(self, enabled: bool):
+        if enabled != self.enabled:
+            self.enabled = enabled
+            self.reset()
+
+    def reset(self):
+        """
+        Forgets recorded plans.  Selectors plan their lookup again on next use
+        """
+        with self._lock:
+            self._plans = {}
+            self.generation += 1
+
+    def plan(self, selector) -> SelectorPlan:
+        """
+        Chooses the locator for a MobileSelector and records the choice
+        """
+        plan = self._choose(selector)
+        with self._lock:
+            self._plans[selector.key] = plan
+        return plan
+
+    def plan_for(self, selector) -> Optional[SelectorPlan]:
+        return self._plans.get(selector.key, None)
+
+    def _choose(self, selector) -> SelectorPlan:
+        name = str(selector)
+        if selector.by in NATIVE_STRATEGIES:
+            return SelectorPlan(name, selector.by, selector.value, LookupStrategy.NATIVE, "native locator")
+        if selector.by == MobileBy.XPATH:
+            return SelectorPlan(name, selector.by, selector.value, LookupStrategy.XPATH, "xpath")
+
+        native_by = selector.NATIVE_LOOKUPS.get(selector.compare_to, None)
+        if native_by is None:
+            reason = "no native locator for {0}".format(selector.compare_to)
+        elif selector.operator != MobileOperator.Equals:
+            reason = "{0} needs a query".format(MobileOperator.name_of(selector.operator))
+        elif not self.enabled:
+            reason = "native locators disabled"
+        else:
+            return SelectorPlan(name, native_by, selector.value, LookupStrategy.NATIVE,
+                                "equality on {0}".format(selector.compare_to))
+        return SelectorPlan(name, selector.by, selector.build_predicate(), LookupStrategy.QUERY, reason)
+
+    def plans(self) -> List[SelectorPlan]:
+        with self._lock:
+            return list(self._plans.values())
+
+    def report(self) -> Dict:
+        plans = self.plans()
+        strategies = {}  # type: Dict[str, int]
+        for plan in plans:
+            strategies[plan.strategy.value] = strategies.get(plan.strategy.value, 0) + 1
+        return {
+            "enabled": self.enabled,
+            "strategies": strategies,
+            "selectors": [p.to_dict() for p in sorted(plans, key=lambda p: (p.strategy.value, p.selector))]
+        }
+
+    def export(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(self.report(), f, indent=2)
+
+
+planner = SelectorPlanner(enabled=os.environ.get("INSTATEST_NATIVE_LOCATORS", "1") not in ("0", "false"))
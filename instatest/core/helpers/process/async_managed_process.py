@@ -0,0 +1,298 @@
+import asyncio
+import signal
+import subprocess
+from collections import deque
+from typing import AsyncIterator, Callable, List, Tuple
+
+import psutil
+
+from instatest.core.helpers.process.managed_process import ON_POSIX, ManagedProcess
+from instatest.core.helpers.process.output_pump import READ_SIZE
+from instatest.core.helpers.process.process_tree import own_group, signal_group, wait_exited
+from instatest.core.helpers.process.readiness import ReadinessProbe
+from instatest.core.helpers.test_logger import get_logger
+
+log = get_logger('AsyncOutputBuffer')
+
+
+class AsyncOutputBuffer:
+    """
+    Recent output lines of an async process.  Same subscribe/lines interface as OutputPump so readiness probes work
+    with either
+    """
+
+    def __init__(self, max_lines: int):
+        self._lines = deque(maxlen=max_lines)
+        self._subscribers = []  # type: List[Callable[[str, bytes], None]]
+        self._queues = []  # type: List[asyncio.Queue]
+        self._close_callbacks = []  # type: List[Callable[[], None]]
+        self.line_count = 0
+        self.closed = False
+
+    def subscribe(self, callback: Callable[[str, bytes], None]) -> Callable[[], None]:
+        self._subscribers.append(callback)
+
+        def unsubscribe():
+            if callback in self._subscribers:
+                self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def on_close(self, callback: Callable[[], None]):
+        self._close_callbacks.append(callback)
+
+    def lines(self, stream: str = None) -> List[bytes]:
+        return [line for s, line in self._lines if stream is None or s == stream]
+
+    def open_queue(self) -> asyncio.Queue:
+        queue = asyncio.Queue()
+        for entry in self._lines:
+            queue.put_nowait(entry)
+        if self.closed:
+            queue.put_nowait(None)
+        else:
+            self._queues.append(queue)
+        return queue
+
+    def close_queue(self, queue: asyncio.Queue):
+        if queue in self._queues:
+            self._queues.remove(queue)
+
+    def publish(self, stream: str, line: bytes):
+        if len(line.strip()) == 0:
+            return
+        self._lines.append((stream, line))
+        self.line_count += 1
+        for queue in self._queues:
+            queue.put_nowait((stream, line))
+        for callback in list(self._subscribers):
+            # A failing subscriber must not stop the reader, or the child blocks on a full pipe
+            try:
+                callback(stream, line)
+            except Exception as e:
+                log.warning("Output subscriber raised an exception. {0}".format(e))
+
+    def close(self):
+        self.closed = True
+        for queue in self._queues:
+            queue.put_nowait(None)
+        self._queues = []
+        for callback in self._close_callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log.warning("Output close callback raised an exception. {0}".format(e))
+
+
+class AsyncManagedProcess(ManagedProcess):
+    """
+        asyncio counterpart of ManagedProcess for starting several processes concurrently.  Searching and killing
+        other processes works the same as ManagedProcess.  The process always gets its own session so stop() can
+        signal its whole process group.  output_file is written through the output sink (rotated by size) instead of
+        out/<name>.log; the pipes are still read by this process, so unlike ManagedProcess the output file is not
+        written once this process exits.
+        Ex:
+        servers = [AsyncManagedProcess(cmd_list=[...], readiness_probes=[PortOpen(p)]) for p in ports]
+        await asyncio.gather(*(s.start() for s in servers))
+        await asyncio.gather(*(s.wait_ready() for s in servers))
+    """
+
+    def __init__(self, application_path=None, cmd_list=None, application_search=None, *args, **kwargs):
+        super().__init__(application_path, cmd_list, application_search, *args, **kwargs)
+        self._new_session = True
+        self._async_process = None  # type: asyncio.subprocess.Process
+        self._output = None  # type: AsyncOutputBuffer
+        self._readers = []  # type: List[asyncio.Task]
+        self._drain_task = None  # type: asyncio.Task
+
+    @property
+    def pid(self):
+        if self._async_process:
+            return self._async_process.pid
+        return super().pid
+
+    def get_return_code(self, timeout_s=5):
+        if self._async_process:
+            return self._async_process.returncode
+        return super().get_return_code(timeout_s)
+
+    def is_running(self) -> bool:
+        if self._async_process:
+            return self._async_process.returncode is None
+        return super().is_running()
+
+    async def start(self):
+        command_line = self._build_command_line()
+        self._async_process = await asyncio.create_subprocess_exec(
+            *command_line, stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=self._cwd, close_fds=ON_POSIX,
+            start_new_session=ON_POSIX)
+        self.log.debug("Started process {0}, pid: {1}".format(self.name, self._async_process.pid))
+
+        self._output = AsyncOutputBuffer(self.OUTPUT_BUFFER_LINES)
+        self._attach_output_sink(self._output, self._output_file)
+        self._readers = [asyncio.ensure_future(self._read(name, stream)) for name, stream in
+                         (('stdout', self._async_process.stdout), ('stderr', self._async_process.stderr))]
+        self._drain_task = asyncio.ensure_future(self._close_when_drained())
+        self._threads = [psutil.Process(pid=self._async_process.pid)]
+        self._index.track(self._threads[0])
+        self._start_sampler()
+
+    async def _read(self, name: str, stream: asyncio.StreamReader):
+        partial = b""
+        while True:
+            data = await stream.read(READ_SIZE)
+            if not data:
+                break
+            *complete, partial = (partial + data).split(b"\n")
+            for line in complete:
+                self._output.publish(name, line + b"\n")
+        if partial:
+            self._output.publish(name, partial)
+
+    async def _close_when_drained(self):
+        await asyncio.gather(*self._readers, return_exceptions=True)
+        self._output.close()
+
+    async def wait_ready(self, probes: List[ReadinessProbe] = None, timeout_s=20, poll_interval_s=0.25) -> bool:
+        """
+        Same as ManagedProcess.wait_until_ready without blocking the event loop.  Network probes run in the
+        default executor
+        """
+        if probes is None:
+            probes = self.get_readiness_probes()
+        if not probes:
+            probes = []
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+        unsubscribe = self._output.subscribe(lambda stream, line: wake.set())
+        for probe in probes:
+            probe.attach(self._output)
+        event_driven = all(p.event_driven for p in probes)
+        interval_s = 0.025
+        deadline = loop.time() + timeout_s
+        try:
+            while True:
+                wake.clear()
+                if not probes:
+                    ready = self._output.line_count > 0
+                else:
+                    ready = all(await asyncio.gather(*(self._check(loop, p) for p in probes)))
+                if ready:
+                    self.log.debug("Process {0} ready".format(self.name))
+                    return True
+                if self._async_process.returncode is not None:
+                    self.log.warning("Process {0} exited before it was ready. Return code: {1}".format(
+                        self.name, self._async_process.returncode))
+                    return False
+                remaining_s = deadline - loop.time()
+                if remaining_s <= 0:
+                    self.log.warning("Timed out waiting for {0}".format(self.name))
+                    return False
+                wait_s = 0.5 if event_driven else interval_s
+                interval_s = min(interval_s * 2, poll_interval_s)
+                try:
+                    await asyncio.wait_for(wake.wait(), min(wait_s, remaining_s))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            unsubscribe()
+            for probe in probes:
+                probe.detach()
+
+    @staticmethod
+    async def _check(loop, probe: ReadinessProbe) -> bool:
+        if probe.event_driven:
+            return probe.check()
+        return await loop.run_in_executor(None, probe.check)
+
+    async def stream_lines(self, stream: str = None) -> AsyncIterator[Tuple[str, bytes]]:
+        """
+            Yields (stream name, line) starting with the buffered lines until the process closes its output
+            Ex:
+            async for stream, line in p.stream_lines():
+                ...
+        """
+        queue = self._output.open_queue()
+        try:
+            while True:
+                entry = await queue.get()
+                if entry is None:
+                    return
+                if stream is None or entry[0] == stream:
+                    yield entry
+        finally:
+            self._output.close_queue(queue)
+
+    async def stop(self, grace_s: float = 5, kill_timeout_s: float = 2) -> bool:
+        """
+        SIGTERM the process and its descendants together, SIGKILL whatever is left after grace_s
+        :return: True if every process exited
+        """
+        self._stop_sampler()
+        if self._async_process is None:
+            return True
+        if self._async_process.returncode is not None:
+            await self._finish_drain(kill_timeout_s)
+            return True
+        loop = asyncio.get_running_loop()
+        try:
+            root = psutil.Process(pid=self._async_process.pid)
+            children = root.children(recursive=True)
+            group_id = own_group(root)
+        except psutil.NoSuchProcess:
+            children, group_id = [], None
+        # The root is reaped by asyncio, psutil only waits on the descendants
+        self._signal(self._async_process.terminate, children, lambda c: c.terminate(), group_id, signal.SIGTERM)
+        alive = await self._wait_tree(loop, children, grace_s)
+        if alive or self._async_process.returncode is None:
+            self.log.debug("Process {0} still running after {1}s, sending SIGKILL".format(self.name, grace_s))
+            self._signal(self._async_process.kill, alive, lambda c: c.kill(), group_id,
+                         getattr(signal, 'SIGKILL', signal.SIGTERM))
+            alive = await self._wait_tree(loop, alive, kill_timeout_s)
+        await self._finish_drain(kill_timeout_s)
+        self._index.untrack(self._async_process.pid)
+        self._index.invalidate()
+        stopped = not alive and self._async_process.returncode is not None
+        if not stopped:
+            self.log.warning("Process {0} could not be stopped".format(self.name))
+        return stopped
+
+    async def _finish_drain(self, timeout_s: float):
+        # Processes that escaped the tree can keep the pipes open - don't wait on them forever
+        if self._readers:
+            _, pending = await asyncio.wait(self._readers, timeout=timeout_s)
+            for reader in pending:
+                reader.cancel()
+        # Cancelled readers still let the drain task close the output, only cancel it if that doesn't happen
+        if self._drain_task is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self._drain_task), timeout_s)
+        except asyncio.TimeoutError:
+            self._drain_task.cancel()
+        self._drain_task = None
+
+    async def _wait_tree(self, loop, children: List[psutil.Process], timeout_s: float) -> List[psutil.Process]:
+        root_wait = asyncio.ensure_future(asyncio.wait_for(self._async_process.wait(), timeout_s))
+        children_wait = loop.run_in_executor(None, wait_exited, children, timeout_s)
+        _, alive = await children_wait
+        try:
+            await root_wait
+        except asyncio.TimeoutError:
+            pass
+        return alive
+
+    @staticmethod
+    def _signal(signal_root: Callable, children: List[psutil.Process], signal_child: Callable, group_id, sig):
+        # The group signal also reaches processes that left the tree (ex: orphaned grandchildren) but not the group
+        if group_id is not None:
+            signal_group(group_id, sig)
+        try:
+            signal_root()
+        except ProcessLookupError:
+            pass
+        for child in children:
+            try:
+                signal_child(child)
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                pass
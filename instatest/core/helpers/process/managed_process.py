@@ -1,34 +1,54 @@
 import os
 import subprocess
 import sys
+import threading
 import time
 from multiprocessing import Process
-from queue import Empty, Queue
 from typing import List, Optional
 
 import psutil
 
 from instatest.core.helpers.instatest_object import InstatestObject
-from instatest.core.helpers.test_logger import get_logger
+from instatest.core.helpers.process.output_pump import OutputPump
+from instatest.core.helpers.process.output_sink import OutputSink, rotate_file
+from instatest.core.helpers.process.process_index import ProcessIndex, process_index
+from instatest.core.helpers.process.process_tree import TeardownOutcome, TeardownReport, terminate_tree
+from instatest.core.helpers.process.readiness import ReadinessProbe
+from instatest.core.helpers.process.resource_sampler import ResourceSampler
 
 ON_POSIX = 'posix' in sys.builtin_module_names
 
 
 class ManagedProcess(InstatestObject):
     processes = []  # type: List[Process]
-    queue = None
+    OUTPUT_BUFFER_LINES = 1000
 
 
     def __init__(self, application_path=None, cmd_list=None, application_search=None, *args, **kwargs):
         self._path = application_path
         self._cmd_list = cmd_list
         self._process: subprocess.Popen = None
-        self._queue = None  # type: Queue
-        self._threads = None  # type: List[Process]
+        self._pump = None  # type: OutputPump
+        self._read_cursor = 0
+        self._threads = None  # type: List[psutil.Process]
         self._application_search = application_search
         self._arguments = kwargs.get("arguments", [])
         self._cwd = kwargs.get("cwd", None)
         self._name = kwargs.get("name", None)
+        self._readiness_probes = kwargs.get("readiness_probes", [])  # type: List[ReadinessProbe]
+        self._output_file = kwargs.get("output_file", None)
+        self._attached = None  # type: psutil.Process
+        self._index = kwargs.get("process_index", process_index)  # type: ProcessIndex
+        self._new_session = kwargs.get("new_session", False) or self._output_file is not None
+        self._last_teardown = None  # type: TeardownReport
+        # Seconds between resource samples of the process tree.  Not sampled if None
+        self._sample_interval_s = kwargs.get("sample_interval_s", None)
+        self._resource_report = kwargs.get("resource_report", None)  # .json or .csv written when the process stops
+        self._sampler = None  # type: ResourceSampler
+        self._log_max_bytes = kwargs.get("log_max_bytes", 10 * 1024 * 1024)
+        self._log_backup_count = kwargs.get("log_backup_count", 3)
+        self._log_filter = kwargs.get("log_filter", None)  # Regex or callable(stream, line), only matches are logged
+        self._sink = None  # type: OutputSink
         self._search_for_existing = False
         super().__init__(name=self.name)
 
@@ -37,18 +57,27 @@ class ManagedProcess(InstatestObject):
     def pid(self):
         if self._process:
             return self._process.pid
+        if self._attached:
+            return self._attached.pid
         return None
 
 
-    def start_instance_process(self, wait_for_process: bool = None):
-        if self._search_for_existing:
-            if self.search_for_process():
-                return True
+    def attach_to(self, pid: int):
+        """
+        Manage a process that is already running (ex: left running by a previous test run) instead of starting one
+        """
+        self._attached = psutil.Process(pid=pid)
+        self._threads = [self._attached]
+        self._index.track(self._attached)
+        self.log.debug("Attached to process {0}, pid: {1}".format(self.name, pid))
+
+
+    def _build_command_line(self) -> List[str]:
         command_line = []
 
         if self._cmd_list:
             self.log.debug("cmd_list: {}".format(self._cmd_list))
-            command_line = self._cmd_list
+            command_line = list(self._cmd_list)
         else:
             self.log.debug("Path: {}".format(self._path))
             if self._path:
@@ -59,25 +88,98 @@ class ManagedProcess(InstatestObject):
         self.log.debug(command_line)
         if not self._cwd:
             self._cwd = os.path.abspath(".")  # Use current directory if none defined
+        return command_line
+
 
+    def start_instance_process(self, wait_for_process: bool = None):
+        if self._search_for_existing:
+            if self.search_for_process():
+                return True
+        command_line = self._build_command_line()
+
+        if self._output_file:
+            # Output goes straight to a file and the process gets its own session so it can outlive this one
+            output_path = os.path.abspath(os.path.expanduser(self._output_file))
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            # The file can't be rotated while the process writes to it, so earlier runs are rotated out on start
+            rotate_file(output_path, self._log_backup_count)
+            with open(output_path, "ab") as output:
+                self._process = subprocess.Popen(command_line, stdout=output, stderr=subprocess.STDOUT,
+                                                 close_fds=ON_POSIX, cwd=self._cwd, start_new_session=ON_POSIX)
+            self.log.debug("Started process {0}, pid: {1}, output: {2}".format(self._name, self._process.pid,
+                                                                              output_path))
+            self._pump = None
+            self._threads = [psutil.Process(pid=self._process.pid)]
+            self._index.track(self._threads[0])
+            self._start_sampler()
+            if wait_for_process and wait_for_process is True:
+                self.wait_for_process()
+            return
+
+        # In its own session the whole tree can be stopped with a single signal to the process group
         self._process = subprocess.Popen(
-            command_line, stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=ON_POSIX, cwd=self._cwd)
+            command_line, stdout=subprocess.PIPE, stderr=subprocess.PIPE, close_fds=ON_POSIX, cwd=self._cwd,
+            start_new_session=ON_POSIX and self._new_session)
 
         self.log.debug("Started process {0}, pid: {1}".format(self._name, self._process.pid))
 
-        self._queue = Queue()
-
-        proc_logger = get_logger(
-            "Managed_Process", file=os.path.abspath("./out/" + str(self.name.replace(" ", "_") + ".log")))
-        thread_args = (self._process.stdout, self._process.stderr, self._queue, proc_logger)
-        self._threads = [Process(target=enqueue_output, args=thread_args)]
-        for t in self._threads:
-            t.daemon = True
-            t.start()
+        self._pump = OutputPump({'stdout': self._process.stdout, 'stderr': self._process.stderr},
+                                max_lines=self.OUTPUT_BUFFER_LINES, name=self.name)
+        self._attach_output_sink(self._pump)
+        self._read_cursor = 0
+        self._pump.start()
+        self._threads = [psutil.Process(pid=self._process.pid)]
+        self._index.track(self._threads[0])
+        self._start_sampler()
         if wait_for_process and wait_for_process is True:
             self.wait_for_process()
 
 
+    def _attach_output_sink(self, output, path: str = None):
+        # Output is written to path (out/<name>.log by default), closed once the process closes its pipes
+        if path is None:
+            path = "./out/" + str(self.name.replace(" ", "_") + ".log")
+        self._sink = OutputSink(os.path.abspath(os.path.expanduser(path)),
+                                max_bytes=self._log_max_bytes, backup_count=self._log_backup_count,
+                                line_filter=self._log_filter)
+        output.subscribe(self._sink)
+        output.on_close(self._sink.close)
+
+
+    def get_output_sink(self) -> Optional[OutputSink]:
+        return self._sink
+
+
+    def _start_sampler(self):
+        if self._sample_interval_s:
+            self.start_resource_sampler(self._sample_interval_s)
+
+
+    def start_resource_sampler(self, interval_s=1.0) -> ResourceSampler:
+        """
+        Samples CPU, memory, open files and threads of the process tree until the process is stopped
+        """
+        self._sampler = ResourceSampler(self.pid, interval_s=interval_s)
+        self._sampler.start()
+        return self._sampler
+
+
+    def get_resource_sampler(self) -> Optional[ResourceSampler]:
+        return self._sampler
+
+
+    def _stop_sampler(self):
+        if self._sampler is None:
+            return
+        self._sampler.stop()
+        self.log.debug("Resource usage for {0}: {1}".format(self.name, self._sampler.summary()))
+        if self._resource_report:
+            try:
+                self._sampler.export(self._resource_report)
+            except OSError as e:
+                self.log.warning("Could not write resource report {0}. {1}".format(self._resource_report, e))
+
+
     @property
     def name(self):
         name = self._name
@@ -90,10 +192,22 @@ class ManagedProcess(InstatestObject):
         return isinstance(self._arguments, list) and len(self._arguments) > 0
 
 
-    def get_threads(self) -> List[Process]:
+    def get_threads(self) -> List[psutil.Process]:
         return self._threads
 
 
+    def get_output_pump(self) -> Optional[OutputPump]:
+        return self._pump
+
+
+    def subscribe_output(self, callback):
+        """
+        Calls callback(stream_name, line) for each line the process writes.  Process must be started
+        :return: function that removes the subscription
+        """
+        return self._pump.subscribe(callback)
+
+
     def get_process(self):
         return self._process
 
@@ -104,6 +218,7 @@ class ManagedProcess(InstatestObject):
 
     def kill_processes(self):
         processes_stopped = True
+        self._stop_sampler()
         try:
             return_code = 0
             if self._threads is None or len(self._threads) == 0:
@@ -127,13 +242,39 @@ class ManagedProcess(InstatestObject):
             found_procs = self.search_for_processes()
             self.log.debug("Found process count: {}".format(len(found_procs)))
             for found in found_procs:
-                processes_stopped = processes_stopped and self.terminate_process(found)
-                self.log.debug("Terminated found proc {0}".format(found.is_running() is False))
+                try:
+                    found.terminate()
+                except psutil.Error as e:
+                    # Gone or not ours to signal - keep going with the other matches
+                    self.log.debug("Could not terminate process {0}. {1}".format(found.pid, e))
+            _, still_running = psutil.wait_procs(found_procs, timeout=5)
+            self.log.debug("Terminated found procs, still running: {0}".format(len(still_running)))
+            processes_stopped = processes_stopped and len(still_running) == 0
         except Exception as e:
             self.log.error("Exception caught killing process. ", e)
+        finally:
+            if self.pid:
+                self._index.untrack(self.pid)
+            self._index.invalidate()
         return processes_stopped
 
 
+    def stop_instance_process(self) -> bool:
+        """
+        Stops the process started (or attached to) by this instance and its children without searching for others
+        """
+        self._stop_sampler()
+        if self.pid is None or self.get_return_code() is not None:
+            return True
+        try:
+            return self.kill_with_children(process=psutil.Process(pid=self.pid))
+        except psutil.NoSuchProcess:
+            return True
+        finally:
+            self._index.untrack(self.pid)
+            self._index.invalidate()
+
+
     def terminate_process(self, process: psutil.Process = None):
         if process:
             try:
@@ -149,6 +290,8 @@ class ManagedProcess(InstatestObject):
         return_code = None
         if self._process:
             return_code = self._process.poll()
+        elif self._attached and not self._attached.is_running():
+            return_code = -1  # Not our child, the real exit code isn't available
         return return_code
 
 
@@ -164,126 +307,139 @@ class ManagedProcess(InstatestObject):
         return False
 
 
-    def kill_with_children(self, process_id=None, process: Process = None) -> bool:
-        children_killed: bool = True
-
+    def kill_with_children(self, process_id=None, process: Process = None, grace_s=5) -> bool:
+        """
+        Terminates a process tree in parallel: SIGTERM to every process, one shared grace period, then SIGKILL
+        :return: True if every process in the tree exited
+        """
+        if process is not None:
+            process_id = process.pid
+        if process_id is None:
+            self.log.warning("Trying to kill process but can't find pid or method called without passing process or ID")
+            return False
         try:
-            if process:
-                if not isinstance(process, Process):
-                    process_id = process.pid
-                if process_id is None:
-                    self.log.warning("Trying to kill process but can't find pid or method called without passing process or ID")
-                    return False
-                else:
-                    process = psutil.Process(pid=process_id)
-
-            children = process.children(recursive=True)
-            if len(children) > 0:
-                self.log.debug("Found {0} children".format(str(len(children))))
-                for c in children:
-                    self.log.debug("Killing process pid {0}".format(str(c.pid)))
-                    self.kill_process(c)
-                    children_killed = children_killed and c.is_running() is False
-            self.kill_process(process)
-            return_code = process.wait(timeout=5)
-            children_killed = children_killed and (process.is_running() is False)
-        except ChildProcessError as cpe:
-            self.log.warning("Child Process Error attempting to kill process: {0}. Error: {1}".format(str(process.pid), cpe))
-        except TimeoutError as te:
-            self.log.error(
-                "Timeout error encountered waiting for process to exit.  Process: {0}, Error: {1}".format(process, te))
-        except Exception as e:
-            self.log.warning("Exception in p.terminate")
-            self.log.warning(e)
-        return children_killed
+            root = psutil.Process(pid=process_id)
+        except psutil.NoSuchProcess:
+            return True
+
+        report = terminate_tree(root, grace_s=grace_s, use_process_group=self._new_session)
+        self._last_teardown = report
+        self.log.debug(str(report))
+        for pid in report.pids(TeardownOutcome.SURVIVED) + report.pids(TeardownOutcome.ACCESS_DENIED):
+            self.log.warning("Process {0} could not be stopped".format(pid))
+        return report.success
+
+
+    def get_last_teardown(self) -> Optional[TeardownReport]:
+        return self._last_teardown
 
 
     def wait_for_process(self, queue_size=None, min_wait_s=None, timeout_s=20):
         start_time = time.time()
-        elapsed_time = 0
         # wait until we start getting output from the process
-        break_loop = False
-        process_started = False
-        self.log.debug("Waiting for process to start.  Checking queue size: " + str(queue_size) + ", Min_wait: " +
+        self.log.debug("Waiting for process to start.  Checking line count: " + str(queue_size) + ", Min_wait: " +
                        str(min_wait_s))
-        while not break_loop:
-            elapsed_time = time.time() - start_time
-            if not process_started:
-                queue_size_met = self._queue.qsize() >= queue_size if queue_size else self._queue.qsize() > 0
-                if queue_size_met:
-                    self.log.debug("Process started - queue size: " + str(self._queue.qsize()))
-                    if not min_wait_s:
-                        return True
-                    process_started = break_loop = True
-
-            if not process_started and elapsed_time >= timeout_s:
-                break_loop = True
-
-            if break_loop and min_wait_s and elapsed_time < min_wait_s:
-                break_loop = False
-            time.sleep(0.5)
-        # print("Started: " + str(process_started))
+        if self._pump is None:
+            # Output is going to a file, nothing to count
+            return self.get_return_code() is None
+        line_count = queue_size if queue_size else 1
+        process_started = self._pump.wait_for_lines(line_count, max(timeout_s, min_wait_s or 0))
+        if process_started:
+            self.log.debug("Process started - line count: " + str(self._pump.line_count))
+
+        remaining_s = (min_wait_s or 0) - (time.time() - start_time)
+        if remaining_s > 0:
+            time.sleep(remaining_s)
         return process_started
 
 
-    def read_stdout(self):
-        line = ""
-        while line:
-            try:
-                line = self._queue.get_nowait()
-            except Empty:
-                line = None
-                self.log.debug("no output in process queue")
-            else:
-                self.log.debug(line)
-
-
-    def search_for_process(self):
-        for p in psutil.process_iter():
-            try:
-                if p.name() == self._application_search or self._application_search in p.name(
-                ) or self._application_search in p.cmdline() or self._application_search in p.cmdline():
-                    return p
-            except psutil.AccessDenied:
-                # Don't report error, this just means we don't have access to inspect the process
-                pass
-            except ProcessLookupError:
-                # Don't report error, this just means we don't have access to inspect the process
-                pass
-            except Exception as e:
-                self.log.warning("Caught exception iterating processes {}".format(e))
-        return None
+    def get_readiness_probes(self) -> List[ReadinessProbe]:
+        return self._readiness_probes
+
+
+    def wait_until_ready(self, probes: List[ReadinessProbe] = None, timeout_s=20, poll_interval_s=0.25) -> bool:
+        """
+            Waits until every probe passes.  Output pattern probes are checked as soon as a line arrives, port and
+            http probes are polled starting at 25ms and backing off to poll_interval_s.
+            Ex:
+            p.wait_until_ready([OutputPattern("listening on"), PortOpen(4723)])
+
+        :param probes: Defaults to the readiness_probes the process was created with
+        :return: False if the process exits or the timeout is reached first
+        """
+        if probes is None:
+            probes = self.get_readiness_probes()
+        if not probes:
+            return self.wait_for_process(timeout_s=timeout_s)
+
+        wake = threading.Event()
+        unsubscribe = self._pump.subscribe(lambda stream, line: wake.set()) if self._pump else None
+        for probe in probes:
+            probe.attach(self._pump)
+        event_driven = all(p.event_driven for p in probes)
+        interval_s = 0.025
+        deadline = time.monotonic() + timeout_s
+        try:
+            while True:
+                wake.clear()
+                if all(p.check() for p in probes):
+                    self.log.debug("Process {0} ready: {1}".format(self.name, ", ".join(str(p) for p in probes)))
+                    return True
+                if self._process and self._process.poll() is not None:
+                    self.log.warning("Process {0} exited before it was ready. Return code: {1}".format(
+                        self.name, self._process.returncode))
+                    return False
+                remaining_s = deadline - time.monotonic()
+                if remaining_s <= 0:
+                    self.log.warning("Timed out waiting for {0}: {1}".format(
+                        self.name, ", ".join(str(p) for p in probes if not p.check())))
+                    return False
+                # Event driven probes only need a periodic wake up to notice the process exiting
+                wait_s = 0.5 if event_driven else interval_s
+                interval_s = min(interval_s * 2, poll_interval_s)
+                wake.wait(min(wait_s, remaining_s))
+        finally:
+            if unsubscribe:
+                unsubscribe()
+            for probe in probes:
+                probe.detach()
+
+
+    def read_stdout(self) -> List[bytes]:
+        """
+        Returns (and logs) lines written since the last call.  Lines that dropped out of the buffer are skipped
+        """
+        lines = []
+        if self._pump is None:
+            return lines
+        for sequence, stream, line in self._pump.lines_since(self._read_cursor):
+            self._read_cursor = sequence + 1
+            self.log.debug(line)
+            lines.append(line)
+        if not lines:
+            self.log.debug("no output in process queue")
+        return lines
+
+
+    def search_for_process(self) -> Optional[psutil.Process]:
+        return self._index.find(self._application_search)
 
 
     def search_for_processes(self) -> List[psutil.Process]:
-        processes: list = []
-        for p in psutil.process_iter():
-            try:
-                if self._application_search in p.cmdline():
-                    processes.append(p)
-            except psutil.AccessDenied:
-                # Don't report error, this just means we don't have access to inspect the process
-                pass
-            except ProcessLookupError:
-                # Don't report error, this just means we don't have access to inspect the process
-                pass
-            except Exception as e:
-                self.log.warning("Caught exception iterating processes {}".format(e))
-        return processes
+        if not self._application_search:
+            return []
+        return self._index.find_by_cmdline_token(self._application_search)
 
 
     def is_running(self) -> bool:
-        self.log.debug("Checking if process is running. Searching for {0}".format(self._application_search))
-        process = self.search_for_process()
-        running = process is not None
-        if not running:
-            threads = self.get_threads()
-            if threads and len(threads) > 10:
-                self.log.debug("Threads have been created")
-                for t in threads:
-                    if t.is_alive():
-                        self.log.debug("Process is alive")
-                        running = True
+        # Our own process is answered by poll() (or the tracked pid when attached), no process table scan
+        if self._process:
+            running = self._process.poll() is None
+        elif self._attached:
+            running = self._index.is_tracked_running(self._attached.pid)
+        else:
+            self.log.debug("Checking if process is running. Searching for {0}".format(self._application_search))
+            running = self.search_for_process() is not None
         self.log.debug("Returning {} for is_running".format(str(running)))
         return running
 
@@ -295,19 +451,3 @@ class ManagedProcess(InstatestObject):
             self.log.warning("Timeout waiting for process expired. {}".format(te))
 
         return return_code
-
-def enqueue_output(stdout, stderr, queue: Queue, logger):
-    for line in iter(stdout.readline, b''):
-        if len(line.strip()) > 0:
-            queue.put_nowait(line)
-            if logger:
-                logger.debug(line)
-
-    stdout.close()
-    for line in iter(stderr.readline, b''):
-        if len(line.strip()) > 0:
-            queue.put_nowait(line)
-            if logger:
-                logger.error(line)
-    stderr.close()
-    time.sleep(0.5)
@@ -0,0 +1,193 @@
+import os
+import selectors
+import sys
+import threading
+from collections import deque
+from typing import IO, Callable, Dict, List, Optional, Tuple
+
+from instatest.core.helpers.test_logger import get_logger
+
+ON_POSIX = 'posix' in sys.builtin_module_names
+READ_SIZE = 65536
+
+log = get_logger('OutputPump')
+
+# (sequence number, stream name, line)
+OutputLine = Tuple[int, str, bytes]
+LineCallback = Callable[[str, bytes], None]
+
+
+class OutputPump:
+    """
+        Reads stdout and stderr of a process from a single thread and keeps the most recent lines in memory.
+        Both pipes are multiplexed with selectors so a full stderr pipe can't block stdout (or the child).
+        Ex:
+        pump = OutputPump({'stdout': p.stdout, 'stderr': p.stderr}, name='appium')
+        pump.subscribe(lambda stream, line: print(stream, line))
+        pump.start()
+        pump.wait_for_lines(2, timeout_s=10)
+    """
+
+    def __init__(self, streams: Dict[str, IO], max_lines: int = 1000, name: str = None):
+        """
+        :param streams: stream name to pipe (ex: {'stdout': p.stdout, 'stderr': p.stderr})
+        :param max_lines: Number of recent lines kept in memory
+        """
+        self._streams = {n: s for n, s in streams.items() if s is not None}
+        self._name = name
+        self._lines = deque(maxlen=max_lines)  # type: deque
+        self._line_count = 0
+        self._subscribers = []  # type: List[LineCallback]
+        self._close_callbacks = []  # type: List[Callable[[], None]]
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = None  # type: Optional[threading.Thread]
+
+    @property
+    def thread(self) -> Optional[threading.Thread]:
+        return self._thread
+
+    @property
+    def line_count(self) -> int:
+        """
+        Total lines read, including ones that have dropped out of the buffer
+        """
+        return self._line_count
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def start(self):
+        target = self._run_selector if ON_POSIX else self._run_threads
+        self._thread = threading.Thread(target=target, name="OutputPump-{0}".format(self._name), daemon=True)
+        self._thread.start()
+
+    def join(self, timeout_s: float = None):
+        if self._thread:
+            self._thread.join(timeout_s)
+
+    def subscribe(self, callback: LineCallback) -> Callable[[], None]:
+        """
+        Calls callback(stream_name, line) from the reader thread for every new line
+        :return: function that removes the subscription
+        """
+        with self._condition:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._condition:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+
+        return unsubscribe
+
+    def on_close(self, callback: Callable[[], None]):
+        """
+        Calls callback from the reader thread once every pipe has closed
+        """
+        with self._condition:
+            self._close_callbacks.append(callback)
+
+    def lines(self, stream: str = None) -> List[bytes]:
+        with self._condition:
+            return [line for _, s, line in self._lines if stream is None or s == stream]
+
+    def lines_since(self, sequence: int) -> List[OutputLine]:
+        """
+        Buffered lines with a sequence number >= sequence
+        """
+        with self._condition:
+            return [entry for entry in self._lines if entry[0] >= sequence]
+
+    def wait_for(self, predicate: Callable[[], bool], timeout_s: float) -> bool:
+        """
+        Blocks until predicate() is true.  Rechecked whenever a line arrives or the pipes close
+        """
+        with self._condition:
+            return self._condition.wait_for(lambda: predicate() or self._closed, timeout_s) and predicate()
+
+    def wait_for_lines(self, count: int, timeout_s: float) -> bool:
+        return self.wait_for(lambda: self._line_count >= count, timeout_s)
+
+    def wait_closed(self, timeout_s: float = None) -> bool:
+        with self._condition:
+            return self._condition.wait_for(lambda: self._closed, timeout_s)
+
+    def _publish(self, stream: str, line: bytes):
+        if len(line.strip()) == 0:
+            return
+        with self._condition:
+            self._lines.append((self._line_count, stream, line))
+            self._line_count += 1
+            subscribers = list(self._subscribers)
+            self._condition.notify_all()
+        for callback in subscribers:
+            try:
+                callback(stream, line)
+            except Exception as e:
+                log.warning("Output subscriber raised an exception. {0}".format(e))
+
+    def _close(self):
+        with self._condition:
+            self._closed = True
+            callbacks = list(self._close_callbacks)
+            self._condition.notify_all()
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                log.warning("Output close callback raised an exception. {0}".format(e))
+
+    def _run_selector(self):
+        partial = {n: b"" for n in self._streams}
+        with selectors.DefaultSelector() as selector:
+            for name, stream in self._streams.items():
+                selector.register(stream, selectors.EVENT_READ, name)
+            while selector.get_map():
+                for key, _ in selector.select():
+                    name = key.data
+                    try:
+                        data = os.read(key.fd, READ_SIZE)
+                    except OSError:
+                        data = b""
+                    if not data:
+                        selector.unregister(key.fileobj)
+                        key.fileobj.close()
+                        if partial[name]:
+                            self._publish(name, partial[name])
+                        continue
+                    chunk = partial[name] + data
+                    *complete, partial[name] = chunk.split(b"\n")
+                    for line in complete:
+                        self._publish(name, line + b"\n")
+        self._close()
+
+    def _run_threads(self):
+        # Pipes can't be used with select on Windows - fall back to a blocking reader per stream
+        readers = [threading.Thread(target=self._read_lines, args=(n, s), daemon=True) for n, s in
+                   self._streams.items()]
+        for r in readers:
+            r.start()
+        for r in readers:
+            r.join()
+        self._close()
+
+    def _read_lines(self, name: str, stream: IO):
+        for line in iter(stream.readline, b''):
+            self._publish(name, line)
+        stream.close()
+
+
+def log_output(logger) -> LineCallback:
+    """
+    Subscriber that writes stdout lines at debug level and stderr lines at error level
+    """
+
+    def _log_line(stream: str, line: bytes):
+        if stream == 'stderr':
+            logger.error(line)
+        else:
+            logger.debug(line)
+
+    return _log_line
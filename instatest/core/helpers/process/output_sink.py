@@ -0,0 +1,125 @@
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Callable, List, Optional, Union
+
+from instatest.core.helpers.test_logger import get_logger
+
+log = get_logger('OutputSink')
+
+LineFilter = Union[str, Callable[[str, bytes], bool]]
+
+
+def rotate_file(path: str, backup_count: int):
+    """
+    Moves path to path.1, path.1 to path.2 and so on, dropping what is past backup_count.  Removes path if
+    backup_count is 0
+    """
+    if not os.path.exists(path):
+        return
+    if backup_count > 0:
+        for i in range(backup_count - 1, 0, -1):
+            source = "{0}.{1}".format(path, i)
+            if os.path.exists(source):
+                os.replace(source, "{0}.{1}".format(path, i + 1))
+        os.replace(path, path + ".1")
+    else:
+        os.remove(path)
+
+
+class OutputSink:
+    """
+        Writes process output to a size rotated file with buffered binary writes and keeps the last lines in memory.
+        Used as an OutputPump subscriber in place of a logger call per line.
+        Ex:
+        sink = OutputSink("out/appium.log", max_bytes=10 * 1024 * 1024, line_filter=r"ERROR|WARN")
+        pump.subscribe(sink)
+        ...
+        sink.close()
+    """
+    STDERR_PREFIX = b"[stderr] "
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backup_count: int = 3, tail_lines: int = 200,
+                 line_filter: LineFilter = None, buffer_size: int = 64 * 1024, flush_interval_s: float = 1.0):
+        """
+        :param path: Output file.  Rotated to path.1 .. path.<backup_count> when it reaches max_bytes
+        :param tail_lines: Number of recent lines kept in memory for diagnostics
+        :param line_filter: Only keep lines matching this regex, or for which filter(stream, line) is True
+        :param flush_interval_s: Buffered lines are flushed at least this often while output keeps coming
+        """
+        self._path = os.path.abspath(os.path.expanduser(path))
+        self._max_bytes = max_bytes
+        self._backup_count = backup_count
+        self._buffer_size = buffer_size
+        self._flush_interval_s = flush_interval_s
+        self._filter = self._compile_filter(line_filter)
+        self._tail = deque(maxlen=tail_lines)
+        self._lock = threading.Lock()
+        self._file = None
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self.lines_written = 0
+        self.lines_dropped = 0
+        self._open()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @staticmethod
+    def _compile_filter(line_filter: Optional[LineFilter]) -> Optional[Callable[[str, bytes], bool]]:
+        if line_filter is None or callable(line_filter):
+            return line_filter
+        pattern = re.compile(line_filter.encode('utf-8'))
+        return lambda stream, line: pattern.search(line) is not None
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        self._file = open(self._path, "ab", buffering=self._buffer_size)
+        self._size = self._file.tell()
+
+    def __call__(self, stream: str, line: bytes):
+        self.write(stream, line)
+
+    def write(self, stream: str, line: bytes):
+        if self._filter and not self._filter(stream, line):
+            self.lines_dropped += 1
+            return
+        if stream == 'stderr':
+            line = self.STDERR_PREFIX + line
+        with self._lock:
+            self._tail.append(line)
+            if self._file is None:
+                return
+            self._file.write(line)
+            self._size += len(line)
+            self.lines_written += 1
+            if self._size >= self._max_bytes:
+                self._rotate()
+            elif time.monotonic() - self._last_flush >= self._flush_interval_s:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def _rotate(self):
+        self._file.close()
+        rotate_file(self._path, self._backup_count)
+        self._open()
+
+    def tail(self, count: int = None) -> List[bytes]:
+        with self._lock:
+            lines = list(self._tail)
+        return lines[-count:] if count else lines
+
+    def flush(self):
+        with self._lock:
+            if self._file:
+                self._file.flush()
+                self._last_flush = time.monotonic()
+
+    def close(self):
+        with self._lock:
+            if self._file:
+                self._file.close()
+                self._file = None
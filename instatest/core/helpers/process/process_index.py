@@ -0,0 +1,91 @@
+import threading
+import time
+from typing import Dict, List, Optional, Set
+
+import psutil
+
+from instatest.core.helpers.test_logger import get_logger
+
+log = get_logger('ProcessIndex')
+
+
+class ProcessIndex:
+    """
+        Snapshot of the process table indexed by name and command line token.  The table is read once per ttl_s
+        with process_iter(attrs=...) instead of calling name() and cmdline() on every process for every search.
+        Processes started by instatest are tracked by pid so checking them never needs a table scan.
+    """
+
+    def __init__(self, ttl_s: float = 1.0):
+        self._ttl_s = ttl_s
+        self._lock = threading.Lock()
+        self._taken_at = None  # type: Optional[float]
+        self._processes = {}  # type: Dict[int, psutil.Process]
+        self._by_name = {}  # type: Dict[str, List[int]]
+        self._by_token = {}  # type: Dict[str, List[int]]
+        self._tracked = {}  # type: Dict[int, psutil.Process]
+
+    def invalidate(self):
+        with self._lock:
+            self._taken_at = None
+
+    def refresh(self, force: bool = False):
+        with self._lock:
+            if not force and self._taken_at is not None and time.monotonic() - self._taken_at < self._ttl_s:
+                return
+            processes, by_name, by_token = {}, {}, {}
+            for p in psutil.process_iter(attrs=['pid', 'name', 'cmdline']):
+                # process_iter fills info with None for attributes it isn't allowed to read
+                name = p.info.get('name') or ""
+                cmdline = p.info.get('cmdline') or []
+                processes[p.pid] = p
+                by_name.setdefault(name, []).append(p.pid)
+                for token in set(cmdline):
+                    by_token.setdefault(token, []).append(p.pid)
+            self._processes, self._by_name, self._by_token = processes, by_name, by_token
+            self._taken_at = time.monotonic()
+
+    def find_by_cmdline_token(self, token: str) -> List[psutil.Process]:
+        """
+        Processes with token as one of their command line arguments
+        """
+        self.refresh()
+        return [self._processes[pid] for pid in self._by_token.get(token, [])]
+
+    def find_by_name(self, search: str, partial: bool = True) -> List[psutil.Process]:
+        self.refresh()
+        pids = list(self._by_name.get(search, []))
+        if partial:
+            # Only the distinct names are scanned, not every process
+            for name, name_pids in self._by_name.items():
+                if name != search and search in name:
+                    pids.extend(name_pids)
+        return [self._processes[pid] for pid in pids]
+
+    def find(self, search: str) -> Optional[psutil.Process]:
+        """
+        First process whose name matches or contains search, or that has search as a command line argument
+        """
+        if not search:
+            return None
+        found = self.find_by_name(search) or self.find_by_cmdline_token(search)
+        return found[0] if found else None
+
+    def track(self, process: psutil.Process):
+        self._tracked[process.pid] = process
+
+    def untrack(self, pid: int):
+        self._tracked.pop(pid, None)
+
+    def tracked(self) -> Set[int]:
+        return set(self._tracked.keys())
+
+    def is_tracked_running(self, pid: int) -> bool:
+        process = self._tracked.get(pid, None)
+        try:
+            return process is not None and process.is_running() and process.status() != psutil.STATUS_ZOMBIE
+        except psutil.NoSuchProcess:
+            return False
+
+
+process_index = ProcessIndex()
@@ -0,0 +1,159 @@
+import os
+import signal
+import sys
+import time
+from typing import Dict, List, Optional
+
+import psutil
+
+from instatest.core.helpers.test_logger import get_logger
+
+ON_POSIX = 'posix' in sys.builtin_module_names
+
+log = get_logger('ProcessTree')
+
+
+class TeardownOutcome:
+    TERMINATED = "terminated"  # Exited within the grace period after SIGTERM
+    KILLED = "killed"  # Needed SIGKILL
+    GONE = "gone"  # Already exited before it was signalled
+    SURVIVED = "survived"  # Still running after SIGKILL
+    ACCESS_DENIED = "access_denied"
+
+
+class TeardownReport:
+    def __init__(self, root_pid: int):
+        self.root_pid = root_pid
+        self.outcomes = {}  # type: Dict[int, str]
+        self.elapsed_s = 0.0
+        self.used_process_group = False
+
+    def pids(self, outcome: str) -> List[int]:
+        return [pid for pid, o in self.outcomes.items() if o == outcome]
+
+    @property
+    def success(self) -> bool:
+        return all(o in (TeardownOutcome.TERMINATED, TeardownOutcome.KILLED, TeardownOutcome.GONE) for o in
+                   self.outcomes.values())
+
+    def __str__(self):
+        counts = {}
+        for o in self.outcomes.values():
+            counts[o] = counts.get(o, 0) + 1
+        return "Teardown of {0}: {1} processes in {2:.2f}s {3}".format(self.root_pid, len(self.outcomes),
+                                                                     self.elapsed_s, counts)
+
+
+def terminate_tree(root: psutil.Process, grace_s: float = 5.0, kill_timeout_s: float = 2.0,
+                   include_root: bool = True, use_process_group: bool = False) -> TeardownReport:
+    """
+    SIGTERM a process and all of its descendants at once, wait for them together and SIGKILL whatever is left
+    after one shared grace period.
+
+    :param use_process_group: Signal the root's process group with a single killpg.  Only used if the root leads its
+                              own group (ex: started with start_new_session) - never the group of this process.
+                              Descendants that moved to another group (setsid/setpgid) are signalled one by one
+    """
+    start = time.monotonic()
+    report = TeardownReport(root.pid)
+    try:
+        processes = root.children(recursive=True)
+    except psutil.NoSuchProcess:
+        processes = []
+    if include_root:
+        processes.append(root)
+
+    group_id = own_group(root) if use_process_group else None
+    report.used_process_group = group_id is not None
+    if group_id is not None:
+        signal_group(group_id, signal.SIGTERM)
+    signalled = []
+    for p in processes:
+        try:
+            if group_id is None or not _in_group(p, group_id):
+                p.terminate()
+            signalled.append(p)
+        except psutil.NoSuchProcess:
+            report.outcomes[p.pid] = TeardownOutcome.GONE
+        except psutil.AccessDenied:
+            report.outcomes[p.pid] = TeardownOutcome.ACCESS_DENIED
+
+    gone, alive = wait_exited(signalled, timeout_s=grace_s)
+    for p in gone:
+        report.outcomes[p.pid] = TeardownOutcome.TERMINATED
+
+    if alive:
+        log.debug("{0} processes still running after {1}s, sending SIGKILL".format(len(alive), grace_s))
+        if group_id is not None:
+            signal_group(group_id, signal.SIGKILL)
+        for p in alive:
+            try:
+                p.kill()
+            except psutil.NoSuchProcess:
+                pass
+            except psutil.AccessDenied:
+                report.outcomes[p.pid] = TeardownOutcome.ACCESS_DENIED
+        killed, survived = wait_exited([p for p in alive if p.pid not in report.outcomes], timeout_s=kill_timeout_s)
+        for p in killed:
+            report.outcomes[p.pid] = TeardownOutcome.KILLED
+        for p in survived:
+            report.outcomes[p.pid] = TeardownOutcome.SURVIVED
+
+    report.elapsed_s = time.monotonic() - start
+    return report
+
+
+def wait_exited(processes: List[psutil.Process], timeout_s: float):
+    """
+    psutil.wait_procs that also counts zombies as exited.  Grandchildren stay zombies until their own parent reaps
+    them, which would otherwise use up the whole timeout.
+    :return: (gone, alive)
+    """
+    deadline = time.monotonic() + timeout_s
+    gone, alive = [], list(processes)
+    while alive:
+        exited, alive = psutil.wait_procs(alive, timeout=max(min(0.05, deadline - time.monotonic()), 0))
+        gone.extend(exited)
+        zombies = [p for p in alive if _is_zombie(p)]
+        gone.extend(zombies)
+        alive = [p for p in alive if p not in zombies]
+        if time.monotonic() >= deadline:
+            break
+    return gone, alive
+
+
+def _is_zombie(process: psutil.Process) -> bool:
+    try:
+        return process.status() == psutil.STATUS_ZOMBIE
+    except psutil.NoSuchProcess:
+        return True
+
+
+def own_group(root: psutil.Process) -> Optional[int]:
+    """
+    Process group id if root leads its own group (ex: started with start_new_session) and it isn't the group of this
+    process, otherwise None
+    """
+    if not ON_POSIX:
+        return None
+    try:
+        group_id = os.getpgid(root.pid)
+    except ProcessLookupError:
+        return None
+    if group_id != root.pid or group_id == os.getpgrp():
+        return None
+    return group_id
+
+
+def _in_group(process: psutil.Process, group_id: int) -> bool:
+    try:
+        return os.getpgid(process.pid) == group_id
+    except ProcessLookupError:
+        return False
+
+
+def signal_group(group_id: int, sig):
+    try:
+        os.killpg(group_id, sig)
+    except (ProcessLookupError, PermissionError) as e:
+        log.debug("Could not signal process group {0}. {1}".format(group_id, e))
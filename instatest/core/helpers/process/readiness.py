@@ -0,0 +1,102 @@
+import re
+import socket
+import threading
+import urllib.error
+import urllib.request
+from typing import Optional
+
+from instatest.core.helpers.process.output_pump import OutputPump
+
+
+class ReadinessProbe:
+    """
+    Condition that tells when a managed process is ready.  Event driven probes are rechecked whenever the process
+    writes a line, others are polled.
+    """
+    event_driven = False
+
+    def attach(self, pump: Optional[OutputPump]):
+        pass
+
+    def detach(self):
+        pass
+
+    def check(self) -> bool:
+        raise NotImplementedError()
+
+    def __str__(self):
+        return self.__class__.__name__
+
+
+class OutputPattern(ReadinessProbe):
+    event_driven = True
+
+    def __init__(self, pattern: str, stream: str = None):
+        """
+        :param pattern: Regex searched for in each output line
+        :param stream: Only look at 'stdout' or 'stderr'.  Both if None
+        """
+        self._pattern = re.compile(pattern.encode('utf-8') if isinstance(pattern, str) else pattern)
+        self._stream = stream
+        self._matched = threading.Event()
+        self._unsubscribe = None
+
+    def attach(self, pump: Optional[OutputPump]):
+        self._matched.clear()
+        if pump is None:
+            return
+        # Subscribe before scanning the buffer so a line can't slip in between
+        self._unsubscribe = pump.subscribe(self._on_line)
+        for line in pump.lines(self._stream):
+            self._on_line(self._stream, line)
+
+    def detach(self):
+        if self._unsubscribe:
+            self._unsubscribe()
+            self._unsubscribe = None
+
+    def _on_line(self, stream: str, line: bytes):
+        if (self._stream is None or stream == self._stream) and self._pattern.search(line):
+            self._matched.set()
+
+    def check(self) -> bool:
+        return self._matched.is_set()
+
+    def __str__(self):
+        return "OutputPattern({0})".format(self._pattern.pattern)
+
+
+class PortOpen(ReadinessProbe):
+    def __init__(self, port: int, host: str = "127.0.0.1", connect_timeout_s: float = 0.5):
+        self.port = port
+        self.host = host
+        self._connect_timeout_s = connect_timeout_s
+
+    def check(self) -> bool:
+        try:
+            with socket.create_connection((self.host, self.port), timeout=self._connect_timeout_s):
+                return True
+        except OSError:
+            return False
+
+    def __str__(self):
+        return "PortOpen({0}:{1})".format(self.host, self.port)
+
+
+class HttpStatus(ReadinessProbe):
+    def __init__(self, url: str, status: int = 200, request_timeout_s: float = 1):
+        self.url = url
+        self.status = status
+        self._request_timeout_s = request_timeout_s
+
+    def check(self) -> bool:
+        try:
+            with urllib.request.urlopen(self.url, timeout=self._request_timeout_s) as response:
+                return response.status == self.status
+        except urllib.error.HTTPError as he:
+            return he.code == self.status
+        except (urllib.error.URLError, OSError):
+            return False
+
+    def __str__(self):
+        return "HttpStatus({0})".format(self.url)
@@ -0,0 +1,147 @@
+import csv
+import json
+import os
+import threading
+import time
+from array import array
+from typing import Dict, List, Optional
+
+import psutil
+
+from instatest.core.helpers.test_logger import get_logger
+
+log = get_logger('ResourceSampler')
+
+COLUMNS = ('timestamp', 'cpu_percent', 'rss_bytes', 'open_fds', 'threads', 'processes')
+
+
+class ResourceSampler:
+    """
+        Samples CPU%, RSS, open file descriptors and thread count for a process tree on a background thread.
+        Samples are kept in typed arrays (one per column) so long runs stay small.
+        Ex:
+        sampler = ResourceSampler(appium.pid, interval_s=0.5)
+        sampler.start()
+        ...
+        sampler.stop()
+        sampler.summary()  # {'peak_rss_bytes': ..., 'mean_cpu_percent': ...}
+    """
+
+    def __init__(self, pid: int, interval_s: float = 1.0, include_children: bool = True):
+        self._pid = pid
+        self._interval_s = interval_s
+        self._include_children = include_children
+        self._columns = {
+            'timestamp': array('d'),
+            'cpu_percent': array('f'),
+            'rss_bytes': array('Q'),
+            'open_fds': array('I'),
+            'threads': array('I'),
+            'processes': array('I')
+        }
+        self._processes = {}  # type: Dict[int, psutil.Process]
+        self._stop = threading.Event()
+        self._thread = None  # type: Optional[threading.Thread]
+        self._lock = threading.Lock()
+
+    @property
+    def sample_count(self) -> int:
+        return len(self._columns['timestamp'])
+
+    def start(self):
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="ResourceSampler-{0}".format(self._pid), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(self._interval_s + 1)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if not self.sample():
+                    break
+            except psutil.Error as e:
+                log.debug("Stopped sampling {0}. {1}".format(self._pid, e))
+                break
+            self._stop.wait(self._interval_s)
+
+    def sample(self) -> bool:
+        """
+        Records one sample.  Returns False once the root process is gone or its tree can't be read
+        """
+        try:
+            root = self._get_process(self._pid)
+            tree = [root] + (root.children(recursive=True) if self._include_children else [])
+        except psutil.Error as e:
+            # The tree can be half torn down: children() raises for a root that is exiting or no longer readable
+            log.debug("Could not read process tree of {0}. {1}".format(self._pid, e))
+            return False
+        cpu = 0.0
+        rss = fds = threads = count = 0
+        for p in tree:
+            try:
+                p = self._get_process(p.pid, p)
+                with p.oneshot():
+                    # First cpu_percent call for a process is always 0, the cached Process makes later calls real
+                    cpu += p.cpu_percent(interval=None)
+                    rss += p.memory_info().rss
+                    fds += p.num_fds() if hasattr(p, 'num_fds') else p.num_handles()
+                    threads += p.num_threads()
+                count += 1
+            except psutil.Error:
+                continue
+        live = set(p.pid for p in tree)
+        self._processes = {pid: p for pid, p in self._processes.items() if pid in live}
+        with self._lock:
+            values = (time.time(), cpu, rss, fds, threads, count)
+            for column, value in zip(COLUMNS, values):
+                self._columns[column].append(value)
+        return True
+
+    def _get_process(self, pid: int, process: psutil.Process = None) -> psutil.Process:
+        if pid not in self._processes:
+            self._processes[pid] = process if process else psutil.Process(pid=pid)
+        return self._processes[pid]
+
+    def samples(self) -> List[Dict]:
+        with self._lock:
+            return [dict(zip(COLUMNS, row)) for row in zip(*(self._columns[c] for c in COLUMNS))]
+
+    def summary(self) -> Dict:
+        with self._lock:
+            count = self.sample_count
+            if count == 0:
+                return {"samples": 0}
+            cpu = self._columns['cpu_percent']
+            timestamps = self._columns['timestamp']
+            return {
+                "samples": count,
+                "duration_s": timestamps[-1] - timestamps[0],
+                "peak_rss_bytes": max(self._columns['rss_bytes']),
+                "mean_cpu_percent": sum(cpu) / count,
+                "max_cpu_percent": max(cpu),
+                "peak_open_fds": max(self._columns['open_fds']),
+                "peak_threads": max(self._columns['threads']),
+                "peak_processes": max(self._columns['processes'])
+            }
+
+    def export(self, path: str):
+        """
+        Writes the samples to path.  JSON if the file ends in .json, CSV otherwise
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if path.endswith(".json"):
+            with open(path, "w") as f:
+                json.dump({"pid": self._pid, "summary": self.summary(), "samples": self.samples()}, f)
+        else:
+            with open(path, "w", newline="") as f:
+                writer = csv.writer(f)
+                writer.writerow(COLUMNS)
+                with self._lock:
+                    writer.writerows(zip(*(self._columns[c] for c in COLUMNS)))
+        log.debug("Exported {0} resource samples to {1}".format(self.sample_count, path))
@@ -0,0 +1,236 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple, Type
+
+from instatest.core.helpers.instatest_object import InstatestObject
+
+RecordRow = Tuple[str, str, Optional[str], Optional[str], Optional[str], str, float]
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    name TEXT,
+    platform TEXT,
+    build_id TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (kind, key)
+);
+CREATE INDEX IF NOT EXISTS records_name ON records (kind, name);
+CREATE INDEX IF NOT EXISTS records_platform ON records (kind, platform);
+CREATE INDEX IF NOT EXISTS records_build_id ON records (kind, build_id);
+"""
+
+
+def kind_of(persistable) -> str:
+    """
+    Record kind of a Persistable class or object.  Subclasses share their base kind, ex: AndroidDevice -> 'device'
+    """
+    kind = getattr(persistable, 'STORE_KIND', None)
+    if kind is None:
+        cls = persistable if isinstance(persistable, type) else type(persistable)
+        kind = cls.__name__.lower()
+    return kind
+
+
+def platform_of(cls: Type) -> Optional[str]:
+    """
+    Platform a class's records are limited to, from its STORE_PLATFORM.  Ex: AndroidDevice -> 'android', Device -> None
+    """
+    platform = getattr(cls, 'STORE_PLATFORM', None)
+    return str(getattr(platform, 'value', platform)) if platform is not None else None
+
+
+class RecordStore(InstatestObject):
+    """
+        Single file SQLite store for Persistable objects (MobileApplication, Device).  Objects are stored as their
+        export() data and rebuilt with load(), with name, platform and build_id indexed for lookups.
+        Writes happen in transactions so several workers can share the file.
+        Ex:
+        store = RecordStore()
+        with store.batch():
+            for app in apps:
+                store.save(app)
+        release_apps = store.find(MobileApplication, platform="android", build_id="1234")
+    """
+    DEFAULT_PATH = "~/.instatest/instatest.db"
+
+    def __init__(self, path: str = None, timeout_s: float = 30):
+        super().__init__(name="RecordStore")
+        self._path = os.path.abspath(os.path.expanduser(path if path else self.DEFAULT_PATH))
+        self._timeout_s = timeout_s
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        self._connection().executescript(SCHEMA)
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections can't be shared between threads, keep one per thread
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self._path, timeout=self._timeout_s, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            self._local.pending = None
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+
+    @contextmanager
+    def batch(self):
+        """
+        Collects save() calls made in this thread and writes them in one transaction on exit.  Nothing is written if
+        the block raises
+        """
+        self._connection()
+        if self._local.pending is not None:
+            yield self
+            return
+        self._local.pending = []
+        try:
+            yield self
+            rows = self._local.pending
+        finally:
+            self._local.pending = None
+        self._write(rows)
+
+    @staticmethod
+    def _row(kind: str, key: str, data: Dict) -> RecordRow:
+        platform = data.get("platform", None)
+        return (kind, key, data.get("name", None), str(platform) if platform is not None else None,
+                str(data["build_id"]) if data.get("build_id", None) is not None else None,
+                json.dumps(data, sort_keys=True), time.time())
+
+    def _write(self, rows: List[RecordRow]):
+        if not rows:
+            return
+        with self._transaction() as connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO records (kind, key, name, platform, build_id, data, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    @staticmethod
+    def key_of(persistable) -> str:
+        if hasattr(persistable, 'store_key'):
+            return persistable.store_key()
+        return str(persistable.name)
+
+    def save(self, persistable, key: str = None):
+        self.save_data(kind_of(persistable), key if key else self.key_of(persistable), persistable.export())
+
+    def save_all(self, persistables: List):
+        with self.batch():
+            for persistable in persistables:
+                self.save(persistable)
+
+    def save_data(self, kind: str, key: str, data: Dict):
+        row = self._row(kind, key, data)
+        self._connection()
+        if self._local.pending is not None:
+            self._local.pending.append(row)
+        else:
+            self._write([row])
+
+    @staticmethod
+    def _where(kind: str, **columns) -> Tuple[str, List[str]]:
+        clauses = ["kind = ?"]
+        params = [kind]
+        for column, value in sorted(columns.items()):
+            if value is not None:
+                clauses.append("{0} = ?".format(column))
+                params.append(str(getattr(value, 'value', value)))
+        return " AND ".join(clauses), params
+
+    def get_data(self, kind: str, key: str, platform: str = None) -> Optional[Dict]:
+        where, params = self._where(kind, key=key, platform=platform)
+        row = self._connection().execute("SELECT data FROM records WHERE {0}".format(where), params).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get(self, cls: Type, key: str):
+        data = self.get_data(kind_of(cls), key, platform_of(cls))
+        return cls.load(data) if data is not None else None
+
+    def find_data(self, kind: str, name: str = None, platform: str = None, build_id: str = None) -> List[Dict]:
+        where, params = self._where(kind, name=name, platform=platform, build_id=build_id)
+        rows = self._connection().execute(
+            "SELECT data FROM records WHERE {0} ORDER BY updated_at DESC".format(where), params)
+        return [json.loads(row[0]) for row in rows]
+
+    def find(self, cls: Type, name: str = None, platform=None, build_id: str = None) -> List:
+        """
+        Records of a platform subclass are limited to its platform, ex: find(AndroidDevice) skips iOS devices while
+        find(Device) returns both, each loaded as its platform's class
+        :param platform: DevicePlatform or its value
+        :return: Loaded objects, most recently saved first
+        """
+        own_platform = platform_of(cls)
+        if platform is None:
+            platform = own_platform
+        elif own_platform is not None and str(getattr(platform, 'value', platform)) != own_platform:
+            return []
+        return [cls.load(data) for data in self.find_data(kind_of(cls), name, platform, build_id)]
+
+    def delete(self, cls: Type, key: str) -> bool:
+        where, params = self._where(kind_of(cls), key=key, platform=platform_of(cls))
+        with self._transaction() as connection:
+            cursor = connection.execute("DELETE FROM records WHERE {0}".format(where), params)
+        return cursor.rowcount > 0
+
+    def count(self, cls: Type = None) -> int:
+        if cls is None:
+            return self._connection().execute("SELECT COUNT(*) FROM records").fetchone()[0]
+        where, params = self._where(kind_of(cls), platform=platform_of(cls))
+        return self._connection().execute("SELECT COUNT(*) FROM records WHERE {0}".format(where), params).fetchone()[0]
+
+    def close(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def migrate_json(self, cls: Type, directory: str, pattern: str = "*.json") -> int:
+        """
+            One shot import of the JSON files written by save()/get_json_file.  Each file's data is stored as is under
+            its file name, in a single transaction.  The JSON files are left in place.
+            Ex:
+            store.migrate_json(MobileApplication, MobileApplication.JSON_PATH)
+            store.migrate_json(Device, Device.JSON_PATH)
+        :return: Number of records imported
+        """
+        kind = kind_of(cls)
+        imported = 0
+        directory = os.path.abspath(os.path.expanduser(directory))
+        with self.batch():
+            for file_path in sorted(glob.glob(os.path.join(directory, pattern))):
+                try:
+                    with open(file_path) as f:
+                        data = json.load(f)
+                except (ValueError, OSError) as e:
+                    self.log.warning("Skipping {0}, could not read it. {1}".format(file_path, e))
+                    continue
+                if not isinstance(data, dict):
+                    self.log.warning("Skipping {0}, expected an object".format(file_path))
+                    continue
+                self.save_data(kind, os.path.splitext(os.path.basename(file_path))[0], data)
+                imported += 1
+        self.log.info("Imported {0} {1} records from {2}".format(imported, kind, directory))
+        return imported
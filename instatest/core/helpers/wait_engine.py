@@ -0,0 +1,98 @@
+import time
+from typing import Any, Callable, Dict, Hashable, Iterator, Optional, Tuple
+
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+from instatest.core.configuration.runtime.global_test_data import TestData
+from instatest.core.helpers.instatest_object import InstatestObject
+
+
+class Backoff:
+    """
+    Polling delays that start short and grow by factor up to max_s.  A fast UI is seen after initial_s instead of a
+    full polling interval, a slow one isn't hammered with requests.
+    """
+
+    def __init__(self, initial_s: float = 0.05, factor: float = 2.0, max_s: float = None):
+        self.initial_s = initial_s
+        self.factor = factor
+        self.max_s = max_s
+
+    def delays(self) -> Iterator[float]:
+        max_s = self.max_s if self.max_s is not None else TestData.get_polling_seconds()
+        delay = min(self.initial_s, max_s)
+        while True:
+            yield delay
+            delay = min(delay * self.factor, max_s)
+
+
+class WaitEngine(InstatestObject):
+    IGNORED_EXCEPTIONS = (NoSuchElementException, StaleElementReferenceException)
+
+    def __init__(self, timeout_s: float = None, backoff: Backoff = None, ignored_exceptions=None):
+        """
+        :param timeout_s: Default timeout.  Uses TestData.get_default_timeout() if None
+        :param backoff: Polling schedule
+        :param ignored_exceptions: Exceptions raised by a condition that are treated as 'not yet'
+        """
+        super().__init__(name="WaitEngine")
+        self._timeout_s = timeout_s
+        self._backoff = backoff if backoff else Backoff()
+        self._ignored_exceptions = tuple(ignored_exceptions) if ignored_exceptions else self.IGNORED_EXCEPTIONS
+
+    def until(self, condition: Callable[[], Any], timeout_s: float = None, message: str = "") -> Any:
+        """
+        Polls condition until it returns a truthy value and returns it
+        :raises TimeoutException: condition was not met in time
+        """
+        _, value = self.until_any({None: condition}, timeout_s=timeout_s, message=message)
+        return value
+
+    def until_any(self, conditions: Dict[Hashable, Callable[[], Any]], timeout_s: float = None,
+                  message: str = "") -> Tuple[Hashable, Any]:
+        """
+            Checks every condition once per sweep and returns as soon as one of them is met
+            Ex:
+            key, el = engine.until_any({'error': error_banner_present, 'success': success_screen_present})
+
+        :return: (key of the condition that was met, value it returned)
+        :raises TimeoutException: No condition was met in time
+        """
+        if timeout_s is None:
+            timeout_s = self._timeout_s if self._timeout_s is not None else TestData.get_default_timeout()
+        deadline = time.monotonic() + timeout_s
+        delays = self._backoff.delays()
+        sweeps = 0
+        while True:
+            sweeps += 1
+            for key, condition in conditions.items():
+                value = self._check(condition)
+                if value:
+                    self.log.debug("Wait condition {0} met after {1} sweeps".format(key, sweeps))
+                    return key, value
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            time.sleep(min(next(delays), remaining))
+        raise TimeoutException(
+            msg="{0} Conditions not met after {1}s ({2} sweeps): {3}".format(message, timeout_s, sweeps,
+                                                                              list(conditions.keys())).strip())
+
+    def _check(self, condition: Callable[[], Any]) -> Optional[Any]:
+        try:
+            return condition()
+        except self._ignored_exceptions:
+            return None
+
+
+def presence_of(base, by, value) -> Callable[[], Any]:
+    """
+    Condition returning the first element matching (by, value) under base (driver or WebElement).  Uses find_elements
+    so a missing element doesn't raise
+    """
+
+    def _present():
+        found = base.find_elements(by, value)
+        return found[0] if found else None
+
+    return _present
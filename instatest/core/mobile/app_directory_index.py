@@ -0,0 +1,146 @@
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ENVIRONMENTS = ['release', 'debug']
+
+
+class AppFileEntry:
+    __slots__ = ('path', 'name', 'extension', 'environment', 'mtime_ns', 'size')
+
+    def __init__(self, path: str, name: str, extension: str, environment: Optional[str], mtime_ns: int, size: int):
+        self.path = path
+        self.name = name
+        self.extension = extension
+        self.environment = environment
+        self.mtime_ns = mtime_ns
+        self.size = size
+
+    def __repr__(self):
+        return "AppFileEntry({0}, {1})".format(self.name, self.environment)
+
+
+def environment_of(file_name: str, environments: Iterable[str] = ENVIRONMENTS) -> Optional[str]:
+    lower = file_name.lower()
+    return next((e for e in environments if e in lower), None)
+
+
+class AppDirectoryIndex:
+    """
+        One scan of an application directory, grouped by extension and environment.  The directory is scanned again
+        only when its mtime changes (a file was added, removed or renamed).  Files overwritten in place don't change
+        it, so the entries a query returns are stat'ed again.
+        Ex:
+        index = AppDirectoryIndex.for_directory("~/builds")
+        apk = index.newest(extensions=['apk'], environment='release', contains='applicant')
+    """
+    _indexes = {}  # type: Dict[str, AppDirectoryIndex]
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, path: str):
+        self._path = os.path.abspath(os.path.expanduser(path))
+        self._lock = threading.Lock()
+        self._dir_mtime_ns = None  # type: Optional[int]
+        self._entries = []  # type: List[AppFileEntry]
+        self._by_key = {}  # type: Dict[Tuple[str, Optional[str]], List[AppFileEntry]]
+        self.scan_count = 0
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _refresh(self):
+        try:
+            mtime_ns = os.stat(self._path).st_mtime_ns
+        except OSError:
+            mtime_ns = None
+        with self._lock:
+            if mtime_ns == self._dir_mtime_ns and self.scan_count:
+                return
+            self._entries, self._by_key = self._scan() if mtime_ns is not None else ([], {})
+            self._dir_mtime_ns = mtime_ns
+            self.scan_count += 1
+
+    def _scan(self) -> Tuple[List[AppFileEntry], Dict[Tuple[str, Optional[str]], List[AppFileEntry]]]:
+        entries = []
+        by_key = {}
+        with os.scandir(self._path) as it:
+            for dir_entry in it:
+                name = dir_entry.name
+                _, dot, extension = name.rpartition('.')
+                if not dot or name.startswith('.'):
+                    continue
+                extension = extension.lower()
+                # iOS simulator builds are .app directories, everything else is a file
+                if not (dir_entry.is_file() or (extension == 'app' and dir_entry.is_dir())):
+                    continue
+                stat = dir_entry.stat()
+                entry = AppFileEntry(dir_entry.path, name, extension, environment_of(name), stat.st_mtime_ns,
+                                     stat.st_size)
+                entries.append(entry)
+                by_key.setdefault((extension, entry.environment), []).append(entry)
+        # Newest first so queries can return the first match
+        for group in by_key.values():
+            group.sort(key=lambda e: e.mtime_ns, reverse=True)
+        entries.sort(key=lambda e: e.mtime_ns, reverse=True)
+        return entries, by_key
+
+    def find(self, extensions: Iterable[str] = None, environment: str = None, contains: str = None) -> List[AppFileEntry]:
+        """
+        Matching entries, newest first
+        :param environment: Only files tagged with this environment, ex: 'release'
+        :param contains: Only files with this text in their name (case insensitive), ex: a project name
+        """
+        self._refresh()
+        if extensions is None:
+            candidates = self._entries if environment is None else \
+                [e for e in self._entries if e.environment == environment.lower()]
+        else:
+            extensions = [x.lower() for x in extensions]
+            if environment is None:
+                candidates = [e for e in self._entries if e.extension in extensions]
+            else:
+                candidates = []
+                for extension in extensions:
+                    candidates.extend(self._by_key.get((extension, environment.lower()), []))
+        if contains:
+            contains = contains.lower()
+            candidates = [e for e in candidates if contains in e.name.lower()]
+        return self._restat(candidates)
+
+    @staticmethod
+    def _restat(candidates: List[AppFileEntry]) -> List[AppFileEntry]:
+        # Only the matches are stat'ed, the directory isn't scanned again.  Entries are updated in place, so the
+        # result is sorted again rather than trusting the order of the scan
+        current = []
+        for entry in candidates:
+            try:
+                stat = os.stat(entry.path)
+            except OSError:
+                continue
+            entry.mtime_ns, entry.size = stat.st_mtime_ns, stat.st_size
+            current.append(entry)
+        current.sort(key=lambda e: e.mtime_ns, reverse=True)
+        return current
+
+    def newest(self, extensions: Iterable[str] = None, environment: str = None,
+               contains: str = None) -> Optional[AppFileEntry]:
+        matches = self.find(extensions, environment, contains)
+        return matches[0] if matches else None
+
+    def invalidate(self):
+        with self._lock:
+            self._dir_mtime_ns = None
+            self.scan_count = 0
+
+    @classmethod
+    def for_directory(cls, path: str) -> 'AppDirectoryIndex':
+        """
+        Shared index for a directory so every MobileApplication pointing at it reuses one scan
+        """
+        path = os.path.abspath(os.path.expanduser(path))
+        with cls._indexes_lock:
+            index = cls._indexes.get(path)
+            if index is None:
+                index = cls._indexes[path] = cls(path)
+            return index
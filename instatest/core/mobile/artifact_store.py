@@ -0,0 +1,301 @@
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Union
+
+from instatest.core.helpers.exceptions import InvalidConfigurationError
+from instatest.core.helpers.file_fingerprint import DEFAULT_ALGORITHM, fingerprint_file, hash_file
+from instatest.core.helpers.instatest_object import InstatestObject
+from instatest.core.mobile.mobile_application import MobileApplication
+
+ON_POSIX = 'posix' in sys.builtin_module_names
+if ON_POSIX:
+    import fcntl
+
+FICLONE = 0x40049409  # Linux ioctl for copy-on-write clones (btrfs, xfs)
+
+
+def link_file(source: str, destination: str, hardlink: bool = False) -> str:
+    """
+    Places source at destination without copying data when possible: reflink, then a plain copy
+    :param hardlink: Try a hard link first.  Only when neither side is ever written to again, since the two paths
+    share one file
+    :return: 'hardlink', 'reflink' or 'copy'
+    """
+    directory = os.path.dirname(os.path.abspath(destination))
+    os.makedirs(directory, exist_ok=True)
+    # Unique temp file next to the destination, so parallel writers never touch each other's partial copies
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(destination) + ".", suffix=".tmp")
+    os.close(fd)
+    try:
+        method = "copy"
+        if hardlink:
+            try:
+                os.remove(temp_path)
+                os.link(source, temp_path)
+                method = "hardlink"
+            except OSError:
+                pass
+        if method == "copy" and ON_POSIX and sys.platform.startswith("linux"):
+            try:
+                with open(source, "rb") as src, open(temp_path, "wb") as dst:
+                    fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+                shutil.copystat(source, temp_path)
+                method = "reflink"
+            except OSError:
+                pass
+        if method == "copy":
+            shutil.copy2(source, temp_path)
+        os.replace(temp_path, destination)
+    finally:
+        if os.path.lexists(temp_path):
+            os.remove(temp_path)
+    return method
+
+
+class ArtifactTarget:
+    """
+        Somewhere a build gets installed or uploaded to: a device, a remote storage bucket, etc.
+        key identifies the target in the artifact index, ex: 'device:emulator-5554' or 'sauce:storage'
+    """
+
+    @property
+    def key(self) -> str:
+        raise NotImplementedError
+
+    def put(self, source_path: str, file_name: str) -> str:
+        """
+        Installs or uploads the file
+        :return: Location of the file on the target, ex: a remote path usable as MobileApplication.remote_path
+        """
+        raise NotImplementedError
+
+    def contains(self, location: str, digest: str = None, algorithm: str = DEFAULT_ALGORITHM) -> bool:
+        """
+        Checks the target still holds a file delivered earlier.  Targets that can't check cheaply return True
+        :param digest: Hash the file at location should have
+        """
+        return True
+
+
+class DirectoryTarget(ArtifactTarget):
+    """
+        Local directory standing in for a remote target
+    """
+
+    def __init__(self, path: str, key: str = None):
+        self._path = os.path.abspath(os.path.expanduser(path))
+        self._key = key if key else "dir:{0}".format(self._path)
+
+    @property
+    def key(self) -> str:
+        return self._key
+
+    def put(self, source_path: str, file_name: str) -> str:
+        location = os.path.join(self._path, file_name)
+        link_file(source_path, location)
+        return location
+
+    def contains(self, location: str, digest: str = None, algorithm: str = DEFAULT_ALGORITHM) -> bool:
+        if not os.path.isfile(location):
+            return False
+        # Fingerprints are cached by size, mtime and inode, so only a changed file is hashed again
+        return digest is None or fingerprint_file(location, algorithm).digest == digest
+
+
+class Delivery:
+    __slots__ = ('digest', 'target', 'location', 'skipped')
+
+    def __init__(self, digest: str, target: str, location: str, skipped: bool):
+        self.digest = digest
+        self.target = target
+        self.location = location
+        self.skipped = skipped
+
+    def __repr__(self):
+        return "Delivery({0} -> {1}, {2})".format(self.digest, self.location, "skipped" if self.skipped else "sent")
+
+
+class ArtifactStore(InstatestObject):
+    """
+        Content addressed store for application builds.  Each build is kept once under its hash and the index records
+        which targets (devices, remote storage) already hold it, so identical builds are not installed or uploaded
+        again.
+        Ex:
+        store = ArtifactStore()
+        delivery = store.deliver(app, DirectoryTarget("/mnt/builds"))
+        if not delivery.skipped:
+            ...
+    """
+    DEFAULT_PATH = "~/.instatest/artifacts"
+
+    def __init__(self, path: str = None, algorithm: str = DEFAULT_ALGORITHM):
+        super().__init__(name="ArtifactStore")
+        self._path = os.path.abspath(os.path.expanduser(path if path else self.DEFAULT_PATH))
+        self._index_path = os.path.join(self._path, "index.json")
+        self.algorithm = algorithm
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self._path, "objects", digest[:2], digest)
+
+    def add(self, source: Union[str, MobileApplication]) -> str:
+        """
+        Adds a build to the store.  A build that is already stored is not copied again
+        :return: Hash of the build
+        """
+        if isinstance(source, MobileApplication):
+            digest = source.update_fingerprint(self.algorithm).digest
+            path = source.file_path
+        else:
+            path = os.path.abspath(source)
+            digest = fingerprint_file(path, self.algorithm).digest
+
+        object_path = self.object_path(digest)
+        if not os.path.exists(object_path):
+            self._store_object(path, digest)
+
+        with self._locked() as index:
+            entry = index.setdefault(digest, {"size": os.path.getsize(object_path), "names": [], "targets": {}})
+            name = os.path.basename(path)
+            if name not in entry["names"]:
+                entry["names"].append(name)
+        return digest
+
+    def _store_object(self, path: str, digest: str):
+        # The copy is hashed again before it is published, in case the build was rewritten after it was fingerprinted.
+        # Objects only appear through os.replace, so parallel adds of the same build can't see a partial object
+        object_path = self.object_path(digest)
+        os.makedirs(os.path.dirname(object_path), exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(object_path), prefix="." + digest + ".", suffix=".tmp")
+        os.close(fd)
+        try:
+            # Builds are cloned in rather than hard linked so a build tool writing over its output can't change them
+            method = link_file(path, temp_path)
+            stored_digest = hash_file(temp_path, self.algorithm)
+            if stored_digest != digest:
+                raise InvalidConfigurationError(
+                    "{0} changed while it was added to the artifact store. Expected {1}, copied {2}".format(
+                        path, digest, stored_digest))
+            os.replace(temp_path, object_path)
+        finally:
+            if os.path.lexists(temp_path):
+                os.remove(temp_path)
+        self.log.debug("Stored {0} as {1} ({2})".format(path, digest, method))
+
+    def has(self, digest: str) -> bool:
+        return os.path.exists(self.object_path(digest))
+
+    def materialize(self, digest: str, destination: str, hardlink: bool = False) -> str:
+        """
+        Clones a stored build into place
+        :param hardlink: Hard link instead when destination is only ever read, writing to it would change the store
+        :return: 'hardlink', 'reflink' or 'copy'
+        """
+        if not self.has(digest):
+            raise InvalidConfigurationError("Build {0} is not in the artifact store {1}".format(digest, self._path))
+        return link_file(self.object_path(digest), destination, hardlink=hardlink)
+
+    def targets_for(self, digest: str) -> Dict[str, Dict]:
+        with self._locked() as index:
+            return dict(index.get(digest, {}).get("targets", {}))
+
+    def location_on(self, digest: str, target: ArtifactTarget) -> Optional[str]:
+        """
+        Location of the build on target if the target is recorded as holding it and still does
+        """
+        record = self.targets_for(digest).get(target.key)
+        if record is None:
+            return None
+        if not target.contains(record["location"], digest, self.algorithm):
+            self.forget(digest, target)
+            return None
+        return record["location"]
+
+    def record(self, digest: str, target: ArtifactTarget, location: str):
+        with self._locked() as index:
+            entry = index.setdefault(digest, {"size": None, "names": [], "targets": {}})
+            entry["targets"][target.key] = {"location": location, "delivered_at": time.time()}
+
+    def forget(self, digest: str, target: ArtifactTarget):
+        with self._locked() as index:
+            if digest in index:
+                index[digest]["targets"].pop(target.key, None)
+
+    def deliver(self, source: Union[str, MobileApplication], target: ArtifactTarget,
+                file_name: str = None) -> Delivery:
+        """
+        Installs or uploads a build unless the target already holds the identical binary
+        :param file_name: Name on the target.  Defaults to <hash>_<file name> so different builds never collide
+        """
+        digest = self.add(source)
+        location = self.location_on(digest, target)
+        if location is not None:
+            self.log.info("{0} already holds build {1}, skipping".format(target.key, digest))
+            return Delivery(digest, target.key, location, skipped=True)
+
+        if file_name is None:
+            base_name = source.file_name if isinstance(source, MobileApplication) else os.path.basename(source)
+            file_name = "{0}_{1}".format(digest, base_name)
+        location = target.put(self.object_path(digest), file_name)
+        self.record(digest, target, location)
+        self.log.info("Delivered build {0} to {1}".format(digest, target.key))
+        return Delivery(digest, target.key, location, skipped=False)
+
+    def entries(self) -> Dict[str, Dict]:
+        with self._locked() as index:
+            return json.loads(json.dumps(index))
+
+    def prune(self, keep: List[str]) -> int:
+        """
+        Removes stored builds whose hash is not in keep
+        :return: Number of builds removed
+        """
+        removed = 0
+        with self._locked() as index:
+            for digest in [d for d in index if d not in keep]:
+                if os.path.exists(self.object_path(digest)):
+                    os.remove(self.object_path(digest))
+                del index[digest]
+                removed += 1
+        return removed
+
+    @contextmanager
+    def _locked(self):
+        # Parallel runs can share the store - hold an exclusive lock while reading and writing the index
+        os.makedirs(self._path, exist_ok=True)
+        with open(self._index_path + ".lock", "a") as lock_file:
+            if ON_POSIX:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                index = self._read()
+                original = json.dumps(index, sort_keys=True)
+                yield index
+                if json.dumps(index, sort_keys=True) != original:
+                    self._write(index)
+            finally:
+                if ON_POSIX:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _read(self) -> Dict[str, Dict]:
+        if not os.path.exists(self._index_path):
+            return {}
+        try:
+            with open(self._index_path) as f:
+                return json.load(f)
+        except (ValueError, OSError) as e:
+            self.log.warning("Could not read artifact index {0}. {1}".format(self._index_path, e))
+            return {}
+
+    def _write(self, index: Dict[str, Dict]):
+        temp_path = self._index_path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump(index, f, indent=2)
+        os.replace(temp_path, self._index_path)
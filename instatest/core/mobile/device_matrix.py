@@ -0,0 +1,331 @@
+import heapq
+import json
+import os
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from instatest.core.helpers.instatest_object import InstatestObject
+from instatest.core.mobile.devices import Device, DevicePlatform
+from instatest.core.mobile.mobile_application import MobileApplication
+
+TestCallable = Callable[[Any], Any]
+ContextFactory = Callable[[Device, Optional[MobileApplication]], Any]
+
+
+class FakeDriverContext:
+    """
+        Stands in for a driver context so scheduling can be run without devices
+    """
+
+    def __init__(self, device: Device, application: MobileApplication = None):
+        self.device = device
+        self.application = application
+        self.closed = False
+
+    def get_webdriver(self):
+        return None
+
+    def quit(self):
+        self.closed = True
+
+
+class DurationHistory:
+    """
+        Average duration per test from earlier runs, used to balance shards.  Stored as JSON: {test name: seconds}
+    """
+    DEFAULT_PATH = "~/.instatest/test_durations.json"
+
+    def __init__(self, path: str = None, smoothing: float = 0.5, default_s: float = None):
+        """
+        :param smoothing: Weight of the newest duration in the running average
+        :param default_s: Estimate for tests without history.  Uses the median of known durations if None
+        """
+        self._path = os.path.abspath(os.path.expanduser(path if path else self.DEFAULT_PATH))
+        self._smoothing = smoothing
+        self._default_s = default_s
+        self._lock = threading.Lock()
+        self._durations = {}  # type: Dict[str, float]
+        if os.path.exists(self._path):
+            try:
+                with open(self._path) as f:
+                    self._durations = {k: float(v) for k, v in json.load(f).items()}
+            except (ValueError, OSError, AttributeError):
+                self._durations = {}
+
+    def estimate(self, test_name: str) -> float:
+        duration = self._durations.get(test_name, None)
+        if duration is not None:
+            return duration
+        if self._default_s is not None:
+            return self._default_s
+        if not self._durations:
+            return 1.0
+        known = sorted(self._durations.values())
+        return known[len(known) // 2]
+
+    def record(self, test_name: str, duration_s: float):
+        with self._lock:
+            previous = self._durations.get(test_name, None)
+            self._durations[test_name] = duration_s if previous is None else \
+                previous + self._smoothing * (duration_s - previous)
+
+    def save(self):
+        os.makedirs(os.path.dirname(self._path), exist_ok=True)
+        temp_path = self._path + ".tmp"
+        with self._lock:
+            with open(temp_path, "w") as f:
+                json.dump(self._durations, f, indent=2, sort_keys=True)
+        os.replace(temp_path, self._path)
+
+
+class TestResult:
+    PASSED = "passed"
+    FAILED = "failed"
+    FLAKY = "flaky"  # Failed at least once, then passed on another device
+
+    def __init__(self, test_name: str, device: str, passed: bool, duration_s: float, attempt: int,
+                 error: str = None):
+        self.test_name = test_name
+        self.device = device
+        self.passed = passed
+        self.duration_s = duration_s
+        self.attempt = attempt
+        self.error = error
+
+    def to_dict(self) -> Dict:
+        return {
+            "test": self.test_name,
+            "device": self.device,
+            "passed": self.passed,
+            "duration_s": round(self.duration_s, 4),
+            "attempt": self.attempt,
+            "error": self.error
+        }
+
+
+class MatrixReport:
+    def __init__(self):
+        self.attempts = []  # type: List[TestResult]
+        self.wall_time_s = 0.0
+        self.tests = []  # type: List[str]
+        self.shards = {}  # type: Dict[str, List[str]]
+        self.unscheduled = []  # type: List[str]  # Never ran, every device failed
+
+    def add(self, result: TestResult):
+        self.attempts.append(result)
+
+    def outcomes(self) -> Dict[str, str]:
+        """
+        Final status per test: passed, failed or flaky
+        """
+        outcomes = {}
+        for result in self.attempts:
+            previous = outcomes.get(result.test_name, None)
+            if result.passed:
+                outcomes[result.test_name] = TestResult.PASSED if previous is None else TestResult.FLAKY
+            else:
+                outcomes[result.test_name] = TestResult.FAILED
+        return outcomes
+
+    def tests_with(self, status: str) -> List[str]:
+        return sorted(name for name, outcome in self.outcomes().items() if outcome == status)
+
+    def not_run(self) -> List[str]:
+        """
+        Tests without a single attempt
+        """
+        outcomes = self.outcomes()
+        return [name for name in self.tests if name not in outcomes]
+
+    @property
+    def passed(self) -> bool:
+        outcomes = self.outcomes()
+        return not self.unscheduled and all(name in outcomes for name in self.tests) and \
+            all(o != TestResult.FAILED for o in outcomes.values())
+
+    def device_busy_s(self) -> Dict[str, float]:
+        busy = {}
+        for result in self.attempts:
+            busy[result.device] = busy.get(result.device, 0.0) + result.duration_s
+        return busy
+
+    def to_dict(self) -> Dict:
+        outcomes = self.outcomes()
+        return {
+            "passed": self.passed,
+            "wall_time_s": round(self.wall_time_s, 4),
+            "counts": {status: sum(1 for o in outcomes.values() if o == status)
+                       for status in (TestResult.PASSED, TestResult.FLAKY, TestResult.FAILED)},
+            "outcomes": outcomes,
+            "device_busy_s": {k: round(v, 4) for k, v in self.device_busy_s().items()},
+            "shards": self.shards,
+            "unscheduled": self.unscheduled,
+            "not_run": self.not_run(),
+            "attempts": [r.to_dict() for r in self.attempts]
+        }
+
+    def export(self, path: str):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def balance(tests: List[str], workers: List[str], estimate: Callable[[str], float]) -> Dict[str, List[str]]:
+    """
+    Longest test first onto the least loaded worker
+    """
+    shards = {w: [] for w in workers}
+    if not workers:
+        return shards
+    heap = [(0.0, i, w) for i, w in enumerate(workers)]
+    for test in sorted(tests, key=lambda t: (-estimate(t), t)):
+        load, i, worker = heapq.heappop(heap)
+        shards[worker].append(test)
+        heapq.heappush(heap, (load + estimate(test), i, worker))
+    return shards
+
+
+class DeviceMatrixScheduler(InstatestObject):
+    """
+        Runs tests across devices in parallel, one worker thread and driver context per device.
+        Tests are sharded by their historical durations.  A failed test is retried on a different device, and the rest
+        of a shard moves to other devices if its driver context can't be created.
+        Ex:
+        scheduler = DeviceMatrixScheduler(catalog.find(DevicePlatform.ANDROID, min_version="12"),
+                                          context_factory=create_driver_context,
+                                          applications={DevicePlatform.ANDROID: app})
+        report = scheduler.run({"login": test_login, "signup": test_signup})
+    """
+
+    def __init__(self, devices: List[Device], context_factory: ContextFactory = FakeDriverContext,
+                 applications: Dict[DevicePlatform, MobileApplication] = None, history: DurationHistory = None,
+                 max_retries: int = 1):
+        """
+        :param context_factory: Creates the driver context a device's tests run with.  quit() is called on it when the
+        shard is done, if it has one
+        :param applications: Application to install per platform
+        :param max_retries: Times a failed test is retried, each time on a device it hasn't failed on
+        """
+        super().__init__(name="DeviceMatrixScheduler")
+        self._devices = {self.device_key(d): d for d in devices}
+        self._context_factory = context_factory
+        self._applications = applications if applications else {}
+        self._history = history if history else DurationHistory()
+        self._max_retries = max_retries
+
+    @staticmethod
+    def device_key(device: Device) -> str:
+        try:
+            name = device.device_name
+        except NotImplementedError:
+            name = device.name
+        return "{0}_{1}_{2}".format(name, device.version, device.platform.value if device.platform else None)
+
+    def run(self, tests: Dict[str, TestCallable]) -> MatrixReport:
+        report = MatrixReport()
+        report.tests = list(tests)
+        started = time.monotonic()
+        attempts = {name: 0 for name in tests}
+        excluded = {name: set() for name in tests}  # type: Dict[str, Set[str]]
+        bad_devices = set()  # type: Set[str]
+        pending = list(tests)
+
+        while pending:
+            healthy = [k for k in self._devices if k not in bad_devices]
+            shards = self._plan(pending, healthy, excluded)
+            placed = set(t for shard in shards.values() for t in shard)
+            for test in pending:
+                if test not in placed:
+                    self.log.warning("No device left to run {0} on".format(test))
+                    if attempts[test] == 0:
+                        report.unscheduled.append(test)
+            if not any(shards.values()):
+                break
+            for device_key, shard in shards.items():
+                report.shards.setdefault(device_key, []).extend(shard)
+
+            lock = threading.Lock()
+            retry = []
+
+            def run_shard(device_key: str, shard: List[str]):
+                results, failed_device = self._run_shard(device_key, shard, tests, attempts)
+                with lock:
+                    if failed_device:
+                        bad_devices.add(device_key)
+                    for result in results:
+                        report.add(result)
+                        if result.passed:
+                            self._history.record(result.test_name, result.duration_s)
+                        else:
+                            excluded[result.test_name].add(device_key)
+                            if attempts[result.test_name] <= self._max_retries:
+                                retry.append(result.test_name)
+                    for test in shard[len(results):]:
+                        # Never started because the device failed - attempts only counts tests that ran
+                        excluded[test].add(device_key)
+                        retry.append(test)
+
+            with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+                futures = [executor.submit(run_shard, k, s) for k, s in shards.items() if s]
+                for future in futures:
+                    future.result()
+            pending = retry
+
+        report.wall_time_s = time.monotonic() - started
+        try:
+            self._history.save()
+        except OSError as e:
+            self.log.warning("Could not save test durations. {0}".format(e))
+        return report
+
+    def _plan(self, tests: List[str], devices: List[str], excluded: Dict[str, Set[str]]) -> Dict[str, List[str]]:
+        # Tests that may run anywhere are balanced together, the rest are placed on their least loaded allowed device
+        free = [t for t in tests if not excluded[t].intersection(devices)]
+        shards = balance(free, devices, self._history.estimate)
+        load = {k: sum(self._history.estimate(t) for t in s) for k, s in shards.items()}
+        for test in sorted((t for t in tests if t not in free), key=lambda t: -self._history.estimate(t)):
+            allowed = [k for k in devices if k not in excluded[test]]
+            if not allowed:
+                continue
+            device_key = min(allowed, key=lambda k: load[k])
+            shards[device_key].append(test)
+            load[device_key] += self._history.estimate(test)
+        return shards
+
+    def _run_shard(self, device_key: str, shard: List[str], tests: Dict[str, TestCallable],
+                   attempts: Dict[str, int]):
+        """
+        :return: (results for the tests that ran, True if the device failed and the rest of the shard didn't run)
+        """
+        device = self._devices[device_key]
+        results = []
+        try:
+            context = self._context_factory(device, self._applications.get(device.platform, None))
+        except Exception as e:
+            self.log.error("Could not create driver context for {0}. {1}".format(device_key, e))
+            return results, True
+
+        try:
+            for test_name in shard:
+                attempts[test_name] += 1
+                started = time.monotonic()
+                error = None
+                try:
+                    tests[test_name](context)
+                except Exception as e:
+                    error = "{0}: {1}\n{2}".format(type(e).__name__, e, traceback.format_exc(limit=5))
+                duration = time.monotonic() - started
+                results.append(TestResult(test_name, device_key, error is None, duration, attempts[test_name], error))
+                if error:
+                    self.log.warning("{0} failed on {1} (attempt {2})".format(test_name, device_key,
+                                                                              attempts[test_name]))
+        finally:
+            quit_context = getattr(context, 'quit', None)
+            if callable(quit_context):
+                try:
+                    quit_context()
+                except Exception as e:
+                    self.log.warning("Could not close driver context for {0}. {1}".format(device_key, e))
+        return results, False
@@ -23,19 +23,22 @@ class DevicePlatform(Enum):
 
     @classmethod
     def from_name(cls, platform_name):
-        platform_name = platform_name.lower()
-        if platform_name in ['ios', 'iphone', 'apple']:
-            return DevicePlatform.IOS
-        if platform_name in ['android']:
-            return DevicePlatform.ANDROID
-        return None
+        return _platform_names.get(platform_name.lower(), None)
+
 
+_platform_names = {
+    'ios': DevicePlatform.IOS,
+    'iphone': DevicePlatform.IOS,
+    'apple': DevicePlatform.IOS,
+    'android': DevicePlatform.ANDROID
+}
 
 T = TypeVar('T')
 
 
 class Device(InstatestObject, Persistable):
     JSON_PATH = "~/.instatest/"
+    STORE_KIND = "device"
 
     def __init__(self: T, name=None, version=None, platform: DevicePlatform = None, *args, **kwargs) -> T:
         self._bundle_id = None
@@ -48,7 +51,10 @@ class Device(InstatestObject, Persistable):
 
 
     def get_json_file(self):
-        return os.path.join(self.JSON_PATH, "{0}_{1}_{2}.json".format(self.name, self.version, self.platform))
+        return os.path.join(self.JSON_PATH, "{0}.json".format(self.store_key()))
+
+    def store_key(self) -> str:
+        return "{0}_{1}_{2}".format(self.name, self.version, self.platform)
 
     @classmethod
     def from_sauce_platform(cls, sauce_platform: dict):
@@ -58,7 +64,10 @@ class Device(InstatestObject, Persistable):
             platform = DevicePlatform.ANDROID
         elif platform_name == "iphone":
             platform = DevicePlatform.IOS
-        d = Device(name=sauce_platform['device'], version=sauce_platform['short_version'], platform=platform)
+        long_name = "{0} {1}".format(sauce_platform['device'], sauce_platform.get('long_name', '')).lower()
+        emulated = 'emulator' in long_name or 'simulator' in long_name
+        d = Device(name=sauce_platform['device'], version=sauce_platform['short_version'], platform=platform,
+                   emulated=emulated)
 
         return d
 
@@ -98,6 +107,8 @@ class Device(InstatestObject, Persistable):
         p = self._platform
         if isinstance(p, str):
             p = DevicePlatform.from_name(p)
+            if p is not None:
+                self._platform = p
         return p
 
     @property
@@ -141,6 +152,8 @@ class Device(InstatestObject, Persistable):
 
 
 class AndroidDevice(Device):
+    STORE_PLATFORM = DevicePlatform.ANDROID
+
     def __init__(self, name=None, version=None, avd=None, device_name=None, *args, **kwargs):
         super(AndroidDevice, self).__init__(name, version, DevicePlatform.ANDROID, args, kwargs)
         self._device_name = device_name
@@ -170,6 +183,7 @@ class AndroidDevice(Device):
     def export(self):
         app_data = super().export()
         app_data["avd"] = self._avd
+        app_data["device_name"] = self._device_name
         return app_data
 
     @classmethod
@@ -184,6 +198,8 @@ class AndroidDevice(Device):
 
 
 class AppleDevice(Device):
+    STORE_PLATFORM = DevicePlatform.IOS
+
     def __init__(self, name=None, version=None, *args, **kwargs):
         super(AppleDevice, self).__init__(name, version,DevicePlatform.IOS)
         self._device_name = kwargs.get('device_name', None)
@@ -201,9 +217,13 @@ class AppleDevice(Device):
 
         return obj_data
 
+    @classmethod
+    def load(cls, obj_data: Dict):
+        return cls.from_dict(obj_data)
+
     @classmethod
     def from_dict(cls, obj_data):
-        name = obj_data.getf("name", None)
+        name = obj_data.get("name", None)
         device_name = obj_data.get("device_name", None)
         version = obj_data.get("version", None)
         other_fields = {k:v for k,v in obj_data.items() if k not in ['name', 'device_name', 'version']}
@@ -0,0 +1,155 @@
+import bisect
+import json
+import os
+import re
+import time
+from typing import Callable, Dict, List, Tuple
+
+from instatest.core.helpers.instatest_object import InstatestObject
+from instatest.core.helpers.test_logger import get_logger
+from instatest.core.mobile.devices import Device, DevicePlatform
+
+log = get_logger('DeviceCatalog')
+
+Version = Tuple[int, ...]
+
+
+def parse_version(version) -> Version:
+    """
+    '12.0' -> (12, 0), '16.4.1' -> (16, 4, 1).  Non numeric parts are ignored
+    """
+    return tuple(int(p) for p in re.findall(r"\d+", str(version)))
+
+
+class DeviceCatalog(InstatestObject):
+    """
+        Devices from a Sauce platform list, indexed by platform, name and version.  The platform list can be cached on
+        disk so it's only fetched again once the cache is older than ttl_s.
+        Ex:
+        catalog = DeviceCatalog.cached(fetch=lambda: sauce_client.get_platforms())
+        devices = catalog.find(DevicePlatform.ANDROID, min_version="12", emulated=True)
+    """
+    DEFAULT_CACHE_PATH = "~/.instatest/sauce_platforms.json"
+    DEFAULT_TTL_S = 24 * 60 * 60
+
+    def __init__(self, platforms: List[Dict] = None, fetched_at: float = None):
+        super().__init__(name="DeviceCatalog")
+        self.fetched_at = fetched_at if fetched_at else time.time()
+        self._platforms = []  # type: List[Dict]
+        self._devices = []  # type: List[Device]
+        self._by_platform = {}  # type: Dict[DevicePlatform, List[Tuple[Version, int]]]
+        self._by_name = {}  # type: Dict[str, List[int]]
+        self._add_platforms(platforms if platforms else [])
+
+    def _add_platforms(self, platforms: List[Dict]):
+        seen = set()
+        for sauce_platform in platforms:
+            # The same device and version is listed once per backend version
+            key = (sauce_platform.get('api_name'), sauce_platform.get('device'), sauce_platform.get('short_version'))
+            if key in seen:
+                continue
+            seen.add(key)
+            device = Device.from_sauce_platform(sauce_platform)
+            if device.platform is None:
+                continue
+            position = len(self._devices)
+            self._platforms.append(sauce_platform)
+            self._devices.append(device)
+            self._by_platform.setdefault(device.platform, []).append((parse_version(device.version), position))
+            self._by_name.setdefault(str(device.name).lower(), []).append(position)
+        for entries in self._by_platform.values():
+            entries.sort()
+
+    @property
+    def devices(self) -> List[Device]:
+        return list(self._devices)
+
+    def __len__(self):
+        return len(self._devices)
+
+    def find(self, platform: DevicePlatform = None, name: str = None, version: str = None, min_version: str = None,
+             max_version: str = None, emulated: bool = None) -> List[Device]:
+        """
+        Devices matching every given filter, ordered by version
+        :param name: Device name, case insensitive
+        :param min_version: Inclusive, compared numerically, ex: '12' matches 12.0 and 13.1
+        :param max_version: Inclusive, compares the parts given, ex: '13' matches 13.1 but not 14.0
+        """
+        if isinstance(platform, str):
+            platform = DevicePlatform.from_name(platform)
+        if platform is None or platform == DevicePlatform.ANY:
+            entries = sorted(e for p in self._by_platform.values() for e in p)
+        else:
+            entries = self._by_platform.get(platform, [])
+
+        if min_version is not None:
+            entries = entries[bisect.bisect_left(entries, (parse_version(min_version),)):]
+        if max_version is not None:
+            limit = parse_version(max_version)
+            entries = [e for e in entries if e[0][:len(limit)] <= limit]
+        if version is not None:
+            wanted = parse_version(version)
+            entries = [e for e in entries if e[0][:len(wanted)] == wanted]
+
+        positions = [p for _, p in entries]
+        if name is not None:
+            named = set(self._by_name.get(name.lower(), []))
+            positions = [p for p in positions if p in named]
+        devices = [self._devices[p] for p in positions]
+        if emulated is not None:
+            devices = [d for d in devices if d.emulated == emulated]
+        return devices
+
+    def versions(self, platform: DevicePlatform) -> List[str]:
+        versions = []
+        for _, position in self._by_platform.get(platform, []):
+            version = self._devices[position].version
+            if version not in versions:
+                versions.append(version)
+        return versions
+
+    def save(self, path: str = None):
+        path = os.path.abspath(os.path.expanduser(path if path else self.DEFAULT_CACHE_PATH))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = path + ".tmp"
+        with open(temp_path, "w") as f:
+            json.dump({"fetched_at": self.fetched_at, "platforms": self._platforms}, f)
+        os.replace(temp_path, path)
+
+    @classmethod
+    def from_file(cls, path: str) -> 'DeviceCatalog':
+        """
+        Loads a cache file or a recorded platform list (a plain JSON list)
+        """
+        with open(os.path.expanduser(path)) as f:
+            data = json.load(f)
+        if isinstance(data, list):
+            return cls(data)
+        return cls(data.get("platforms", []), fetched_at=data.get("fetched_at", None))
+
+    @classmethod
+    def cached(cls, fetch: Callable[[], List[Dict]], path: str = None, ttl_s: float = DEFAULT_TTL_S) -> 'DeviceCatalog':
+        """
+        Catalog from the cache file if it is newer than ttl_s, otherwise from fetch() and written to the cache.
+        An expired cache is still used if fetch() fails
+        """
+        path = os.path.abspath(os.path.expanduser(path if path else cls.DEFAULT_CACHE_PATH))
+        cached = None
+        if os.path.exists(path):
+            try:
+                cached = cls.from_file(path)
+            except (ValueError, OSError) as e:
+                log.warning("Could not read device catalog cache {0}. {1}".format(path, e))
+        if cached is not None and time.time() - cached.fetched_at < ttl_s:
+            return cached
+
+        try:
+            catalog = cls(fetch())
+        except Exception as e:
+            if cached is None:
+                raise
+            log.warning("Could not fetch platform list, using cache from {0}. {1}".format(
+                time.ctime(cached.fetched_at), e))
+            return cached
+        catalog.save(path)
+        return catalog
@@ -1,12 +1,13 @@
 import glob
 import itertools
 from datetime import datetime
-from typing import List
+from typing import List, Optional
 
-import hashlib
 import os
 from instatest.core.helpers.exceptions import InvalidConfigurationError
+from instatest.core.helpers.file_fingerprint import DEFAULT_ALGORITHM, FileFingerprint, fingerprint_file, hash_file
 from instatest.core.helpers.instatest_object import InstatestObject
+from instatest.core.mobile.app_directory_index import ENVIRONMENTS, AppDirectoryIndex
 from instatest.core.helpers.persistable import Persistable
 from instatest.core.mobile.devices import DevicePlatform
 
@@ -18,6 +19,7 @@ platform_extensions = {
 
 class MobileApplication(InstatestObject, Persistable):
     JSON_PATH = "./core/configuration/apps/"
+    STORE_KIND = "application"
     log_name = None
     project = None
     remote_path = None
@@ -27,6 +29,7 @@ class MobileApplication(InstatestObject, Persistable):
     app_activity = None
     _platform = None
     _file_size = None
+    _fingerprint = None
 
     def __init__(self, *args, **kwargs):
         super().__init__(name="MobileApplication")
@@ -43,6 +46,9 @@ class MobileApplication(InstatestObject, Persistable):
         self.app_activity = kwargs.get("app_activity", None)
 
         self._md5 = kwargs.get("md5", None)
+        self.hash_algorithm = kwargs.get("hash_algorithm", DEFAULT_ALGORITHM)  # Any hashlib algorithm, ex: blake2b
+        fingerprint = kwargs.get("fingerprint", None)
+        self._fingerprint = FileFingerprint.load(fingerprint) if isinstance(fingerprint, dict) else fingerprint
 
         if path:
             if '~' in path:
@@ -126,18 +132,38 @@ class MobileApplication(InstatestObject, Persistable):
     def file_modified(self):
         old_time = self._file_modified
         new_time = self.get_file_modified()
-        return old_time == new_time
+        return old_time != new_time
 
     def file_size_changed(self):
         old_size = self._file_size
         new_size = self.calculate_file_size()
-        return old_size == new_size
+        return old_size != new_size
 
-    def update_md5(self):
-        needs_hash = True
-        if '_md5' in self.__dict__ and self._md5 is not None:
-            needs_hash = self.file_size_changed() is False and self.file_modified() is False
-        return needs_hash
+    @property
+    def fingerprint(self) -> Optional[FileFingerprint]:
+        return self._fingerprint
+
+    def update_fingerprint(self, algorithm: str = None) -> FileFingerprint:
+        """
+        Fingerprints the application file.  The file is only hashed again when its size, mtime or inode no longer
+        match the stored fingerprint.  Call save() afterwards to persist it with the application JSON
+        """
+        algorithm = algorithm if algorithm else self.hash_algorithm
+        path = self.file_path
+        if not os.path.isfile(path):
+            raise InvalidConfigurationError("Can't fingerprint application, file not found: {0}".format(path))
+        self._fingerprint = fingerprint_file(path, algorithm, previous=self._fingerprint)
+        self._file_size = self._fingerprint.size
+        self._file_modified = self._fingerprint.mtime_ns / 1e9
+        if algorithm == "md5":
+            self._md5 = self._fingerprint.digest
+        return self._fingerprint
+
+    def update_md5(self) -> str:
+        """
+        :return: md5 of the application file, only hashed when the file changed
+        """
+        return self.update_fingerprint("md5").digest
 
     @property
     def json_file(self):
@@ -146,18 +172,23 @@ class MobileApplication(InstatestObject, Persistable):
             file_path = "{0}_{1}".format(file_path, self.build_id)
         return os.path.join(self.JSON_PATH, "{0}.json".format(file_path))
 
-    def save(self, **kwargs):
+    def store_key(self) -> str:
+        return os.path.splitext(os.path.basename(self.json_file))[0]
+
+    def save(self, store=None, **kwargs):
+        """
+        :param store: RecordStore to save to instead of the configuration's JSON files
+        """
+        if store is not None:
+            store.save(self)
+            return
         from instatest.core.configuration.instatest_configuration import InstatestConfiguration
         c = InstatestConfiguration()
         c.add_application(self)
 
     @staticmethod
     def calculate_md5(path):
-        hash_md5 = hashlib.md5()
-        with open(path, "rb") as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hash_md5.update(chunk)
-        return hash_md5.hexdigest()
+        return hash_file(path, "md5")
 
     def get_unique_id(self):
         if '_unique_id' not in self.__dict__ or self._unique_id is None:
@@ -209,6 +240,21 @@ class MobileApplication(InstatestObject, Persistable):
             all.append(f)
         return all
 
+    @classmethod
+    def newest_in(cls, path: str, platform: DevicePlatform, environment: str = 'release', project: str = None,
+                  **kwargs) -> Optional['MobileApplication']:
+        """
+            Newest build in path for platform, ex: the newest release apk for the applicant project
+            Ex:
+            app = MobileApplication.newest_in("~/builds", DevicePlatform.ANDROID, project="applicant")
+        """
+        entry = AppDirectoryIndex.for_directory(path).newest(platform_extensions.get(platform, []), environment,
+                                                             contains=project)
+        if entry is None:
+            return None
+        return cls(platform=platform, file_path=os.path.dirname(entry.path), file_name=entry.name, project=project,
+                   **kwargs)
+
     def _determine_application_file(self):
         # Look for any appropriate files
         matching_files = self._get_app_files_from_path(self._application_path)
@@ -224,7 +270,7 @@ class MobileApplication(InstatestObject, Persistable):
                     str(file_count), self._application_path))
             chosen_app = self._prioritize_app_for_environments(matching_files)
         else:
-            raise InvalidConfigurationError("No applications found in path {0}".format(self._application_file))
+            raise InvalidConfigurationError("No applications found in path {0}".format(self._application_path))
             # There is a single file with the correct extension. Use this by default
 
         return os.path.basename(chosen_app)
@@ -232,15 +278,13 @@ class MobileApplication(InstatestObject, Persistable):
     def _get_app_files_from_path(self, path) -> List:
         default_extensions = self.get_default_extensions(self.platform)
 
-        file_pattern = [os.path.join(path, "*.{0}".format(e)) for e in default_extensions]
-        self.log.debug("Attempting to find application file. Pattern: {0}".format(file_pattern))
-        files = self.multiple_file_types(file_pattern)
-        return files
+        self.log.debug("Attempting to find application file in {0}. Extensions: {1}".format(path, default_extensions))
+        # Newest first.  The directory is only scanned again when its contents change
+        return [e.path for e in AppDirectoryIndex.for_directory(path).find(default_extensions)]
 
     def _prioritize_app_for_environments(self, file_list):
-        environments = ['release', 'debug']
-        for environment in environments:
-            file = next((f for f in file_list if environment.lower() in f.lower()), None)
+        for environment in ENVIRONMENTS:
+            file = next((f for f in file_list if environment in os.path.basename(f).lower()), None)
             if file:
                 self.log.debug("Found application for environment {0}.  File: {1}".format(environment, file))
                 return file
@@ -269,6 +313,10 @@ class MobileApplication(InstatestObject, Persistable):
             "remote_path": self.remote_path,
             "unique_id": self._unique_id,
             "file_size": self.file_size,
+            "file_modified": self._file_modified,
+            "md5": self._md5,
+            "hash_algorithm": self.hash_algorithm if self.hash_algorithm != DEFAULT_ALGORITHM else None,
+            "fingerprint": self._fingerprint.export() if self._fingerprint else None,
             "project": self.project
         }
         app_data = {k: v for k, v in app_data.items() if v}
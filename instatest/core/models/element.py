@@ -1,12 +1,15 @@
+from typing import List, Optional, Tuple
+
 from appium.webdriver import WebElement, webdriver
 from appium.webdriver.webdriver import WebDriver
 from instatest.core.configuration.runtime.global_test_data import TestData
 from instatest.core.helpers.abstract_selector import AbstractSelector
+from instatest.core.helpers.driver_instrumentation import instrumented
 from instatest.core.helpers.instatest_object import InstatestObject
+from instatest.core.helpers.mobile.page_snapshot import PageSnapshot, SnapshotElement
 from instatest.core.helpers.test_logger import get_logger
+from instatest.core.helpers.wait_engine import WaitEngine, presence_of
 from selenium.common.exceptions import NoSuchElementException, TimeoutException
-from selenium.webdriver.support import expected_conditions
-from selenium.webdriver.support.wait import WebDriverWait
 
 from instatest.core.driver import IWebDriverContext
 
@@ -23,7 +26,7 @@ class Element(AbstractElement):
     log = get_logger("Element")
 
     def __init__(self, selector: AbstractSelector, driver_context, parent: AbstractElement = None, index=None,
-                 wait=None):
+                 wait: WaitEngine = None):
         self._selector = selector
         self._parent = parent
         self._index = index
@@ -42,24 +45,105 @@ class Element(AbstractElement):
     def _get_driver(self) -> WebDriver:
         return self._get_context().get_webdriver()
 
+    def _locator(self) -> Tuple:
+        # Mobile selectors know the fastest locator for themselves (see selector_planner)
+        if hasattr(self._selector, 'get_tuple'):
+            return self._selector.get_tuple()
+        return self._selector.by, self._selector.value
+
+    @instrumented("Element._get_web_element", lambda self: self.selector)
     def _get_web_element(self) -> WebElement:
         base: webdriver.WebDriver = self._get_driver()
         if self._parent:
             base: WebElement = self._parent.get_web_element()
-        element = base.find_element(self._selector.by, self._selector.value)
+        element = base.find_element(*self._locator())
         return element
 
+    def _get_wait_engine(self) -> WaitEngine:
+        if isinstance(self._wait, WaitEngine):
+            return self._wait
+        return WaitEngine()
+
+    def _presence_condition(self):
+        if self._parent:
+            # Parent is looked up on each poll so a parent that hasn't appeared yet is treated as 'not yet'
+            return lambda: presence_of(self._parent.get_web_element(), *self._locator())()
+        return presence_of(self._get_driver(), *self._locator())
+
+    @instrumented("Element._wait_for_element", lambda self, timeout=None: self.selector)
     def _wait_for_element(self, timeout=None) -> WebElement:
         element = None
-        if timeout is None:
-            timeout = TestData.get_default_timeout()
-        base: webdriver.WebDriver = self._get_driver()
-        if self._parent:
-            base: WebElement = self._parent
         try:
-            element = WebDriverWait(base, timeout, poll_frequency=TestData.get_polling_seconds(),
-                                    ignored_exceptions=[NoSuchElementException, TimeoutException]).until(
-                expected_conditions.presence_of_element_located((self.selector.by, self.selector.value)))
+            element = self._get_wait_engine().until(self._presence_condition(), timeout_s=timeout,
+                                                    message="Waiting for {0}".format(self.selector))
         except BaseException as e:
             self.log.warning("Exception waiting for element. Error: {0} {1}".format(e, e.args))
         return element
+
+    @classmethod
+    def wait_for_any(cls, elements: List['Element'], timeout=None, wait: WaitEngine = None) -> Tuple[
+            Optional['Element'], Optional[WebElement]]:
+        """
+            Waits for whichever element appears first.  All elements are checked in the same polling loop
+            Ex:
+            found, web_element = Element.wait_for_any([error_banner, success_title])
+
+        :return: (Element that appeared, its WebElement) or (None, None) on timeout
+        """
+        engine = wait if wait else WaitEngine()
+        conditions = {e: e._presence_condition() for e in elements}
+        try:
+            return engine.until_any(conditions, timeout_s=timeout)
+        except TimeoutException as te:
+            cls.log.warning("Timed out waiting for any of {0} elements. {1}".format(len(elements), te))
+        return None, None
+
+    def find_in_snapshot(self, snapshot: PageSnapshot) -> Optional[SnapshotElement]:
+        """
+        Looks the element up in a page snapshot instead of the device.  Falls back to None if the element has a parent
+        """
+        if self._parent:
+            parent_record = self._parent.find_in_snapshot(snapshot) if isinstance(self._parent, Element) else None
+            if parent_record is None:
+                return None
+            return next((r for r in snapshot.find_all(self._selector) if self._is_descendant(r, parent_record)), None)
+        return snapshot.find(self._selector)
+
+    def can_use_snapshot(self) -> bool:
+        """
+        True if this element and its parents can all be looked up in a page snapshot.  Otherwise the driver is used
+        """
+        if not PageSnapshot.can_evaluate(self._selector):
+            return False
+        if self._parent:
+            return isinstance(self._parent, Element) and self._parent.can_use_snapshot()
+        return True
+
+    def is_present(self, snapshot: PageSnapshot = None) -> bool:
+        """
+        :param snapshot: Check against this snapshot instead of calling the driver
+        """
+        if snapshot is not None and self.can_use_snapshot():
+            return self.find_in_snapshot(snapshot) is not None
+        try:
+            return self._get_web_element() is not None
+        except NoSuchElementException:
+            return False
+
+    def get_text(self, snapshot: PageSnapshot = None) -> Optional[str]:
+        """
+        :param snapshot: Read the text from this snapshot instead of calling the driver
+        """
+        if snapshot is not None and self.can_use_snapshot():
+            record = self.find_in_snapshot(snapshot)
+            return record.text if record else None
+        return self._get_web_element().text
+
+    @staticmethod
+    def _is_descendant(record: SnapshotElement, ancestor: SnapshotElement) -> bool:
+        parent = record.parent
+        while parent is not None:
+            if parent is ancestor:
+                return True
+            parent = parent.parent
+        return False
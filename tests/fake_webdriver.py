@@ -0,0 +1,269 @@
+import re
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from appium.webdriver.common.mobileby import MobileBy
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
+
+from instatest.core.helpers.mobile.page_snapshot import PageSnapshot, SnapshotElement
+from instatest.core.mobile.devices import AndroidDevice, Device
+
+UI_SELECTOR = re.compile(r'^new UiSelector\(\)\.(text|resourceId|description|className)'
+                         r'(Contains|StartsWith|Matches)?\("(.*)"\)$')
+UI_SELECTOR_ATTRIBUTES = {'text': 'text', 'resourceId': 'resource-id', 'description': 'content-desc',
+                          'className': 'class'}
+XPATH_CONDITION = re.compile(r"^(?:(@[\w-]+)=(['\"])(.*)\2|(contains|starts-with)\((@[\w-]+),(['\"])(.*)\6\))$")
+
+
+def build_hierarchy(rows: int = 50, package: str = "com.instawork.app") -> str:
+    """
+    Android page source with a toolbar, a list of rows (title, subtitle, button) and a footer
+    """
+    lines = ['<hierarchy rotation="0">',
+             '<android.widget.FrameLayout class="android.widget.FrameLayout" bounds="[0,0][1080,2280]">',
+             '<android.widget.TextView class="android.widget.TextView" resource-id="{0}:id/toolbar_title" '
+             'text="Jobs" content-desc="toolbar" bounds="[0,0][1080,160]"/>'.format(package),
+             '<android.widget.ListView class="android.widget.ListView" resource-id="{0}:id/job_list" '
+             'bounds="[0,160][1080,2100]">'.format(package)]
+    for i in range(rows):
+        lines.append('<android.widget.LinearLayout class="android.widget.LinearLayout" resource-id="{0}:id/job_row" '
+                     'content-desc="job_{1}" bounds="[0,{2}][1080,{3}]">'.format(package, i, 160 + i * 40,
+                                                                                 200 + i * 40))
+        lines.append('<android.widget.TextView class="android.widget.TextView" resource-id="{0}:id/job_title" '
+                     'text="Job {1}" bounds="[0,0][1080,20]"/>'.format(package, i))
+        lines.append('<android.widget.TextView class="android.widget.TextView" resource-id="{0}:id/job_pay" '
+                     'text="${1}/hr" bounds="[0,20][1080,40]"/>'.format(package, 15 + i % 10))
+        lines.append('<android.widget.Button class="android.widget.Button" resource-id="{0}:id/apply" '
+                     'content-desc="apply_{1}" text="Apply" bounds="[900,0][1080,40]"/>'.format(package, i))
+        lines.append('</android.widget.LinearLayout>')
+    lines.append('</android.widget.ListView>')
+    lines.append('<android.widget.Button class="android.widget.Button" resource-id="{0}:id/footer_button" '
+                 'content-desc="footer" text="Load more" bounds="[0,2100][1080,2280]"/>'.format(package))
+    lines.append('</android.widget.FrameLayout></hierarchy>')
+    return "\n".join(lines)
+
+
+class FakeWebElement:
+    def __init__(self, driver: 'FakeWebDriver', record: SnapshotElement, generation: int):
+        self._driver = driver
+        self._record = record
+        self._generation = generation
+        self.id = "{0}-{1}".format(generation, record.index)
+
+    def _command(self):
+        self._driver.command()
+        if self._generation != self._driver.generation:
+            raise StaleElementReferenceException("Element {0} is no longer attached to the page".format(self.id))
+
+    @property
+    def tag_name(self) -> str:
+        self._command()
+        return self._record.tag
+
+    @property
+    def text(self) -> str:
+        self._command()
+        return self._record.text
+
+    @property
+    def rect(self) -> Dict:
+        self._command()
+        x, y, width, height = self._record.bounds or (0, 0, 0, 0)
+        return {'x': x, 'y': y, 'width': width, 'height': height}
+
+    def is_displayed(self) -> bool:
+        self._command()
+        return self._record.displayed
+
+    def is_enabled(self) -> bool:
+        self._command()
+        return self._record.enabled
+
+    def get_attribute(self, name):
+        self._command()
+        return self._record.get_attribute(name)
+
+    def click(self):
+        self._command()
+        self._driver.on_click(self._record)
+
+    def find_element(self, by, value) -> 'FakeWebElement':
+        self._command()
+        return self._driver.find_element(by, value, within=self._record)
+
+    def find_elements(self, by, value) -> List['FakeWebElement']:
+        self._command()
+        return self._driver.find_elements(by, value, within=self._record)
+
+    def __eq__(self, other):
+        return isinstance(other, FakeWebElement) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeWebDriver:
+    """
+        In process stand in for the Appium driver.  Serves lookups from an Android page source and sleeps latency_s
+        per command to simulate the round trip to the device.
+        Ex:
+        driver = FakeWebDriver(build_hierarchy(rows=20), latency_s=0.005)
+        driver.find_element(MobileBy.ID, "job_title")
+        driver.command_count  # 1
+    """
+
+    def __init__(self, page_source: str, latency_s: float = 0.0, package: str = "com.instawork.app"):
+        self.latency_s = latency_s
+        self.package = package
+        self.command_count = 0
+        self.generation = 0
+        self.on_click = lambda record: None  # type: Callable[[SnapshotElement], None]
+        self._lock = threading.Lock()
+        self._hidden_until = {}  # type: Dict[str, float]
+        self.load(page_source)
+
+    def load(self, page_source: str):
+        """
+        Replaces the screen.  Elements found before are stale afterwards
+        """
+        with self._lock:
+            self._page_source = page_source
+            self._snapshot = PageSnapshot(page_source)
+            self.generation += 1
+
+    def reveal_after(self, resource_id: str, delay_s: float):
+        """
+        Hides elements with resource_id (without the package prefix) from lookups for delay_s seconds
+        """
+        self._hidden_until[self._full_id(resource_id)] = time.monotonic() + delay_s
+
+    def command(self):
+        with self._lock:
+            self.command_count += 1
+        if self.latency_s > 0:
+            time.sleep(self.latency_s)
+
+    @property
+    def page_source(self) -> str:
+        self.command()
+        return self._page_source
+
+    def find_element(self, by, value, within: SnapshotElement = None) -> FakeWebElement:
+        found = self.find_elements(by, value, within)
+        if not found:
+            raise NoSuchElementException("No element found for {0}={1}".format(by, value))
+        return found[0]
+
+    def find_elements(self, by, value, within: SnapshotElement = None) -> List[FakeWebElement]:
+        if within is None:
+            self.command()
+        generation = self.generation
+        records = [r for r in self._match(by, value) if self._visible(r) and
+                   (within is None or self._is_descendant(r, within))]
+        return [FakeWebElement(self, r, generation) for r in records]
+
+    def _full_id(self, resource_id: str) -> str:
+        return resource_id if ':id/' in resource_id else "{0}:id/{1}".format(self.package, resource_id)
+
+    def _visible(self, record: SnapshotElement) -> bool:
+        hidden_until = self._hidden_until.get(record.get_attribute('resource-id'), None)
+        return hidden_until is None or time.monotonic() >= hidden_until
+
+    @staticmethod
+    def _is_descendant(record: SnapshotElement, ancestor: SnapshotElement) -> bool:
+        parent = record.parent
+        while parent is not None:
+            if parent is ancestor:
+                return True
+            parent = parent.parent
+        return False
+
+    def _match(self, by, value) -> List[SnapshotElement]:
+        snapshot = self._snapshot
+        if by in (MobileBy.ID, 'id'):
+            return snapshot.lookup('resource-id', self._full_id(value))
+        if by == MobileBy.ACCESSIBILITY_ID:
+            return snapshot.lookup('content-desc', value)
+        if by == MobileBy.CLASS_NAME:
+            return snapshot.lookup('class', value)
+        if by == MobileBy.ANDROID_UIAUTOMATOR:
+            return self._match_ui_selector(value)
+        if by == MobileBy.XPATH:
+            return self._match_xpath(value)
+        raise NoSuchElementException("Locator strategy {0} is not supported by the fake driver".format(by))
+
+    def _match_ui_selector(self, value: str) -> List[SnapshotElement]:
+        m = UI_SELECTOR.match(value)
+        if not m:
+            raise NoSuchElementException("UiSelector not supported by the fake driver: {0}".format(value))
+        attribute, operator, expected = UI_SELECTOR_ATTRIBUTES[m.group(1)], m.group(2), m.group(3)
+        if operator is None:
+            return self._snapshot.lookup(attribute, expected)
+        test = {
+            'Contains': lambda actual: expected in actual,
+            'StartsWith': lambda actual: actual.startswith(expected),
+            'Matches': lambda actual: re.fullmatch(expected, actual) is not None
+        }[operator]
+        return [n for n in self._snapshot.nodes if test(n.attributes.get(attribute, None) or "")]
+
+    def _match_xpath(self, xpath: str) -> List[SnapshotElement]:
+        # Unions of //*[condition] (what selectors build with to_xpath) are evaluated here, anything else by ElementTree
+        tests = []
+        for part in xpath.split(" | "):
+            condition = re.match(r"^//\*\[(.*)\]$", part.strip())
+            m = XPATH_CONDITION.match(condition.group(1)) if condition else None
+            if not m:
+                tests = None
+                break
+            if m.group(1):
+                attribute, expected = m.group(1)[1:], m.group(3)
+                tests.append(lambda a, attribute=attribute, expected=expected: a.get(attribute, None) == expected)
+            else:
+                function, attribute, expected = m.group(4), m.group(5)[1:], m.group(7)
+                if function == 'contains':
+                    tests.append(lambda a, attribute=attribute, expected=expected: expected in (a.get(attribute) or ""))
+                else:
+                    tests.append(lambda a, attribute=attribute, expected=expected:
+                                 (a.get(attribute) or "").startswith(expected))
+        if tests is None:
+            return self._snapshot.find_all(_XPathOnly(xpath))
+        return [n for n in self._snapshot.nodes if any(test(n.attributes) for test in tests)]
+
+
+class _XPathOnly:
+    by = MobileBy.XPATH
+
+    def __init__(self, value: str):
+        self.value = value
+
+
+class FakeMobileDriverContext:
+    """
+        Driver context over a FakeWebDriver, with the lookups page objects and element descriptors use
+    """
+
+    def __init__(self, driver: FakeWebDriver, device: Device = None):
+        self.device = device if device else AndroidDevice(name="Fake", version="13", device_name="fake-emulator")
+        self.closed = False
+        self._driver = driver
+
+    def get_webdriver(self) -> FakeWebDriver:
+        return self._driver
+
+    def quit(self):
+        self.closed = True
+
+    def find_element(self, by, value) -> FakeWebElement:
+        return self._driver.find_element(by, value)
+
+    def find_elements(self, by, value) -> List[FakeWebElement]:
+        return self._driver.find_elements(by, value)
+
+    def find_element_by(self, selector) -> Optional[FakeWebElement]:
+        by, value = selector.get_tuple()
+        return self._driver.find_element(by, value)
+
+    def find_elements_by(self, selector) -> List[FakeWebElement]:
+        by, value = selector.get_tuple()
+        return self._driver.find_elements(by, value)
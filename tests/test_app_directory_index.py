@@ -0,0 +1,107 @@
+import os
+
+import pytest
+
+from instatest.core.mobile.app_directory_index import AppDirectoryIndex, environment_of
+from instatest.core.mobile.devices import DevicePlatform
+from instatest.core.mobile.mobile_application import MobileApplication
+
+SECOND_NS = 1000 * 1000 * 1000
+
+
+@pytest.fixture
+def builds(tmp_path):
+    directory = tmp_path / "builds"
+    directory.mkdir()
+    return directory
+
+
+def add_build(directory, name: str, content: bytes = b"build", age_s: int = 0) -> str:
+    path = str(directory / name)
+    with open(path, "wb") as f:
+        f.write(content)
+    mtime_ns = 1700000000 * SECOND_NS - age_s * SECOND_NS
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
+
+
+def overwrite(path: str, content: bytes, mtime_ns: int):
+    # Same name, so the directory mtime doesn't change
+    with open(path, "wb") as f:
+        f.write(content)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_environment_of():
+    assert environment_of("applicant-Release.apk") == "release"
+    assert environment_of("applicant-debug.apk") == "debug"
+    assert environment_of("applicant.apk") is None
+
+
+def test_find_filters_newest_first(builds):
+    add_build(builds, "applicant-release.apk", age_s=30)
+    add_build(builds, "applicant-debug.apk", age_s=20)
+    add_build(builds, "business-release.apk", age_s=10)
+    add_build(builds, "applicant-release.zip", age_s=0)
+    add_build(builds, ".hidden.apk")
+    (builds / "notes").mkdir()
+    (builds / "simulator-release.app").mkdir()
+    index = AppDirectoryIndex(str(builds))
+
+    assert [e.name for e in index.find(['apk'], 'release')] == ["business-release.apk", "applicant-release.apk"]
+    assert [e.name for e in index.find(['apk', 'zip'], 'release', contains='APPLICANT')] == \
+        ["applicant-release.zip", "applicant-release.apk"]
+    assert index.newest(['apk'], 'debug').name == "applicant-debug.apk"
+    assert index.newest(['app']).name == "simulator-release.app"
+    assert index.newest(['ipa']) is None
+
+
+def test_directory_scanned_once_until_it_changes(builds):
+    add_build(builds, "applicant-release.apk")
+    index = AppDirectoryIndex(str(builds))
+    index.find(['apk'])
+    index.find(['apk'], 'release')
+    assert index.scan_count == 1
+
+    add_build(builds, "applicant-debug.apk")
+    # Directory mtime granularity can hide a change made in the same tick
+    stat = os.stat(str(builds))
+    os.utime(str(builds), ns=(stat.st_atime_ns, stat.st_mtime_ns + SECOND_NS))
+    assert len(index.find(['apk'])) == 2
+    assert index.scan_count == 2
+
+
+def test_overwritten_build_is_stat_again(builds):
+    older = add_build(builds, "applicant-release.apk", b"old", age_s=60)
+    add_build(builds, "applicant-release-2.apk", b"other", age_s=30)
+    index = AppDirectoryIndex(str(builds))
+    assert index.newest(['apk']).name == "applicant-release-2.apk"
+    dir_mtime_ns = os.stat(str(builds)).st_mtime_ns
+
+    overwrite(older, b"new contents", 1700000000 * SECOND_NS)
+    os.utime(str(builds), ns=(dir_mtime_ns, dir_mtime_ns))
+
+    newest = index.newest(['apk'])
+    assert newest.name == "applicant-release.apk"
+    assert newest.size == len(b"new contents")
+    assert newest.mtime_ns == 1700000000 * SECOND_NS
+    assert index.scan_count == 1
+
+
+def test_missing_directory_has_no_entries(tmp_path):
+    assert AppDirectoryIndex(str(tmp_path / "missing")).find() == []
+
+
+def test_shared_index_per_directory(builds):
+    assert AppDirectoryIndex.for_directory(str(builds)) is AppDirectoryIndex.for_directory(str(builds) + "/")
+
+
+def test_newest_in_sees_overwritten_build(builds):
+    path = add_build(builds, "applicant-release.apk", b"v1", age_s=60)
+    assert MobileApplication.newest_in(str(builds), DevicePlatform.ANDROID, project="applicant").file_path == path
+    dir_mtime_ns = os.stat(str(builds)).st_mtime_ns
+
+    overwrite(path, b"version 2", 1700000000 * SECOND_NS)
+    os.utime(str(builds), ns=(dir_mtime_ns, dir_mtime_ns))
+    entry = AppDirectoryIndex.for_directory(str(builds)).newest(['apk'], 'release')
+    assert entry.size == len(b"version 2")
@@ -0,0 +1,120 @@
+import os
+import sys
+import threading
+
+import pytest
+
+from instatest.core.helpers.exceptions import ExternalProcessError
+from instatest.core.helpers.mobile import appium_pool
+from instatest.core.helpers.mobile.appium_pool import AppiumPool
+
+FAKE_APPIUM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "standins",
+                           "fake_appium.py")
+
+
+@pytest.fixture
+def make_pool(tmp_path, monkeypatch):
+    # Output sinks write to ./out
+    monkeypatch.chdir(tmp_path)
+    pools = []
+
+    def make(size: int, delay_s: float = 0.1, **kwargs) -> AppiumPool:
+        pool = AppiumPool("{0} {1} --delay {2}".format(sys.executable, FAKE_APPIUM, delay_s), size=size,
+                          start_timeout_s=10, **kwargs)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown()
+
+
+def test_worker_gets_its_lease_back(make_pool):
+    with make_pool(2) as pool:
+        first = pool.acquire(worker_id="gw0")
+        assert pool.acquire(worker_id="gw0") is first
+        other = pool.acquire(worker_id="gw1")
+        assert other.server is not first.server
+        assert first.url.endswith("/wd/hub")
+        assert first.server.is_healthy()
+
+
+def test_released_server_is_reused(make_pool):
+    with make_pool(1) as pool:
+        with pool.lease(worker_id="gw0") as lease:
+            server = lease.server
+        with pool.lease(worker_id="gw1") as lease:
+            assert lease.server is server
+
+
+def test_acquire_times_out_when_pool_is_busy(make_pool):
+    with make_pool(1) as pool:
+        pool.acquire(worker_id="gw0")
+        with pytest.raises(ExternalProcessError):
+            pool.acquire(worker_id="gw1", timeout_s=0.2)
+
+
+def test_dead_server_recycled_on_acquire(make_pool):
+    with make_pool(1) as pool:
+        dead = pool.servers[0]
+        dead.manager.stop_instance_process()
+
+        lease = pool.acquire(worker_id="gw0")
+        assert lease.server is not dead
+        assert lease.server.port != dead.port
+        assert lease.server.is_healthy()
+        assert pool.servers == [lease.server]
+        assert dead.port not in appium_pool._reserved_ports
+
+
+def test_health_check_replaces_idle_servers(make_pool):
+    with make_pool(2) as pool:
+        dead = pool.servers[0]
+        dead.manager.stop_instance_process()
+        assert pool.health_check() == 1
+        assert dead not in pool.servers
+        assert len(pool.servers) == 2
+        assert all(s.is_healthy() for s in pool.servers)
+
+
+def test_concurrent_lazy_start_starts_pool_once(make_pool, monkeypatch):
+    pool = make_pool(2, delay_s=0.3)
+    created = []
+    create_server = AppiumPool._create_server
+
+    def counting(self):
+        server = create_server(self)
+        created.append(server)
+        return server
+
+    monkeypatch.setattr(AppiumPool, "_create_server", counting)
+    leases = []
+    workers = [threading.Thread(target=lambda w=w: leases.append(pool.acquire(worker_id=w))) for w in ("gw0", "gw1")]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(20)
+
+    assert len(created) == 2
+    assert sorted(l.server.port for l in leases) == sorted(s.port for s in pool.servers)
+
+
+def test_failed_start_stops_launched_servers(make_pool, monkeypatch):
+    pool = make_pool(3)
+    launched = []
+    launch = AppiumPool._launch
+
+    def failing_third(self, server):
+        if len(launched) == 2:
+            raise OSError("appium not found")
+        launch(self, server)
+        launched.append(server)
+
+    monkeypatch.setattr(AppiumPool, "_launch", failing_third)
+    with pytest.raises(OSError):
+        pool.start()
+
+    assert pool.servers == []
+    for server in launched:
+        assert server.manager.get_return_code() is not None
+        assert not set(server.ports()) & appium_pool._reserved_ports
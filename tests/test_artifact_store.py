@@ -0,0 +1,84 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from instatest.core.helpers.exceptions import InvalidConfigurationError
+from instatest.core.helpers.file_fingerprint import hash_file
+from instatest.core.mobile import artifact_store
+from instatest.core.mobile.artifact_store import ArtifactStore, DirectoryTarget
+
+
+@pytest.fixture
+def build(tmp_path):
+    path = tmp_path / "app-release.apk"
+    path.write_bytes(os.urandom(4 * 1024 * 1024))
+    return str(path)
+
+
+def leftover_temp_files(root: str):
+    return [os.path.join(d, f) for d, _, files in os.walk(root) for f in files if f.endswith(".tmp")]
+
+
+def test_concurrent_add_of_same_build(tmp_path, build):
+    store = ArtifactStore(str(tmp_path / "store"))
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        digests = list(executor.map(lambda _: store.add(build), range(16)))
+
+    assert len(set(digests)) == 1
+    assert hash_file(store.object_path(digests[0])) == digests[0]
+    assert store.entries()[digests[0]]["names"] == ["app-release.apk"]
+    assert leftover_temp_files(store.path) == []
+
+
+def test_concurrent_add_from_separate_stores(tmp_path, build):
+    # Separate instances share nothing in memory, like shards in different processes
+    path = str(tmp_path / "store")
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        digests = list(executor.map(lambda _: ArtifactStore(path).add(build), range(16)))
+
+    store = ArtifactStore(path)
+    assert len(set(digests)) == 1
+    assert hash_file(store.object_path(digests[0])) == digests[0]
+    assert leftover_temp_files(path) == []
+
+
+def test_build_changed_while_copying_is_not_stored(tmp_path, build, monkeypatch):
+    store = ArtifactStore(str(tmp_path / "store"))
+    copy = artifact_store.link_file
+
+    def rewrite_then_copy(source, destination, hardlink=False):
+        with open(source, "r+b") as f:
+            f.write(b"rebuilt")
+        return copy(source, destination, hardlink)
+
+    monkeypatch.setattr(artifact_store, "link_file", rewrite_then_copy)
+    with pytest.raises(InvalidConfigurationError):
+        store.add(build)
+    assert store.entries() == {}
+    assert leftover_temp_files(store.path) == []
+
+
+def test_replaced_binary_on_target_is_delivered_again(tmp_path, build):
+    store = ArtifactStore(str(tmp_path / "store"))
+    target = DirectoryTarget(str(tmp_path / "target"))
+
+    first = store.deliver(build, target)
+    assert not first.skipped
+    assert store.deliver(build, target).skipped
+
+    with open(first.location, "r+b") as f:
+        f.write(b"corrupt")
+    again = store.deliver(build, target)
+    assert not again.skipped
+    assert hash_file(again.location) == again.digest
+
+
+def test_writing_to_target_does_not_change_store(tmp_path, build):
+    store = ArtifactStore(str(tmp_path / "store"))
+    delivery = store.deliver(build, DirectoryTarget(str(tmp_path / "target")))
+
+    assert os.stat(delivery.location).st_ino != os.stat(store.object_path(delivery.digest)).st_ino
+    with open(delivery.location, "ab") as f:
+        f.write(b"appended")
+    assert hash_file(store.object_path(delivery.digest)) == delivery.digest
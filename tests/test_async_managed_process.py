@@ -0,0 +1,108 @@
+import asyncio
+import os
+import sys
+
+import psutil
+import pytest
+
+from instatest.core.helpers.process.async_managed_process import AsyncManagedProcess
+from instatest.core.helpers.process.readiness import OutputPattern
+
+STANDINS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "standins")
+FORKER = os.path.join(STANDINS, "forker.py")
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="process groups and forker stand in need POSIX")
+
+
+@pytest.fixture(autouse=True)
+def out_dir(tmp_path, monkeypatch):
+    # Output sinks write to ./out
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_output_file_written_through_sink(out_dir):
+    output_file = str(out_dir / "logs" / "printer.out")
+    script = "import sys; print('first'); print('second'); sys.stderr.write('oops\\n')"
+    process = AsyncManagedProcess(cmd_list=[sys.executable, "-c", script], name="printer", output_file=output_file)
+
+    async def scenario():
+        await process.start()
+        lines = [line async for _, line in process.stream_lines()]
+        await process.stop()
+        return lines
+
+    assert sorted(run(scenario())) == [b"first\n", b"oops\n", b"second\n"]
+    with open(output_file, "rb") as f:
+        assert sorted(f.read().splitlines()) == [b"[stderr] oops", b"first", b"second"]
+    assert not os.path.exists(str(out_dir / "out" / "printer.log"))
+
+
+def test_process_leads_its_own_group():
+    process = AsyncManagedProcess(cmd_list=[sys.executable, "-c", "import time; time.sleep(30)"], name="sleeper")
+
+    async def scenario():
+        await process.start()
+        try:
+            return os.getpgid(process.pid), os.getsid(process.pid)
+        finally:
+            await process.stop(grace_s=2)
+
+    group_id, session_id = run(scenario())
+    assert group_id == process.pid
+    assert session_id == process.pid
+    assert process.get_return_code() is not None
+
+
+@pytest.mark.parametrize("flags", [[], ["--ignore-term"]], ids=["terminated", "killed"])
+def test_stop_tears_down_tree(flags):
+    process = AsyncManagedProcess(cmd_list=[sys.executable, FORKER, "--children", "4", "--depth", "2"] + flags,
+                                  name="forker", readiness_probes=[OutputPattern("ready")])
+
+    async def scenario():
+        await process.start()
+        assert await process.wait_ready(timeout_s=10)
+        tree = psutil.Process(process.pid).children(recursive=True)
+        stopped = await process.stop(grace_s=0.5, kill_timeout_s=2)
+        return tree, stopped
+
+    tree, stopped = run(scenario())
+    assert len(tree) == 4
+    assert stopped
+    gone, alive = psutil.wait_procs(tree, timeout=2)
+    assert alive == []
+
+
+def test_stop_reaches_orphans_left_in_the_group():
+    # The middle process exits right away, its child is reparented but stays in the group
+    script = ("import os, subprocess, sys, time; "
+              "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(60)']); print('ready', flush=True); "
+              "time.sleep(60)")
+    middle = "import subprocess, sys; subprocess.Popen([sys.executable, '-c', {0!r}]); sys.exit(0)".format(script)
+    process = AsyncManagedProcess(cmd_list=[sys.executable, "-c", "import subprocess, sys, time; "
+                                            "subprocess.run([sys.executable, '-c', {0!r}]); time.sleep(60)"
+                                  .format(middle)], name="orphans", readiness_probes=[OutputPattern("ready")])
+    orphans = []
+
+    async def scenario():
+        await process.start()
+        assert await process.wait_ready(timeout_s=10)
+        group = [p for p in psutil.process_iter() if _group_of(p) == process.pid and p.pid != process.pid]
+        orphans.extend(p for p in group if p not in psutil.Process(process.pid).children(recursive=True))
+        await process.stop(grace_s=2)
+
+    run(scenario())
+    assert orphans
+    gone, alive = psutil.wait_procs(orphans, timeout=2)
+    assert alive == []
+
+
+def _group_of(process: psutil.Process):
+    try:
+        return os.getpgid(process.pid)
+    except (ProcessLookupError, PermissionError):
+        return None
@@ -0,0 +1,73 @@
+import pytest
+
+from instatest.core.helpers.decorators.batch_resolver import BatchResolvable, resolve_all
+from instatest.core.helpers.decorators.element_decorators import CachePolicy, element, elements, invalidate_cache
+from instatest.core.helpers.mobile.android_selector import AndroidSelector
+from tests.fake_webdriver import FakeMobileDriverContext, FakeWebDriver, build_hierarchy
+
+PACKAGE = "com.instawork.app"
+
+
+def resource_id(name: str) -> str:
+    return "{0}:id/{1}".format(PACKAGE, name)
+
+
+class JobsScreen(BatchResolvable):
+    title = element(android=AndroidSelector.ByResourceId(resource_id("toolbar_title")))
+    footer = element(android=AndroidSelector.ByResourceId(resource_id("footer_button")))
+    rows = elements(android=AndroidSelector.ByResourceId(resource_id("job_row")))
+    missing = element(android=AndroidSelector.ByResourceId(resource_id("not_on_screen")))
+
+    def __init__(self, driver_context, cache_policy: CachePolicy = None):
+        self.driver_context = driver_context
+        if cache_policy is not None:
+            self.element_cache_policy = cache_policy
+
+
+@pytest.fixture
+def driver():
+    return FakeWebDriver(build_hierarchy(rows=3, package=PACKAGE), package=PACKAGE)
+
+
+def test_batch_uses_two_round_trips(driver):
+    screen = JobsScreen(FakeMobileDriverContext(driver))
+    resolved = resolve_all(screen)
+
+    # Page source and one XPath union
+    assert driver.command_count == 2
+    assert resolved["footer"].text == "Load more"
+    assert len(resolved["rows"]) == 3
+    assert resolved["missing"] is None
+
+
+@pytest.mark.parametrize("policy", [None, CachePolicy.TRUST])
+def test_access_after_prefetch_makes_no_driver_calls(driver, policy):
+    screen = JobsScreen(FakeMobileDriverContext(driver), policy)
+    resolved = screen.prefetch()
+
+    driver.command_count = 0
+    assert screen.title is resolved["title"]
+    assert screen.footer is resolved["footer"]
+    assert screen.rows == resolved["rows"]
+    assert driver.command_count == 0
+
+
+def test_fresh_serves_prefetched_element_once(driver):
+    screen = JobsScreen(FakeMobileDriverContext(driver))
+    resolve_all(screen, ["footer"])
+
+    driver.command_count = 0
+    screen.footer
+    assert driver.command_count == 0
+    screen.footer
+    assert driver.command_count == 1
+
+
+def test_navigation_drops_prefetched_elements(driver):
+    screen = JobsScreen(FakeMobileDriverContext(driver))
+    resolve_all(screen, ["footer"])
+    invalidate_cache()
+
+    driver.command_count = 0
+    screen.footer
+    assert driver.command_count == 1
@@ -0,0 +1,103 @@
+import json
+import os
+import time
+
+import pytest
+
+from instatest.core.mobile.devices import DevicePlatform
+from instatest.core.mobile.devices.device_catalog import DeviceCatalog
+
+PLATFORMS = [
+    {"api_name": "android", "device": "Android GoogleAPI Emulator", "short_version": "12.0",
+     "long_name": "Android Emulator"},
+    {"api_name": "android", "device": "Android GoogleAPI Emulator", "short_version": "13.0",
+     "long_name": "Android Emulator"},
+    {"api_name": "android", "device": "Android GoogleAPI Emulator", "short_version": "13.0",
+     "long_name": "Android Emulator"},
+    {"api_name": "android", "device": "Google Pixel 7", "short_version": "14.0", "long_name": "Google Pixel 7"},
+    {"api_name": "iphone", "device": "iPhone Simulator", "short_version": "16.4", "long_name": "iPhone Simulator"},
+]
+
+
+class Fetch:
+    def __init__(self, platforms=None, error: Exception = None):
+        self.platforms = platforms if platforms is not None else PLATFORMS
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return self.platforms
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "platforms.json")
+
+
+def age_cache(path: str, age_s: float):
+    with open(path) as f:
+        data = json.load(f)
+    data["fetched_at"] = time.time() - age_s
+    with open(path, "w") as f:
+        json.dump(data, f)
+
+
+def test_cache_used_within_ttl(cache_path):
+    fetch = Fetch()
+    first = DeviceCatalog.cached(fetch, path=cache_path, ttl_s=60)
+    second = DeviceCatalog.cached(fetch, path=cache_path, ttl_s=60)
+
+    assert fetch.calls == 1
+    assert os.path.exists(cache_path)
+    assert len(first) == len(second) == 4
+    assert second.fetched_at == pytest.approx(first.fetched_at)
+
+
+def test_expired_cache_is_fetched_again(cache_path):
+    fetch = Fetch()
+    DeviceCatalog.cached(fetch, path=cache_path, ttl_s=60)
+    age_cache(cache_path, 120)
+    fetch.platforms = PLATFORMS[:1]
+
+    catalog = DeviceCatalog.cached(fetch, path=cache_path, ttl_s=60)
+
+    assert fetch.calls == 2
+    assert len(catalog) == 1
+    assert time.time() - catalog.fetched_at < 60
+    assert len(DeviceCatalog.from_file(cache_path)) == 1
+
+
+def test_expired_cache_used_when_fetch_fails(cache_path):
+    DeviceCatalog.cached(Fetch(), path=cache_path, ttl_s=60)
+    age_cache(cache_path, 120)
+
+    catalog = DeviceCatalog.cached(Fetch(error=IOError("sauce is down")), path=cache_path, ttl_s=60)
+
+    assert len(catalog) == 4
+
+
+def test_fetch_error_without_cache_raises(cache_path):
+    with pytest.raises(IOError):
+        DeviceCatalog.cached(Fetch(error=IOError("sauce is down")), path=cache_path)
+
+
+def test_unreadable_cache_is_fetched_again(cache_path):
+    with open(cache_path, "w") as f:
+        f.write("{not json")
+    fetch = Fetch()
+
+    assert len(DeviceCatalog.cached(fetch, path=cache_path)) == 4
+    assert fetch.calls == 1
+
+
+def test_find_filters():
+    catalog = DeviceCatalog(PLATFORMS)
+
+    assert [d.version for d in catalog.find(DevicePlatform.ANDROID, min_version="13")] == ["13.0", "14.0"]
+    assert [d.version for d in catalog.find(DevicePlatform.ANDROID, max_version="13")] == ["12.0", "13.0"]
+    assert [d.name for d in catalog.find("android", emulated=False)] == ["Google Pixel 7"]
+    assert [d.version for d in catalog.find(name="iphone simulator")] == ["16.4"]
+    assert catalog.versions(DevicePlatform.ANDROID) == ["12.0", "13.0", "14.0"]
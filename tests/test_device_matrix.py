@@ -0,0 +1,69 @@
+from instatest.core.mobile import device_matrix
+from instatest.core.mobile.device_matrix import DeviceMatrixScheduler, DurationHistory, FakeDriverContext
+from instatest.core.mobile.devices import AndroidDevice
+
+
+def make_devices(count: int):
+    return [AndroidDevice(name="Pixel", version="13", device_name="emulator-{0}".format(5554 + i * 2))
+            for i in range(count)]
+
+
+def make_history(tmp_path) -> DurationHistory:
+    return DurationHistory(path=str(tmp_path / "durations.json"), default_s=1.0)
+
+
+def passing(context):
+    assert isinstance(context, FakeDriverContext)
+
+
+def failing(context):
+    raise AssertionError("boom")
+
+
+def test_all_devices_fail_is_not_green(tmp_path):
+    def broken_factory(device, application):
+        raise RuntimeError("no driver")
+
+    scheduler = DeviceMatrixScheduler(make_devices(3), context_factory=broken_factory, history=make_history(tmp_path))
+    report = scheduler.run({"login": passing, "signup": passing})
+
+    assert not report.passed
+    assert sorted(report.unscheduled) == ["login", "signup"]
+    assert sorted(report.not_run()) == ["login", "signup"]
+    assert report.outcomes() == {}
+    assert report.to_dict()["passed"] is False
+
+
+def test_failed_device_moves_shard_to_healthy_device(tmp_path):
+    devices = make_devices(2)
+    bad = DeviceMatrixScheduler.device_key(devices[0])
+
+    def factory(device, application):
+        if DeviceMatrixScheduler.device_key(device) == bad:
+            raise RuntimeError("device offline")
+        return FakeDriverContext(device, application)
+
+    scheduler = DeviceMatrixScheduler(devices, context_factory=factory, history=make_history(tmp_path))
+    report = scheduler.run({"a": passing, "b": passing, "c": passing, "d": passing})
+
+    assert report.passed
+    assert report.unscheduled == []
+    assert report.tests_with(device_matrix.TestResult.PASSED) == ["a", "b", "c", "d"]
+    assert all(r.device != bad and r.attempt == 1 for r in report.attempts)
+
+
+def test_failed_test_retried_on_another_device(tmp_path):
+    calls = []
+
+    def flaky(context):
+        calls.append(context.device)
+        if len(calls) == 1:
+            raise AssertionError("first run fails")
+
+    scheduler = DeviceMatrixScheduler(make_devices(2), history=make_history(tmp_path), max_retries=1)
+    report = scheduler.run({"flaky": flaky, "broken": failing})
+
+    assert report.outcomes() == {"flaky": device_matrix.TestResult.FLAKY, "broken": device_matrix.TestResult.FAILED}
+    assert calls[0] is not calls[1]
+    assert len([r for r in report.attempts if r.test_name == "broken"]) == 2
+    assert not report.passed
@@ -0,0 +1,125 @@
+import json
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException, TimeoutException
+
+from instatest.core.helpers import driver_instrumentation
+from instatest.core.helpers.driver_instrumentation import (ERROR, FOUND, NOT_FOUND, STALE, BUCKETS_MS,
+                                                           RoundTripRecorder, SelectorStats, instrumented)
+
+
+@pytest.fixture
+def recorder(monkeypatch):
+    fresh = RoundTripRecorder(enabled=True)
+    monkeypatch.setattr(driver_instrumentation, "recorder", fresh)
+    return fresh
+
+
+def stats_with(*durations_ms: float) -> SelectorStats:
+    stats = SelectorStats()
+    for duration_ms in durations_ms:
+        stats.add(duration_ms / 1000.0, FOUND)
+    return stats
+
+
+def only_stats(recorder: RoundTripRecorder) -> SelectorStats:
+    [(_, _, stats)] = recorder.top()
+    return stats
+
+
+def test_percentile_is_bucket_upper_bound():
+    stats = stats_with(*([0.5] * 8 + [15, 20000]))
+    assert stats.percentile_ms(50) == 1.0
+    assert stats.percentile_ms(80) == 1.0
+    assert stats.percentile_ms(90) == 20.0
+    # Falls in the unbounded bucket
+    assert stats.percentile_ms(95) is None
+    assert stats.percentile_ms(100) is None
+
+
+def test_percentile_bucket_edges():
+    # A duration equal to a bound belongs to that bucket
+    assert stats_with(1).percentile_ms(95) == 1.0
+    assert stats_with(1.001).percentile_ms(95) == 2.0
+    assert stats_with(BUCKETS_MS[-1]).percentile_ms(50) == float(BUCKETS_MS[-1])
+    assert SelectorStats().percentile_ms(95) == 0.0
+
+
+def test_merge_and_histogram():
+    stats = stats_with(0.5, 3)
+    stats.merge(stats_with(3, 20000))
+    summary = stats.to_dict()
+    assert summary["calls"] == 4
+    assert summary["max_ms"] == 20000.0
+    assert summary["histogram_ms"] == {"<=1": 1, "<=5": 2, ">10000": 1}
+    assert summary["outcomes"] == {FOUND: 4}
+
+
+@pytest.mark.parametrize("call, outcome", [
+    (lambda: "element", FOUND),
+    (lambda: ["element"], FOUND),
+    (lambda: None, NOT_FOUND),
+    (lambda: [], NOT_FOUND),
+])
+def test_outcome_of_result(recorder, call, outcome):
+    recorder.timed("element._get_element", "id=login", call)
+    assert only_stats(recorder).outcomes == {outcome: 1}
+
+
+@pytest.mark.parametrize("error, outcome", [
+    (NoSuchElementException, NOT_FOUND),
+    (TimeoutException, NOT_FOUND),
+    (StaleElementReferenceException, STALE),
+    (ValueError, ERROR),
+])
+def test_outcome_of_exception(recorder, error, outcome):
+    def call():
+        raise error("lookup failed")
+
+    with pytest.raises(error):
+        recorder.timed("element._get_element", "id=login", call)
+    assert only_stats(recorder).outcomes == {outcome: 1}
+
+
+def test_disabled_lookup_skips_recorder(recorder):
+    selectors = []
+
+    class Page:
+        @instrumented("page.find", lambda self, selector: selectors.append(selector) or selector)
+        def find(self, selector):
+            return "element"
+
+    recorder.disable()
+    assert Page().find("id=login") == "element"
+    assert selectors == []
+    assert recorder.top() == []
+
+    recorder.enable()
+    Page().find("id=login")
+    assert selectors == ["id=login"]
+    assert only_stats(recorder).calls == 1
+
+
+def test_report_grouped_by_test_and_screen(recorder, tmp_path):
+    with recorder.test("test_login"):
+        recorder.screen = "login"
+        recorder.record("element._get_element", "id=user", 0.002, FOUND)
+        recorder.record("element._get_element", "id=user", 0.004, NOT_FOUND)
+        recorder.screen = "home"
+        recorder.record("element._get_elements", "id=row", 0.010, FOUND)
+    assert recorder.current_test == RoundTripRecorder.NO_TEST
+    recorder.record("element._get_element", "id=user", 0.001, FOUND)
+
+    path = str(tmp_path / "out" / "driver_round_trips.json")
+    recorder.export(path)
+    with open(path) as f:
+        tests = json.load(f)["tests"]
+    login = tests["test_login"]
+    assert (login["calls"], login["total_ms"]) == (3, 16.0)
+    [selector] = login["screens"]["login"]["selectors"]
+    assert (selector["selector"], selector["calls"], selector["outcomes"]) == ("id=user", 2, {FOUND: 1, NOT_FOUND: 1})
+    assert tests[RoundTripRecorder.NO_TEST]["screens"][RoundTripRecorder.NO_SCREEN]["calls"] == 1
+
+    [(path_name, selector_name, stats), _] = recorder.top(2)
+    assert (path_name, selector_name, stats.calls) == ("element._get_elements", "id=row", 1)
+    assert "id=user" in recorder.format_top()
@@ -0,0 +1,60 @@
+import time
+
+from tests.fake_webdriver import FakeMobileDriverContext, FakeWebDriver, build_hierarchy
+from instatest.core.helpers.decorators.element_decorators import CachePolicy, element, elements
+from instatest.core.helpers.mobile.android_selector import AndroidSelector
+
+PACKAGE = "com.instawork.app"
+
+
+def resource_id(name: str) -> str:
+    return "{0}:id/{1}".format(PACKAGE, name)
+
+
+class JobsScreen:
+    footer = element(android=AndroidSelector.ByResourceId(resource_id("footer_button")))
+    rows = elements(android=AndroidSelector.ByResourceId(resource_id("job_row")))
+
+    def __init__(self, driver_context, cache_policy: CachePolicy = None, cache_ttl_s: float = None):
+        self.driver_context = driver_context
+        if cache_policy is not None:
+            self.element_cache_policy = cache_policy
+        if cache_ttl_s is not None:
+            self.element_cache_ttl_s = cache_ttl_s
+
+
+def make_driver(rows: int = 3) -> FakeWebDriver:
+    return FakeWebDriver(build_hierarchy(rows=rows, package=PACKAGE), package=PACKAGE)
+
+
+def test_default_policy_looks_up_every_access():
+    driver = make_driver()
+    screen = JobsScreen(FakeMobileDriverContext(driver))
+    screen.footer
+    screen.footer
+    assert driver.command_count == 2
+
+
+def test_validate_reuses_element_after_probe():
+    driver = make_driver()
+    screen = JobsScreen(FakeMobileDriverContext(driver), CachePolicy.VALIDATE)
+    first = screen.footer
+    assert screen.footer is first
+
+
+def test_validate_does_not_cache_lists():
+    driver = make_driver(rows=3)
+    screen = JobsScreen(FakeMobileDriverContext(driver), CachePolicy.VALIDATE)
+    assert len(screen.rows) == 3
+    driver.load(build_hierarchy(rows=5, package=PACKAGE))
+    assert len(screen.rows) == 5
+
+
+def test_trusted_list_looked_up_again_after_ttl():
+    driver = make_driver(rows=3)
+    screen = JobsScreen(FakeMobileDriverContext(driver), CachePolicy.TRUST, cache_ttl_s=0.01)
+    assert len(screen.rows) == 3
+    driver.load(build_hierarchy(rows=4, package=PACKAGE))
+    assert len(screen.rows) == 3
+    time.sleep(0.02)
+    assert len(screen.rows) == 4
@@ -0,0 +1,69 @@
+from tests.fake_webdriver import FakeMobileDriverContext, FakeWebDriver, build_hierarchy
+from instatest.core.helpers.decorators.element_decorators import elements
+from instatest.core.helpers.mobile.android_selector import AndroidSelector
+from instatest.core.helpers.mobile.page_snapshot import PageSnapshot
+
+PACKAGE = "com.instawork.app"
+TITLES = "//*[@resource-id='{0}:id/job_title']".format(PACKAGE)
+PAY = "//*[@resource-id='{0}:id/job_pay']".format(PACKAGE)
+
+
+class JobsScreen:
+    titles = elements(android=AndroidSelector.ByXPath(TITLES))
+    titles_and_pay = elements(android=AndroidSelector.ByXPath("{0} | {1}".format(TITLES, PAY)))
+    apply_buttons = elements(android=AndroidSelector.ByXPath("//*[starts-with(@content-desc,'apply_')]"))
+
+    def __init__(self, driver_context):
+        self.driver_context = driver_context
+
+
+def make_screen(rows: int = 3):
+    driver = FakeWebDriver(build_hierarchy(rows=rows, package=PACKAGE), package=PACKAGE)
+    return driver, JobsScreen(FakeMobileDriverContext(driver))
+
+
+def test_records_from_snapshot():
+    driver, screen = make_screen()
+    driver.command_count = 0
+    assert [r.text for r in JobsScreen.titles.records(screen)] == ["Job 0", "Job 1", "Job 2"]
+    assert driver.command_count == 1
+
+
+def test_records_for_union_read_from_elements():
+    driver, screen = make_screen()
+    records = JobsScreen.titles_and_pay.records(screen)
+    assert [r.text for r in records] == ["Job 0", "$15/hr", "Job 1", "$16/hr", "Job 2", "$17/hr"]
+
+
+def test_records_for_function_xpath_read_from_elements():
+    driver, screen = make_screen()
+    records = JobsScreen.apply_buttons.records(screen)
+    assert len(records) == 3
+    assert all(r.text == "Apply" for r in records)
+
+
+def test_records_from_given_snapshot_make_no_driver_calls():
+    driver, screen = make_screen()
+    snapshot = PageSnapshot.capture(screen.driver_context)
+    driver.command_count = 0
+    records = JobsScreen.titles.records(screen, snapshot)
+    assert [r.displayed for r in records] == [True, True, True]
+    assert [r.bounds for r in records] == [(0, 0, 1080, 20)] * 3
+    assert driver.command_count == 0
+
+
+def test_element_records_read_only_what_is_used():
+    driver, screen = make_screen()
+    driver.command_count = 0
+    records = JobsScreen.apply_buttons.records(screen)
+    # The page source can't answer starts-with, only the lookup is made
+    assert driver.command_count == 1
+
+    assert [r.text for r in records] == ["Apply"] * 3
+    assert [r.text for r in records] == ["Apply"] * 3
+    assert driver.command_count == 4
+
+    assert records[0].bounds == (900, 0, 180, 40)
+    assert records[0].tag == "android.widget.Button"
+    assert records[0].get_attribute('content-desc') == "apply_0"
+    assert driver.command_count == 7
@@ -0,0 +1,118 @@
+import hashlib
+import os
+
+import pytest
+
+from instatest.core.helpers import file_fingerprint
+from instatest.core.helpers.file_fingerprint import FileFingerprint, clear_fingerprint_cache, fingerprint_file, hash_file
+from instatest.core.mobile.devices import DevicePlatform
+from instatest.core.mobile.mobile_application import MobileApplication
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    clear_fingerprint_cache()
+    yield
+    clear_fingerprint_cache()
+
+
+@pytest.fixture
+def build(tmp_path):
+    path = str(tmp_path / "app-release.apk")
+    write(path, b"build 1")
+    return path
+
+
+def write(path: str, content: bytes, mtime_ns: int = None):
+    with open(path, "wb") as f:
+        f.write(content)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def hashed() -> int:
+    return file_fingerprint.hash_count
+
+
+def test_hash_file_matches_hashlib(build, monkeypatch):
+    assert hash_file(build) == hashlib.md5(b"build 1").hexdigest()
+    assert hash_file(build, "blake2b") == hashlib.blake2b(b"build 1").hexdigest()
+    # Large files are hashed through mmap
+    monkeypatch.setattr(file_fingerprint, "MMAP_THRESHOLD", 1)
+    assert hash_file(build, "sha256") == hashlib.sha256(b"build 1").hexdigest()
+
+
+def test_unchanged_file_hashed_once(build):
+    before = hashed()
+    first = fingerprint_file(build)
+    assert fingerprint_file(build) is first
+    assert fingerprint_file(build, previous=first) is first
+    assert hashed() - before == 1
+
+
+def test_previous_fingerprint_reused_without_cache(build):
+    previous = FileFingerprint.load(fingerprint_file(build).export())
+    clear_fingerprint_cache()
+    before = hashed()
+    assert fingerprint_file(build, previous=previous) is previous
+    assert hashed() == before
+
+
+def test_size_change_rehashes(build):
+    first = fingerprint_file(build)
+    stat = os.stat(build)
+    write(build, b"build 22", mtime_ns=stat.st_mtime_ns)
+
+    second = fingerprint_file(build, previous=first)
+    assert second.size == first.size + 1
+    assert second.digest == hashlib.md5(b"build 22").hexdigest()
+
+
+def test_mtime_change_rehashes(build):
+    first = fingerprint_file(build)
+    write(build, b"build 2", mtime_ns=os.stat(build).st_mtime_ns + 1000)
+
+    second = fingerprint_file(build, previous=first)
+    assert second.size == first.size
+    assert second.digest == hashlib.md5(b"build 2").hexdigest()
+
+
+def test_inode_change_rehashes(build, tmp_path):
+    first = fingerprint_file(build)
+    stat = os.stat(build)
+    replacement = str(tmp_path / "download.apk")
+    write(replacement, b"build 3", mtime_ns=stat.st_mtime_ns)
+    os.replace(replacement, build)
+
+    second = fingerprint_file(build, previous=first)
+    assert (second.size, second.mtime_ns) == (first.size, first.mtime_ns)
+    assert second.inode != first.inode
+    assert second.digest == hashlib.md5(b"build 3").hexdigest()
+
+
+def test_other_algorithm_or_path_not_matched(build, tmp_path):
+    first = fingerprint_file(build)
+    assert fingerprint_file(build, "blake2b", previous=first).algorithm == "blake2b"
+    copy = str(tmp_path / "copy.apk")
+    write(copy, b"build 1")
+    assert not first.matches(os.stat(build), path=copy)
+
+
+def test_load_rejects_incomplete_data(build):
+    exported = fingerprint_file(build).export()
+    del exported["inode"]
+    assert FileFingerprint.load(exported) is None
+    assert FileFingerprint.load({"size": "big"}) is None
+
+
+def test_update_md5_returns_digest(build):
+    application = MobileApplication(app_name="applicant", platform=DevicePlatform.ANDROID,
+                                    file_path=os.path.dirname(build), file_name=os.path.basename(build))
+    before = hashed()
+    assert application.update_md5() == hashlib.md5(b"build 1").hexdigest()
+    assert application.update_md5() == hashlib.md5(b"build 1").hexdigest()
+    assert hashed() - before == 1
+    assert application.file_size == len(b"build 1")
+
+    write(build, b"build 2", mtime_ns=os.stat(build).st_mtime_ns + 1000)
+    assert application.update_md5() == hashlib.md5(b"build 2").hexdigest()
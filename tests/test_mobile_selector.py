@@ -0,0 +1,76 @@
+import gc
+
+import pytest
+from appium.webdriver.common.mobileby import MobileBy
+
+from instatest.core.helpers.mobile import MobileOperator
+from instatest.core.helpers.mobile import mobile_selector
+from instatest.core.helpers.mobile.android_selector import AndroidSelector
+from instatest.core.target_property import TargetProperty
+
+
+def text_selector(operator, value="Apply") -> AndroidSelector:
+    return AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.Text, operator, value)
+
+
+def test_predicate_compiled_once(monkeypatch):
+    selector = text_selector(MobileOperator.Contains)
+    calls = []
+    compile_predicate = AndroidSelector._compile_predicate
+
+    def counting(self):
+        calls.append(self)
+        return compile_predicate(self)
+
+    monkeypatch.setattr(AndroidSelector, "_compile_predicate", counting)
+    assert selector.build_predicate() == 'new UiSelector().textContains("Apply")'
+    assert selector.build_predicate() is selector.build_predicate()
+    assert len(calls) == 1
+
+
+def test_equal_selectors_hash_the_same():
+    first = text_selector(MobileOperator.Equals)
+    second = text_selector(MobileOperator.Equals)
+
+    assert first == second
+    assert hash(first) == hash(second)
+    assert len({first, second}) == 1
+    assert first != text_selector(MobileOperator.Contains)
+    assert first != text_selector(MobileOperator.Equals, "Cancel")
+
+
+@pytest.mark.parametrize("field, value", [
+    ("_by", MobileBy.XPATH),
+    ("_val", "Cancel"),
+    ("_operator", MobileOperator.Contains),
+])
+def test_selector_is_frozen(field, value):
+    selector = text_selector(MobileOperator.Equals)
+    with pytest.raises(AttributeError):
+        setattr(selector, field, value)
+
+
+def test_ends_with_keeps_operator():
+    selector = text_selector(MobileOperator.EndsWith, "now")
+
+    assert selector.build_predicate() == 'new UiSelector().textMatches(".*now$")'
+    assert selector.operator == MobileOperator.EndsWith
+    assert selector.build_predicate() == 'new UiSelector().textMatches(".*now$")'
+
+
+def test_resource_id_ends_with_is_sent_as_matches():
+    # EndsWith is validated as the Matches regex it is sent as, which resource ids support
+    selector = AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.ResourceId, MobileOperator.EndsWith,
+                               "id/apply")
+    assert selector.build_predicate() == 'new UiSelector().resourceIdMatches(".*id/apply$")'
+
+
+def test_interned_selectors_are_shared():
+    first = AndroidSelector.ByResourceId("intern_shared")
+    assert AndroidSelector.ByResourceId("intern_shared") is first
+
+
+def test_unused_interned_selectors_are_released():
+    AndroidSelector.ByResourceId("intern_released")
+    gc.collect()
+    assert not any(key[-1] == "intern_released" for key in mobile_selector._interned_selectors.keys())
@@ -0,0 +1,138 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from instatest.core.helpers.process.output_pump import OutputPump
+
+
+class Pipes:
+    """
+    Writable ends for the streams an OutputPump reads
+    """
+
+    def __init__(self, *names):
+        self.readers = {}
+        self._writers = {}
+        for name in names:
+            read_fd, write_fd = os.pipe()
+            self.readers[name] = os.fdopen(read_fd, "rb", buffering=0)
+            self._writers[name] = write_fd
+
+    def write(self, name: str, data: bytes):
+        os.write(self._writers[name], data)
+
+    def close(self, name: str = None):
+        for n in [name] if name else list(self._writers):
+            os.close(self._writers.pop(n))
+
+
+@pytest.fixture
+def pipes():
+    opened = []
+
+    def make(*names) -> Pipes:
+        p = Pipes(*names)
+        opened.append(p)
+        return p
+
+    yield make
+    for p in opened:
+        p.close()
+
+
+def start_pump(p: Pipes, **kwargs) -> OutputPump:
+    pump = OutputPump(p.readers, name="test", **kwargs)
+    pump.start()
+    return pump
+
+
+def test_partial_lines_joined(pipes):
+    p = pipes("stdout")
+    pump = start_pump(p)
+    p.write("stdout", b"listener ")
+    p.write("stdout", b"started\nsecond")
+    assert pump.wait_for_lines(1, timeout_s=5)
+    assert pump.lines() == [b"listener started\n"]
+
+    p.write("stdout", b" line\n")
+    assert pump.wait_for_lines(2, timeout_s=5)
+    assert pump.lines() == [b"listener started\n", b"second line\n"]
+
+
+def test_unterminated_line_published_at_eof(pipes):
+    p = pipes("stdout")
+    pump = start_pump(p)
+    closed = []
+    pump.on_close(lambda: closed.append(True))
+    p.write("stdout", b"done\nno newline")
+    p.close()
+
+    assert pump.wait_closed(timeout_s=5)
+    pump.join(5)
+    assert pump.lines() == [b"done\n", b"no newline"]
+    assert closed == [True]
+    assert pump.closed
+
+
+def test_streams_kept_apart_and_blank_lines_dropped(pipes):
+    p = pipes("stdout", "stderr")
+    pump = start_pump(p)
+    seen = []
+    pump.subscribe(lambda stream, line: seen.append((stream, line)))
+    p.write("stderr", b"warning\n\n")
+    p.write("stdout", b"info\n")
+    p.close()
+    assert pump.wait_closed(timeout_s=5)
+
+    assert pump.lines("stderr") == [b"warning\n"]
+    assert pump.lines("stdout") == [b"info\n"]
+    assert sorted(seen) == [("stderr", b"warning\n"), ("stdout", b"info\n")]
+
+
+def test_buffer_bounded_but_lines_counted(pipes):
+    p = pipes("stdout")
+    pump = start_pump(p, max_lines=3)
+    p.write("stdout", b"".join(b"line %d\n" % i for i in range(10)))
+    p.close()
+    assert pump.wait_closed(timeout_s=5)
+
+    assert pump.line_count == 10
+    assert pump.lines() == [b"line 7\n", b"line 8\n", b"line 9\n"]
+    assert [s for s, _, _ in pump.lines_since(8)] == [8, 9]
+
+
+def test_failing_subscriber_does_not_stop_reader(pipes):
+    p = pipes("stdout")
+    pump = start_pump(p)
+    pump.subscribe(lambda stream, line: 1 / 0)
+    p.write("stdout", b"one\ntwo\n")
+    assert pump.wait_for_lines(2, timeout_s=5)
+
+
+def test_unsubscribe(pipes):
+    p = pipes("stdout")
+    pump = start_pump(p)
+    seen = []
+    unsubscribe = pump.subscribe(lambda stream, line: seen.append(line))
+    p.write("stdout", b"one\n")
+    assert pump.wait_for_lines(1, timeout_s=5)
+    unsubscribe()
+    p.write("stdout", b"two\n")
+    assert pump.wait_for_lines(2, timeout_s=5)
+    assert seen == [b"one\n"]
+
+
+def test_full_stderr_does_not_block_stdout():
+    # More than a pipe buffer on stderr before stdout is written
+    script = "import sys; sys.stderr.write('x' * 200000 + '\\n'); sys.stderr.flush(); print('ready', flush=True)"
+    process = subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    pump = OutputPump({'stdout': process.stdout, 'stderr': process.stderr}, name="child")
+    pump.start()
+    try:
+        assert pump.wait_for(lambda: b"ready\n" in pump.lines("stdout"), timeout_s=10)
+        assert pump.wait_closed(timeout_s=10)
+        assert len(pump.lines("stderr")[0]) == 200001
+    finally:
+        process.wait(10)
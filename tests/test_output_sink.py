@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from instatest.core.helpers.process.output_sink import OutputSink, rotate_file
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.fixture
+def log_path(tmp_path):
+    return str(tmp_path / "logs" / "appium.log")
+
+
+def test_lines_written_with_stderr_prefix(log_path):
+    sink = OutputSink(log_path)
+    sink("stdout", b"listener started\n")
+    sink("stderr", b"warning\n")
+    sink.close()
+
+    assert read(log_path) == b"listener started\n[stderr] warning\n"
+    assert sink.lines_written == 2
+
+
+def test_rotation_keeps_size_and_backups_bounded(log_path):
+    line = b"x" * 99 + b"\n"
+    sink = OutputSink(log_path, max_bytes=1000, backup_count=2)
+    for _ in range(100):
+        sink.write("stdout", line)
+    sink.close()
+
+    files = sorted(f for f in os.listdir(os.path.dirname(log_path)))
+    assert files == ["appium.log", "appium.log.1", "appium.log.2"]
+    for name in files:
+        assert os.path.getsize(os.path.join(os.path.dirname(log_path), name)) <= 1000
+    assert sink.lines_written == 100
+
+
+def test_rotation_without_backups_starts_over(log_path):
+    sink = OutputSink(log_path, max_bytes=100, backup_count=0)
+    for i in range(25):
+        sink.write("stdout", b"line %02d\n" % i)
+    sink.close()
+
+    assert os.listdir(os.path.dirname(log_path)) == ["appium.log"]
+    assert read(log_path).endswith(b"line 24\n")
+    assert len(read(log_path)) < 100
+
+
+def test_appends_to_existing_file(log_path):
+    first = OutputSink(log_path)
+    first.write("stdout", b"one\n")
+    first.close()
+    second = OutputSink(log_path)
+    second.write("stdout", b"two\n")
+    second.close()
+
+    assert read(log_path) == b"one\ntwo\n"
+
+
+def test_filter_drops_lines(log_path):
+    sink = OutputSink(log_path, line_filter=r"ERROR|WARN")
+    for line in (b"[debug] polling\n", b"[ERROR] session died\n", b"[WARN] slow\n"):
+        sink.write("stdout", line)
+    sink.close()
+
+    assert read(log_path) == b"[ERROR] session died\n[WARN] slow\n"
+    assert (sink.lines_written, sink.lines_dropped) == (2, 1)
+
+
+def test_callable_filter_gets_stream(log_path):
+    sink = OutputSink(log_path, line_filter=lambda stream, line: stream == "stderr")
+    sink.write("stdout", b"info\n")
+    sink.write("stderr", b"error\n")
+    sink.close()
+
+    assert read(log_path) == b"[stderr] error\n"
+
+
+def test_tail_is_bounded(log_path):
+    sink = OutputSink(log_path, tail_lines=3)
+    for i in range(10):
+        sink.write("stdout", b"%d\n" % i)
+    sink.close()
+
+    assert sink.tail() == [b"7\n", b"8\n", b"9\n"]
+    assert sink.tail(1) == [b"9\n"]
+
+
+def test_buffered_until_flush_interval(log_path):
+    sink = OutputSink(log_path, flush_interval_s=3600)
+    sink.write("stdout", b"buffered\n")
+    assert read(log_path) == b""
+    sink.flush()
+    assert read(log_path) == b"buffered\n"
+    sink.close()
+
+
+def test_writes_after_close_only_kept_in_tail(log_path):
+    sink = OutputSink(log_path)
+    sink.close()
+    sink.write("stdout", b"late\n")
+
+    assert read(log_path) == b""
+    assert sink.tail() == [b"late\n"]
+
+
+def test_rotate_file_shifts_backups(tmp_path):
+    path = str(tmp_path / "appium.out")
+    for content in (b"oldest", b"older", b"newest"):
+        rotate_file(path, backup_count=2)
+        with open(path, "wb") as f:
+            f.write(content)
+    rotate_file(path, backup_count=2)
+
+    assert not os.path.exists(path)
+    assert read(path + ".1") == b"newest"
+    assert read(path + ".2") == b"older"
+    assert not os.path.exists(path + ".3")
+    rotate_file(str(tmp_path / "missing.out"), backup_count=2)
@@ -0,0 +1,79 @@
+import pytest
+
+from tests.fake_webdriver import FakeMobileDriverContext, FakeWebDriver, build_hierarchy
+from instatest.core.helpers.mobile.android_selector import AndroidSelector
+from instatest.core.helpers.mobile.page_snapshot import PageSnapshot, can_evaluate_xpath
+from instatest.core.models.element import Element
+
+PACKAGE = "com.instawork.app"
+FOOTER = "{0}:id/footer_button".format(PACKAGE)
+TITLE = "{0}:id/toolbar_title".format(PACKAGE)
+
+
+@pytest.fixture
+def page_source():
+    return build_hierarchy(rows=3, package=PACKAGE)
+
+
+@pytest.mark.parametrize("xpath", [
+    "//*[@resource-id='{0}']".format(FOOTER),
+    "//android.widget.Button[@text='Load more']",
+    "/hierarchy/android.widget.FrameLayout",
+    "//android.widget.ListView/android.widget.LinearLayout[last()]",
+    "//*[@text='Terms and conditions | FAQ']",
+])
+def test_supported_xpath(xpath):
+    assert can_evaluate_xpath(xpath)
+
+
+@pytest.mark.parametrize("xpath", [
+    "//*[@resource-id='{0}'] | //*[@resource-id='{1}']".format(FOOTER, TITLE),
+    "//*[contains(@text, 'Load')]",
+    "//*[starts-with(@content-desc, 'job_')]",
+    "//*[@text='Load more' and @class='android.widget.Button']",
+    "//*[text()='Jobs']",
+    "//android.widget.TextView/ancestor::android.widget.ListView",
+    "/hierarchy[@rotation='0']/android.widget.FrameLayout",
+    "//android.widget.Button/@text",
+])
+def test_unsupported_xpath(xpath):
+    assert not can_evaluate_xpath(xpath)
+    assert not PageSnapshot.can_evaluate(AndroidSelector.ByXPath(xpath))
+
+
+def test_unsupported_xpath_is_not_evaluated_locally(page_source):
+    union = AndroidSelector.ByXPath("//*[@resource-id='{0}'] | //*[@resource-id='{1}']".format(FOOTER, TITLE))
+    with pytest.raises(NotImplementedError):
+        PageSnapshot(page_source).find_all(union)
+
+
+def test_supported_xpath_matches_driver(page_source):
+    xpath = "//android.widget.ListView/android.widget.LinearLayout[last()]"
+    found = PageSnapshot(page_source).find_all(AndroidSelector.ByXPath(xpath))
+    assert [r.get_attribute('content-desc') for r in found] == ["job_2"]
+
+
+@pytest.mark.parametrize("xpath", [
+    "//*[@resource-id='{0}'] | //*[@resource-id='{1}']".format(FOOTER, TITLE),
+    "//*[contains(@text,'Load')]",
+    "//*[starts-with(@content-desc,'foot')]",
+])
+def test_element_falls_back_to_driver(page_source, xpath):
+    driver = FakeWebDriver(page_source, package=PACKAGE)
+    context = FakeMobileDriverContext(driver)
+    snapshot = PageSnapshot(page_source)
+    target = Element(AndroidSelector.ByXPath(xpath), context)
+
+    driver.command_count = 0
+    assert target.is_present(snapshot)
+    assert target.get_text(snapshot) in ("Jobs", "Load more")
+    assert driver.command_count > 0
+
+
+def test_element_uses_snapshot_for_supported_xpath(page_source):
+    driver = FakeWebDriver(page_source, package=PACKAGE)
+    target = Element(AndroidSelector.ByXPath("//*[@resource-id='{0}']".format(FOOTER)), FakeMobileDriverContext(driver))
+
+    driver.command_count = 0
+    assert target.get_text(PageSnapshot(page_source)) == "Load more"
+    assert driver.command_count == 0
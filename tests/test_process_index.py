@@ -0,0 +1,103 @@
+import signal
+import subprocess
+import sys
+import time
+import uuid
+from typing import Tuple
+
+import psutil
+import pytest
+
+from instatest.core.helpers.process import process_index as process_index_module
+from instatest.core.helpers.process.process_index import ProcessIndex
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 50.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(process_index_module, "time", fake)
+    return fake
+
+
+@pytest.fixture
+def start_sleeper():
+    started = []
+
+    def start() -> Tuple[subprocess.Popen, str]:
+        token = "sleeper-{0}".format(uuid.uuid4().hex)
+        process = subprocess.Popen([sys.executable, "-c", "import time; time.sleep(60)", token])
+        started.append(process)
+        return process, token
+
+    yield start
+    for process in started:
+        process.kill()
+        process.wait()
+
+
+def test_table_read_once_per_ttl(clock, start_sleeper):
+    index = ProcessIndex(ttl_s=5)
+    assert index.find_by_cmdline_token("not-started-yet") == []
+
+    process, token = start_sleeper()
+    # Still the table read before the process started
+    assert index.find_by_cmdline_token(token) == []
+
+    clock.now += 5
+    assert [p.pid for p in index.find_by_cmdline_token(token)] == [process.pid]
+
+
+def test_invalidate_forces_a_new_read(clock, start_sleeper):
+    index = ProcessIndex(ttl_s=60)
+    index.refresh()
+    process, token = start_sleeper()
+
+    index.invalidate()
+    assert index.find(token).pid == process.pid
+
+
+def test_find_by_name(clock):
+    index = ProcessIndex()
+    me = psutil.Process()
+    assert me.pid in [p.pid for p in index.find_by_name(me.name(), partial=False)]
+    assert me.pid in [p.pid for p in index.find_by_name(me.name()[:-1])]
+    assert index.find("") is None
+
+
+def test_tracked_process_stops_running(start_sleeper):
+    index = ProcessIndex()
+    process, _ = start_sleeper()
+    index.track(psutil.Process(process.pid))
+    assert index.tracked() == {process.pid}
+    assert index.is_tracked_running(process.pid)
+
+    process.kill()
+    process.wait()
+    assert not index.is_tracked_running(process.pid)
+
+    index.untrack(process.pid)
+    assert index.tracked() == set()
+    assert not index.is_tracked_running(process.pid)
+
+
+@pytest.mark.skipif(not hasattr(signal, "SIGKILL"), reason="needs POSIX zombies")
+def test_unreaped_child_is_not_running(start_sleeper):
+    index = ProcessIndex()
+    process, _ = start_sleeper()
+    child = psutil.Process(process.pid)
+    index.track(child)
+    process.send_signal(signal.SIGKILL)
+    # Not waited for, so the pid stays in the table as a zombie
+    deadline = time.monotonic() + 5
+    while child.status() != psutil.STATUS_ZOMBIE and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert child.status() == psutil.STATUS_ZOMBIE
+    assert not index.is_tracked_running(process.pid)
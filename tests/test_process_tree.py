@@ -0,0 +1,73 @@
+import os
+import subprocess
+import sys
+
+import psutil
+import pytest
+
+from instatest.core.helpers.process.process_tree import TeardownOutcome, terminate_tree
+
+FORKER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "standins",
+                      "forker.py")
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="forker stand in needs fork")
+
+
+@pytest.fixture
+def start_forker():
+    started = []
+
+    def start(children: int, depth: int = 1, *flags, new_session: bool = False) -> psutil.Process:
+        process = subprocess.Popen([sys.executable, FORKER, "--children", str(children), "--depth", str(depth)] +
+                                   list(flags), stdout=subprocess.PIPE, start_new_session=new_session)
+        assert process.stdout.readline().startswith(b"ready")
+        root = psutil.Process(process.pid)
+        started.append((process, [root] + root.children(recursive=True)))
+        return root
+
+    yield start
+    for process, tree in started:
+        for p in tree:
+            try:
+                p.kill()
+            except psutil.Error:
+                pass
+        process.wait()
+        process.stdout.close()
+
+
+def test_tree_terminated_together(start_forker):
+    root = start_forker(6, 2)
+    pids = [root.pid] + [c.pid for c in root.children(recursive=True)]
+
+    report = terminate_tree(root, grace_s=5)
+
+    assert report.success
+    assert sorted(report.outcomes) == sorted(pids)
+    assert report.pids(TeardownOutcome.TERMINATED) and not report.pids(TeardownOutcome.KILLED)
+    assert report.elapsed_s < 5
+
+
+def test_stubborn_tree_killed_after_one_grace_period(start_forker):
+    root = start_forker(4, 1, "--ignore-term")
+
+    report = terminate_tree(root, grace_s=0.5)
+
+    assert report.success
+    assert len(report.pids(TeardownOutcome.KILLED)) == 5
+    # One shared grace period, not one per process
+    assert report.elapsed_s < 0.5 * 5
+
+
+def test_process_group_also_terminates_descendants_in_other_groups(start_forker):
+    root = start_forker(3, 2, "--setsid", new_session=True)
+    moved = [c for c in root.children(recursive=True) if os.getpgid(c.pid) != root.pid]
+    assert moved
+
+    report = terminate_tree(root, grace_s=5, use_process_group=True)
+
+    assert report.used_process_group
+    assert report.success
+    assert not report.pids(TeardownOutcome.KILLED)
+    assert all(report.outcomes[c.pid] == TeardownOutcome.TERMINATED for c in moved)
+    assert report.elapsed_s < 5
@@ -0,0 +1,81 @@
+import os
+import socket
+import sys
+
+import pytest
+
+from instatest.core.helpers.process.managed_process import ManagedProcess
+from instatest.core.helpers.process.readiness import HttpStatus, OutputPattern, PortOpen
+
+FAKE_APPIUM = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks", "standins",
+                           "fake_appium.py")
+READY_PATTERN = r"listener started on"
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def start_appium(tmp_path, monkeypatch):
+    # Output sinks write to ./out
+    monkeypatch.chdir(tmp_path)
+    started = []
+
+    def start(port: int, delay_s: float, probes) -> ManagedProcess:
+        process = ManagedProcess(cmd_list=[sys.executable, FAKE_APPIUM, "--port", str(port), "--delay", str(delay_s)],
+                                 name="fake_appium_{0}".format(port), readiness_probes=probes)
+        process.start_instance_process()
+        started.append(process)
+        return process
+
+    yield start
+    for process in started:
+        process.stop_instance_process()
+
+
+@pytest.mark.parametrize("make_probes", [
+    lambda port: [OutputPattern(READY_PATTERN)],
+    lambda port: [PortOpen(port)],
+    lambda port: [HttpStatus("http://127.0.0.1:{0}/status".format(port))],
+    lambda port: [OutputPattern(READY_PATTERN), PortOpen(port), HttpStatus("http://127.0.0.1:{0}/status".format(port))],
+], ids=["output", "port", "http", "all"])
+def test_ready_once_server_listens(start_appium, make_probes):
+    port = free_port()
+    process = start_appium(port, 0.3, make_probes(port))
+
+    assert process.wait_until_ready(timeout_s=10)
+    assert PortOpen(port).check()
+
+
+@pytest.mark.parametrize("make_probes", [
+    lambda port: [OutputPattern(READY_PATTERN)],
+    lambda port: [PortOpen(port)],
+    lambda port: [HttpStatus("http://127.0.0.1:{0}/status".format(port))],
+], ids=["output", "port", "http"])
+def test_not_ready_before_timeout(start_appium, make_probes):
+    port = free_port()
+    process = start_appium(port, 5, make_probes(port))
+
+    assert not process.wait_until_ready(timeout_s=0.5)
+    assert process.get_return_code() is None
+
+
+def test_output_pattern_sees_lines_printed_before_waiting(start_appium):
+    port = free_port()
+    process = start_appium(port, 0, [PortOpen(port)])
+    assert process.wait_until_ready(timeout_s=10)
+    # The ready line is already buffered, it is found without waiting for a new one
+    assert process.wait_until_ready([OutputPattern(READY_PATTERN)], timeout_s=0.2)
+
+
+def test_not_ready_when_process_exits(start_appium):
+    port = free_port()
+    process = start_appium(port, 0.2, [PortOpen(port)])
+    with socket.socket() as taken:
+        taken.bind(("127.0.0.1", port))
+        # The stand in can't bind the port and exits before the timeout
+        assert not process.wait_until_ready([OutputPattern(READY_PATTERN)], timeout_s=10)
+    assert process.get_return_code() not in (None, 0)
@@ -0,0 +1,63 @@
+import pytest
+
+from instatest.core.helpers.record_store import RecordStore, kind_of, platform_of
+from instatest.core.mobile.devices import AndroidDevice, AppleDevice, Device, DevicePlatform
+
+
+@pytest.fixture
+def store(tmp_path):
+    record_store = RecordStore(str(tmp_path / "instatest.db"))
+    yield record_store
+    record_store.close()
+
+
+@pytest.fixture
+def devices(store):
+    pixel = AndroidDevice(name="Pixel", version="13", device_name="Pixel 7 Emulator")
+    iphone = AppleDevice(name="iPhone", version="17", device_name="iPhone 15 Simulator")
+    with store.batch():
+        store.save(pixel)
+        store.save(iphone)
+    return pixel, iphone
+
+
+def test_platform_subclasses_share_kind():
+    assert kind_of(AndroidDevice) == kind_of(AppleDevice) == kind_of(Device) == "device"
+    assert (platform_of(AndroidDevice), platform_of(AppleDevice), platform_of(Device)) == ("android", "ios", None)
+
+
+def test_find_limited_to_subclass_platform(store, devices):
+    pixel, iphone = devices
+    androids = store.find(AndroidDevice)
+    apples = store.find(AppleDevice)
+
+    assert [(type(d), d.device_name) for d in androids] == [(AndroidDevice, "Pixel 7 Emulator")]
+    assert [(type(d), d.device_name) for d in apples] == [(AppleDevice, "iPhone 15 Simulator")]
+    assert store.find(AndroidDevice, platform=DevicePlatform.IOS) == []
+    assert len(store.find(AppleDevice, platform="ios")) == 1
+
+
+def test_base_class_loads_each_platform(store, devices):
+    loaded = store.find(Device)
+    assert sorted(type(d).__name__ for d in loaded) == ["AndroidDevice", "AppleDevice"]
+    assert [type(d) for d in store.find(Device, platform=DevicePlatform.ANDROID)] == [AndroidDevice]
+
+
+def test_get_count_and_delete_respect_platform(store, devices):
+    pixel, iphone = devices
+    assert store.get(AndroidDevice, iphone.store_key()) is None
+    assert store.get(AppleDevice, iphone.store_key()).device_name == "iPhone 15 Simulator"
+    assert isinstance(store.get(Device, pixel.store_key()), AndroidDevice)
+    assert (store.count(AndroidDevice), store.count(AppleDevice), store.count(Device), store.count()) == (1, 1, 2, 2)
+
+    assert not store.delete(AndroidDevice, iphone.store_key())
+    assert store.delete(AppleDevice, iphone.store_key())
+    assert store.count(Device) == 1
+
+
+def test_batch_discarded_when_block_raises(store):
+    with pytest.raises(RuntimeError):
+        with store.batch():
+            store.save(AndroidDevice(name="Pixel", version="13", device_name="Pixel 7"))
+            raise RuntimeError("interrupted")
+    assert store.count() == 0
@@ -0,0 +1,105 @@
+import csv
+import json
+import subprocess
+import sys
+
+import psutil
+import pytest
+
+from instatest.core.helpers.process.resource_sampler import COLUMNS, ResourceSampler
+
+PARENT = ("import subprocess, sys, time; "
+          "children = [subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']) for _ in range(2)]; "
+          "print('ready', flush=True); time.sleep(30)")
+
+
+@pytest.fixture
+def tree():
+    process = subprocess.Popen([sys.executable, "-c", PARENT], stdout=subprocess.PIPE)
+    assert process.stdout.readline() == b"ready\n"
+    root = psutil.Process(process.pid)
+    started = [root] + root.children(recursive=True)
+    yield process
+    for p in started:
+        try:
+            p.kill()
+        except psutil.Error:
+            pass
+    process.wait()
+    process.stdout.close()
+
+
+def test_sample_counts_the_tree(tree):
+    sampler = ResourceSampler(tree.pid)
+    assert sampler.sample()
+    assert sampler.sample()
+
+    samples = sampler.samples()
+    assert len(samples) == 2
+    assert samples[-1]['processes'] == 3
+    assert samples[-1]['rss_bytes'] > 0
+    assert samples[-1]['threads'] >= 3
+    assert sampler.summary()['peak_processes'] == 3
+
+
+def test_root_only(tree):
+    sampler = ResourceSampler(tree.pid, include_children=False)
+    assert sampler.sample()
+    assert sampler.samples()[0]['processes'] == 1
+
+
+def test_sampling_stops_when_root_exits(tree):
+    sampler = ResourceSampler(tree.pid, interval_s=0.01)
+    sampler.start()
+    tree.kill()
+    tree.wait()
+    sampler._thread.join(5)
+    assert not sampler._thread.is_alive()
+    assert not sampler.sample()
+    sampler.stop()
+
+
+@pytest.mark.parametrize("error", [psutil.AccessDenied, psutil.NoSuchProcess])
+def test_unreadable_tree_ends_sampling(tree, monkeypatch, error):
+    def children(self, recursive=False):
+        raise error(self.pid)
+
+    sampler = ResourceSampler(tree.pid, interval_s=0.01)
+    assert sampler.sample()
+    monkeypatch.setattr(psutil.Process, "children", children)
+    assert not sampler.sample()
+
+    sampler.start()
+    sampler._thread.join(5)
+    assert not sampler._thread.is_alive()
+    sampler.stop()
+    assert sampler.sample_count == 1
+
+
+def test_thread_ends_on_unexpected_psutil_error(tree, monkeypatch):
+    def broken(self):
+        raise psutil.Error("table unreadable")
+
+    monkeypatch.setattr(ResourceSampler, "sample", broken)
+    sampler = ResourceSampler(tree.pid, interval_s=0.01)
+    sampler.start()
+    sampler._thread.join(5)
+    assert not sampler._thread.is_alive()
+
+
+def test_export(tree, tmp_path):
+    sampler = ResourceSampler(tree.pid)
+    sampler.sample()
+    sampler.sample()
+
+    sampler.export(str(tmp_path / "usage.json"))
+    with open(str(tmp_path / "usage.json")) as f:
+        exported = json.load(f)
+    assert exported["pid"] == tree.pid
+    assert exported["summary"]["samples"] == 2
+
+    sampler.export(str(tmp_path / "usage.csv"))
+    with open(str(tmp_path / "usage.csv"), newline="") as f:
+        rows = list(csv.reader(f))
+    assert tuple(rows[0]) == COLUMNS
+    assert len(rows) == 3
@@ -0,0 +1,50 @@
+import pytest
+from appium.webdriver.common.mobileby import MobileBy
+
+from instatest.core.helpers.mobile import MobileOperator
+from instatest.core.helpers.mobile.android_selector import AndroidSelector
+from instatest.core.helpers.mobile.selector_planner import LookupStrategy, SelectorPlanner, planner
+from instatest.core.target_property import TargetProperty
+
+
+@pytest.fixture
+def enabled_planner():
+    enabled = planner.enabled
+    planner.enable()
+    yield planner
+    if enabled:
+        planner.enable()
+    else:
+        planner.disable()
+
+
+def test_disable_replans_memoized_selectors(enabled_planner):
+    selector = AndroidSelector.ById("planner_login_button")
+    assert selector.get_tuple() == (MobileBy.ACCESSIBILITY_ID, "planner_login_button")
+
+    enabled_planner.disable()
+    assert AndroidSelector.ById("planner_login_button").get_tuple()[0] == MobileBy.ANDROID_UIAUTOMATOR
+    assert enabled_planner.plan_for(selector).reason == "native locators disabled"
+
+    enabled_planner.enable()
+    assert selector.get_tuple() == (MobileBy.ACCESSIBILITY_ID, "planner_login_button")
+
+
+def test_tuple_kept_while_setting_is_unchanged(enabled_planner):
+    selector = AndroidSelector.ByResourceId("planner_footer")
+    first = selector.get_tuple()
+    enabled_planner.enable()
+    assert selector.get_tuple() is first
+
+
+@pytest.mark.parametrize("operator, name", [
+    (MobileOperator.Contains, "Contains"),
+    (MobileOperator.StartsWith, "StartsWith"),
+    (MobileOperator.EndsWith, "EndsWith"),
+    (MobileOperator.Matches, "Matches"),
+])
+def test_query_reason_names_operator(operator, name):
+    selector = AndroidSelector(MobileBy.ANDROID_UIAUTOMATOR, TargetProperty.ContentDescription, operator, "job_")
+    plan = SelectorPlanner().plan(selector)
+    assert plan.strategy == LookupStrategy.QUERY
+    assert plan.reason == "{0} needs a query".format(name)
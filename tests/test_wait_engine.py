@@ -0,0 +1,91 @@
+import itertools
+
+import pytest
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
+
+from instatest.core.helpers import wait_engine
+from instatest.core.helpers.wait_engine import Backoff, WaitEngine
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+        self.sleeps = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(wait_engine, "time", fake)
+    return fake
+
+
+def after(clock: FakeClock, at_s: float, value="done"):
+    start = clock.now
+    return lambda: value if clock.now - start >= at_s else None
+
+
+def test_backoff_grows_to_cap():
+    delays = list(itertools.islice(Backoff(initial_s=0.05, factor=2, max_s=0.3).delays(), 6))
+    assert delays == pytest.approx([0.05, 0.1, 0.2, 0.3, 0.3, 0.3])
+
+
+def test_backoff_initial_above_cap():
+    assert next(Backoff(initial_s=1, max_s=0.25).delays()) == 0.25
+
+
+def test_until_sleeps_on_backoff_schedule(clock):
+    engine = WaitEngine(timeout_s=10, backoff=Backoff(initial_s=0.05, factor=2, max_s=0.2))
+    assert engine.until(after(clock, 0.5)) == "done"
+    assert clock.sleeps == pytest.approx([0.05, 0.1, 0.2, 0.2])
+
+
+def test_timeout_raises_without_oversleeping(clock):
+    engine = WaitEngine(timeout_s=1, backoff=Backoff(initial_s=0.4, factor=2, max_s=0.4))
+    start = clock.now
+    with pytest.raises(TimeoutException) as raised:
+        engine.until(lambda: None, message="Banner")
+    assert clock.now - start == pytest.approx(1)
+    assert clock.sleeps == pytest.approx([0.4, 0.4, 0.2])
+    assert "Banner" in raised.value.msg
+
+
+def test_until_any_returns_first_condition_met(clock):
+    engine = WaitEngine(timeout_s=5, backoff=Backoff(initial_s=0.1, max_s=0.1))
+    key, value = engine.until_any({"error": after(clock, 0.3, "banner"), "success": after(clock, 0.15, "screen")})
+    assert (key, value) == ("success", "screen")
+
+
+def test_until_any_prefers_earlier_key_in_the_same_sweep(clock):
+    engine = WaitEngine(timeout_s=5, backoff=Backoff(initial_s=0.1, max_s=0.1))
+    assert engine.until_any({"first": lambda: 1, "second": lambda: 2}) == ("first", 1)
+    assert clock.sleeps == []
+
+
+def test_ignored_exceptions_count_as_not_met(clock):
+    attempts = []
+
+    def flaky():
+        attempts.append(clock.now)
+        if len(attempts) < 3:
+            raise NoSuchElementException("not yet")
+        return "found"
+
+    engine = WaitEngine(timeout_s=5, backoff=Backoff(initial_s=0.1, max_s=0.1))
+    assert engine.until(flaky) == "found"
+    assert len(attempts) == 3
+
+
+def test_other_exceptions_propagate(clock):
+    def broken():
+        raise ValueError("bug in condition")
+
+    with pytest.raises(ValueError):
+        WaitEngine(timeout_s=5).until(broken)